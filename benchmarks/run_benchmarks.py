@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+"""
+Benchmark the thor-db, thor-log-analysis, thor-lens and custom-signatures helper scripts on synthetic data.
+
+Each case runs in a fresh interpreter so wall time and peak RSS are not
+polluted by earlier cases. Results (wall time, throughput, peak RSS, input
+parameters, Python/platform and git revision) are written as JSON; pass an
+earlier results file with --compare to flag regressions.
+
+Usage:
+    run_benchmarks.py [--output FILE] [--compare BASELINE] [--cases NAME,...] [--repeat N]
+                      [--log-lines N] [--times-rows N] [--skew A] [--severity-mix MIX]
+                      [--data-dir DIR]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+BENCH_DIR = Path(__file__).resolve().parent
+REPO_DIR = BENCH_DIR.parent
+sys.path.insert(0, str(BENCH_DIR))
+sys.path.insert(0, str(REPO_DIR / "thor-db" / "scripts"))
+sys.path.insert(0, str(REPO_DIR / "thor-log-analysis" / "scripts"))
+sys.path.insert(0, str(REPO_DIR / "thor-lens" / "scripts"))
+sys.path.insert(0, str(REPO_DIR / "custom-signatures" / "scripts"))
+
+import synth_thor_data  # noqa: E402
+
+RESULTS_VERSION = 1
+DEFAULT_OUTPUT = "bench_results.json"
+
+
+def peak_rss_mb():
+    """Peak RSS of this process in MB, or None where resource is unavailable."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+# Case functions run inside the child process and return (units, unit name),
+# optionally followed by their own wall time when setup must not be counted.
+# Imports stay inside so each child only loads what its case needs.
+
+def case_parse_text(data):
+    from summarize_thor_log import parse_thor_log
+    parse_thor_log(data['textlog'])
+    return data['log_lines'], 'lines'
+
+
+def case_parse_text_textio(data):
+    from summarize_thor_log import parse_input
+    parse_input(data['textlog'], mmap_scan=False)
+    return data['log_lines'], 'lines'
+
+
+def case_parse_text_streaming(data):
+    from summarize_thor_log import parse_thor_log_streaming
+    parse_thor_log_streaming(data['textlog'])
+    return data['log_lines'], 'lines'
+
+
+def case_parse_text_cached(data):
+    """Summary of the text log from a warm --cache (priming parse not timed)."""
+    from summarize_thor_log import parse_inputs
+    from thor_log_cache import ParseCache
+    cache_dir = tempfile.mkdtemp(prefix='thor_bench_cache_')
+    try:
+        cache = ParseCache(cache_dir)
+        parse_inputs([data['textlog']], cache=cache)
+        start = time.perf_counter()
+        parse_inputs([data['textlog']], cache=cache)
+        return data['log_lines'], 'lines', time.perf_counter() - start
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+def case_parse_json(data):
+    from summarize_thor_log import parse_input
+    parse_input(data['jsonlog'], fmt='json')
+    return data['log_lines'], 'lines'
+
+
+def case_validate_audit_trail(data):
+    from validate_audit_trail import validate
+    summary = validate(data['audittrail'], workers=os.cpu_count() or 1)
+    return summary['lines'], 'lines'
+
+
+def case_lens_inventory(data):
+    """Footer-only inventory of a synthetic THOR Lens case (generating the case not timed)."""
+    from parquet_inventory import find_parquet_files, plan_compaction, read_footers, summarize_partitions
+    case_dir = data['lenscase']
+    if not os.path.isdir(case_dir):
+        synth_thor_data.write_lens_case(case_dir, data['log_lines'], days=60, parts=32)
+    start = time.perf_counter()
+    files = find_parquet_files(os.path.join(case_dir, 'events'))
+    footers = read_footers([path for _, path in files])
+    summarize_partitions(files, footers, 64 << 20)
+    plan_compaction(files, footers, 64 << 20, 256 << 20)
+    return len(files), 'files', time.perf_counter() - start
+
+
+def case_build_hash_iocs(data):
+    """Hash IOC files from a CSV feed: normalize, external-sort dedup, shard."""
+    from build_simple_iocs import build_hashes
+    out_dir = tempfile.mkdtemp(prefix='thor_iocs_out_')
+    try:
+        stats = build_hashes([data['iocfeed']], out_dir, 'bench', run_lines=100_000)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+    return stats['records'], 'hashes'
+
+
+def export_case(table, fmt):
+    def run(data):
+        from thor_db_export_csv import EXPORTERS, connect_readonly
+        out_dir = tempfile.mkdtemp(prefix='thor_bench_export_')
+        try:
+            conn = connect_readonly(data['thordb'])
+            try:
+                count = EXPORTERS[(table, fmt)](conn.cursor(), os.path.join(out_dir, f"{table}.{fmt}"))
+            finally:
+                conn.close()
+        finally:
+            shutil.rmtree(out_dir)
+        return count, 'rows'
+    return run
+
+
+# Low enough that the --init-filter planner sees tens of thousands of slow rules
+PLAN_THRESHOLD = 0.01
+
+
+def case_slow_rules(data):
+    """The slow-rules report, with the --init-filter plan computed at --threshold 0.01."""
+    from thor_db_analysis import TimesAnalysis, connect_analysis
+    from thor_db_slow_rules_hint import analyze_hooks, analyze_slow_scans, get_category_totals, plan_init_filter
+    conn, _ = connect_analysis(data['thordb'])
+    try:
+        times = TimesAnalysis(conn.cursor())
+        totals = get_category_totals(times)
+        analyze_slow_scans(times, 1.0)
+        analyze_hooks(times)
+        slow_deep, _ = analyze_slow_scans(times, PLAN_THRESHOLD)
+        deep_total = next((seconds for category, seconds in totals if category == 'deep_scan'), 0.0)
+        plan_init_filter(slow_deep, times.elements('deep_scan'), (), None, deep_total)
+    finally:
+        conn.close()
+    return data['times_rows'], 'rows'
+
+
+FLEET_HOSTS = 20
+
+
+def case_fleet(data):
+    """Fleet aggregation over per-host ThorDBs, each with a prepared copy next to it (setup not timed).
+
+    Fails unless every host counts once: prepared copies and the snapshot store must be skipped.
+    """
+    from thor_db_fleet import aggregate_fleet, expand_db_paths
+    from thor_db_snapshots import DEFAULT_STORE
+    fleet_dir = data['fleetdir']
+    if not os.path.isdir(fleet_dir):
+        for i in range(FLEET_HOSTS):
+            host_dir = os.path.join(fleet_dir, f"host{i:03d}")
+            os.makedirs(host_dir)
+            shutil.copyfile(data['smalldb'], os.path.join(host_dir, "thor10.db"))
+            shutil.copyfile(data['smalldb'], os.path.join(host_dir, "thor10.prepared.db"))
+        shutil.copyfile(data['smalldb'], os.path.join(fleet_dir, DEFAULT_STORE))
+    start = time.perf_counter()
+    dbpaths = expand_db_paths([fleet_dir])
+    stats, hosts_ok, errors = aggregate_fleet(dbpaths, 4)
+    wall = time.perf_counter() - start
+    if hosts_ok != FLEET_HOSTS or errors:
+        raise SystemExit(f"fleet counted {hosts_ok} hosts ({len(errors)} unreadable), expected {FLEET_HOSTS}")
+    return hosts_ok, 'hosts', wall
+
+
+def case_top_times(data):
+    from thor_db_analysis import TimesAnalysis, connect_analysis
+    conn, _ = connect_analysis(data['thordb'])
+    try:
+        times = TimesAnalysis(conn.cursor())
+        times.top_by_total(20)
+        times.top_by_average(20, 5)
+        times.category_totals()
+    finally:
+        conn.close()
+    return data['times_rows'], 'rows'
+
+
+STARTUP_CALLS = 20
+
+
+def spawn_calls(argv, env=None):
+    for _ in range(STARTUP_CALLS):
+        subprocess.run(argv, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env, check=True)
+    return STARTUP_CALLS, 'calls'
+
+
+def case_startup_script(data):
+    return spawn_calls([sys.executable, str(REPO_DIR / "thor-db" / "scripts" / "thor_db_top_times.py"),
+                        data['smalldb']])
+
+
+def case_startup_thor_tools(data):
+    return spawn_calls([sys.executable, str(REPO_DIR / "thor-tools"), 'top-times', data['smalldb']])
+
+
+def case_startup_server(data):
+    """thor-tools calls through a warm `thor-tools serve` (server start-up not timed)."""
+    socket_path = os.path.join(tempfile.mkdtemp(prefix='thor_bench_sock_'), 'tools.sock')
+    server = subprocess.Popen([sys.executable, str(REPO_DIR / "thor-tools"), 'serve', '--socket', socket_path],
+                              stderr=subprocess.PIPE)
+    try:
+        server.stderr.readline()  # "listening on ..." once warm
+        env = dict(os.environ, THOR_TOOLS_SERVER=socket_path)
+        start = time.perf_counter()
+        result = spawn_calls([sys.executable, str(REPO_DIR / "thor-tools"), 'top-times', data['smalldb']], env)
+        return result + (time.perf_counter() - start,)
+    finally:
+        subprocess.run([sys.executable, str(REPO_DIR / "thor-tools"), 'stop', '--socket', socket_path],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        server.wait()
+        shutil.rmtree(os.path.dirname(socket_path), ignore_errors=True)
+
+
+CASES = {
+    'parse_text': case_parse_text,
+    'parse_text_textio': case_parse_text_textio,
+    'parse_text_streaming': case_parse_text_streaming,
+    'parse_text_cached': case_parse_text_cached,
+    'parse_json': case_parse_json,
+    'validate_audit_trail': case_validate_audit_trail,
+    'lens_inventory': case_lens_inventory,
+    'build_hash_iocs': case_build_hash_iocs,
+    'export_times_csv': export_case('times', 'csv'),
+    'export_times_json': export_case('times', 'json'),
+    'export_times_ndjson': export_case('times', 'ndjson'),
+    'export_times_parquet': export_case('times', 'parquet'),
+    'slow_rules': case_slow_rules,
+    'top_times': case_top_times,
+    'fleet': case_fleet,
+    'startup_script': case_startup_script,
+    'startup_thor_tools': case_startup_thor_tools,
+    'startup_server': case_startup_server,
+}
+
+# Input file each case reads, for MB/s
+CASE_INPUTS = {'parse_text': 'textlog', 'parse_text_textio': 'textlog', 'parse_text_streaming': 'textlog',
+               'parse_text_cached': 'textlog', 'parse_json': 'jsonlog', 'validate_audit_trail': 'audittrail',
+               'build_hash_iocs': 'iocfeed'}
+
+
+def run_child(case, data_file):
+    """Child entry point: run one case and print its measurements as JSON."""
+    with open(data_file) as f:
+        data = json.load(f)
+    start = time.perf_counter()
+    units, unit, *timed = CASES[case](data)
+    wall = timed[0] if timed else time.perf_counter() - start
+    print(json.dumps({'wall_s': wall, 'units': units, 'unit': unit, 'peak_rss_mb': peak_rss_mb()}))
+
+
+def generate_data(data_dir, args):
+    """Create (or reuse) the synthetic inputs; return the data description dict."""
+    tag = f"{args.log_lines}_{args.times_rows}_{args.skew}_{args.seed}"
+    data = {
+        'textlog': str(data_dir / f"thor_{tag}.txt"),
+        'jsonlog': str(data_dir / f"thor_{tag}.jsonl"),
+        'audittrail': str(data_dir / f"audit_{args.log_lines}_{args.seed}.jsonl.gz"),
+        'lenscase': str(data_dir / f"lenscase_{args.log_lines}_{args.seed}"),
+        'iocfeed': str(data_dir / f"iocfeed_{args.log_lines}_{args.seed}.csv.gz"),
+        'thordb': str(data_dir / f"thor_{tag}.db"),
+        'smalldb': str(data_dir / f"thor_small_{args.seed}.db"),
+        'fleetdir': str(data_dir / f"fleet_{args.seed}"),
+        'log_lines': args.log_lines,
+        'times_rows': args.times_rows,
+    }
+    mix_file = data_dir / f"thor_{tag}.mix"
+    reuse = mix_file.exists() and mix_file.read_text() == args.severity_mix
+    if not (reuse and os.path.exists(data['textlog'])):
+        synth_thor_data.write_text_log(data['textlog'], args.log_lines, args.severity_mix, args.seed)
+    if not (reuse and os.path.exists(data['jsonlog'])):
+        synth_thor_data.write_json_log(data['jsonlog'], args.log_lines, args.severity_mix, args.seed)
+    mix_file.write_text(args.severity_mix)
+    if not os.path.exists(data['audittrail']):
+        synth_thor_data.write_audit_trail(data['audittrail'], args.log_lines, seed=args.seed)
+    if not os.path.exists(data['iocfeed']):
+        # Three hashes per row
+        synth_thor_data.write_ioc_feed(data['iocfeed'], args.log_lines // 3, seed=args.seed)
+    if not os.path.exists(data['thordb']):
+        synth_thor_data.write_thordb(data['thordb'], args.times_rows, skew=args.skew, seed=args.seed)
+    if not os.path.exists(data['smalldb']):
+        # Startup cases: small enough that interpreter and import time dominate
+        synth_thor_data.write_thordb(data['smalldb'], 5000, seed=args.seed)
+    return data
+
+
+def run_case(case, data_file, repeat):
+    """Run a case `repeat` times in fresh interpreters; return the result record."""
+    runs = []
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, __file__, '--run-case', case, data_file],
+                              capture_output=True, text=True)
+        if proc.returncode != 0:
+            return {'case': case, 'error': proc.stderr.strip().splitlines()[-1] if proc.stderr else 'failed'}
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+    walls = [r['wall_s'] for r in runs]
+    best = min(walls)
+    rss = [r['peak_rss_mb'] for r in runs if r['peak_rss_mb'] is not None]
+    return {
+        'case': case,
+        'wall_s': round(best, 4),
+        'wall_s_median': round(statistics.median(walls), 4),
+        'repeat': repeat,
+        'units': runs[0]['units'],
+        'throughput': round(runs[0]['units'] / best, 1) if best else None,
+        'throughput_unit': f"{runs[0]['unit']}/s",
+        'peak_rss_mb': round(max(rss), 1) if rss else None,
+    }
+
+
+def git_revision():
+    try:
+        proc = subprocess.run(['git', '-C', str(REPO_DIR), 'rev-parse', '--short', 'HEAD'],
+                              capture_output=True, text=True, timeout=10)
+        return proc.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compare_results(results, params, baseline_path, tolerance):
+    """Print per-case wall time ratios against a baseline; return the regressed cases."""
+    with open(baseline_path) as f:
+        report = json.load(f)
+    baseline = {r['case']: r for r in report['results'] if 'wall_s' in r}
+    regressed = []
+    print(f"\nComparison with {baseline_path} (rev {report.get('git_revision') or 'unknown'}):")
+    if report.get('params') != params:
+        print("  Warning: baseline was run with different parameters; ratios are not comparable")
+    for result in results:
+        old = baseline.get(result['case'])
+        if old is None or 'wall_s' not in result:
+            continue
+        ratio = result['wall_s'] / old['wall_s'] if old['wall_s'] else float('inf')
+        flag = ""
+        if ratio > 1 + tolerance:
+            flag = "  REGRESSION"
+            regressed.append(result['case'])
+        elif ratio < 1 - tolerance:
+            flag = "  faster"
+        print(f"  {result['case']:<24} {old['wall_s']:>9.3f}s -> {result['wall_s']:>9.3f}s  x{ratio:.2f}{flag}")
+    return regressed
+
+
+def main():
+    if len(sys.argv) == 4 and sys.argv[1] == '--run-case':
+        run_child(sys.argv[2], sys.argv[3])
+        return
+
+    parser = argparse.ArgumentParser(description="Benchmark THOR helper scripts on synthetic data")
+    parser.add_argument("--output", "-o", default=DEFAULT_OUTPUT, help=f"Results JSON (default: {DEFAULT_OUTPUT})")
+    parser.add_argument("--compare", help="Earlier results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="Relative slowdown reported as regression (default: 0.10)")
+    parser.add_argument("--cases", help=f"Comma-separated subset of: {', '.join(CASES)}")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per case; best wall time is kept (default: 3)")
+    parser.add_argument("--log-lines", type=int, default=500_000, help="Synthetic log lines (default: 500000)")
+    parser.add_argument("--times-rows", type=int, default=200_000, help="Synthetic times rows (default: 200000)")
+    parser.add_argument("--skew", type=float, default=synth_thor_data.DEFAULT_SKEW,
+                        help=f"Pareto shape of rule cost (default: {synth_thor_data.DEFAULT_SKEW})")
+    parser.add_argument("--severity-mix", default=synth_thor_data.DEFAULT_SEVERITY_MIX,
+                        help=f"Log level weights (default: {synth_thor_data.DEFAULT_SEVERITY_MIX})")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    parser.add_argument("--data-dir", help="Keep and reuse generated inputs here (default: temporary)")
+    args = parser.parse_args()
+
+    cases = args.cases.split(',') if args.cases else list(CASES)
+    unknown = [c for c in cases if c not in CASES]
+    if unknown:
+        print(f"Error: unknown cases: {', '.join(unknown)}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        synth_thor_data.parse_severity_mix(args.severity_mix)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    data_dir = Path(args.data_dir) if args.data_dir else Path(tempfile.mkdtemp(prefix='thor_bench_'))
+    data_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        started = time.perf_counter()
+        data = generate_data(data_dir, args)
+        print(f"Synthetic data ready in {time.perf_counter() - started:.1f}s ({data_dir})")
+        data_file = data_dir / "bench_data.json"
+        data_file.write_text(json.dumps(data))
+
+        results = []
+        for case in cases:
+            result = run_case(case, str(data_file), args.repeat)
+            if case in CASE_INPUTS and 'wall_s' in result:
+                size_mb = os.path.getsize(data[CASE_INPUTS[case]]) / 1e6
+                result['input_mb'] = round(size_mb, 1)
+                result['mb_per_s'] = round(size_mb / result['wall_s'], 1)
+            results.append(result)
+            if 'error' in result:
+                print(f"  {case:<24} ERROR: {result['error']}")
+            else:
+                rss = f"{result['peak_rss_mb']:.1f} MB" if result['peak_rss_mb'] is not None else "n/a"
+                print(f"  {case:<24} {result['wall_s']:>9.3f}s  {result['throughput']:>14,.0f} "
+                      f"{result['throughput_unit']:<9}  peak RSS {rss}")
+    finally:
+        if not args.data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    report = {
+        'version': RESULTS_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'params': {
+            'log_lines': args.log_lines,
+            'times_rows': args.times_rows,
+            'skew': args.skew,
+            'severity_mix': args.severity_mix,
+            'seed': args.seed,
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.compare:
+        regressed = compare_results(results, report['params'], args.compare, args.tolerance)
+        if regressed:
+            print(f"Regressions: {', '.join(regressed)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
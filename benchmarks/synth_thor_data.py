@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+"""
+Generate synthetic THOR data for benchmarking the helper scripts.
+
+- ThorDB: `times`, `stats` and `tbl` with configurable row counts. Element
+  cost follows a Pareto distribution; a lower --skew gives a heavier tail
+  (a few very slow rules), a higher one flattens it.
+- Text and JSON logs with a configurable severity mix, e.g.
+  "alert=1,warning=3,notice=6,error=1,info=89" (relative weights).
+- THOR v11 audit trails (JSONL, gzip if the name ends in .gz), optionally
+  with --bad-lines broken records spread through the file.
+- THOR Lens case directories (meta.json plus date-partitioned Parquet
+  events, one file per import worker and day; needs pyarrow). Event volume
+  per day is skewed, so quiet days end up as many small files.
+- Threat-intel hash feeds (CSV with sha256/md5/sha1 columns, gzip if the
+  name ends in .gz). A share of rows repeats earlier samples, some with
+  another score, and hashes come in mixed case with a few broken values.
+
+Output is deterministic for a given --seed.
+
+Usage:
+    synth_thor_data.py thordb <out.db> [--times-rows N] [--stats-rows N] [--skew A]
+    synth_thor_data.py textlog <out.txt> [--lines N] [--severity-mix MIX]
+    synth_thor_data.py jsonlog <out.jsonl> [--lines N] [--severity-mix MIX] [--style v1|v2]
+    synth_thor_data.py audittrail <out.jsonl.gz> [--lines N] [--bad-lines N]
+    synth_thor_data.py lenscase <case_dir> [--events N] [--days N] [--parts N]
+    synth_thor_data.py iocfeed <out.csv[.gz]> [--rows N] [--dup-share F]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sqlite3
+import sys
+import time
+
+DEFAULT_SEVERITY_MIX = "alert=1,warning=3,notice=6,error=1,info=89"
+DEFAULT_SKEW = 1.5
+
+# category -> share of `times` rows
+TIMES_CATEGORIES = [('deep_scan', 0.70), ('bulk_scan', 0.20), ('hooks', 0.10)]
+RULE_PREFIXES = ['APT', 'HKTL', 'MAL', 'SUSP', 'PUA', 'WEBSHELL', 'EXPL', 'VULN']
+MODULES = ['Filescan', 'ProcessCheck', 'Autoruns', 'ServiceCheck', 'EventlogScan',
+           'RegistryChecks', 'Users', 'Mutex', 'NetworkSessions', 'Firewall']
+RULE_NAMES = ['HKTL_CobaltStrike_Beacon', 'SUSP_PowerShell_Encoded', 'MAL_Emotet_Loader',
+              'APT_Lazarus_Dropper', 'PUA_AnyDesk_Portable', 'SUSP_Renamed_PsExec',
+              'WEBSHELL_ASPX_Generic', 'HKTL_Mimikatz_Strings']
+LEVEL_SCORES = {'alert': (81, 150), 'warning': (60, 80), 'notice': (40, 59), 'error': (0, 0), 'info': (0, 0)}
+BASE_TIME = 1705234567
+AUDIT_TRAIL_TYPES = [('file', 0.80), ('process', 0.08), ('registry_key', 0.07), ('eventlog_entry', 0.05)]
+
+
+def parse_severity_mix(spec):
+    """Parse "alert=1,warning=3,..." into {level: weight}."""
+    mix = {}
+    for part in spec.split(','):
+        level, _, weight = part.partition('=')
+        level = level.strip().lower()
+        if level not in LEVEL_SCORES:
+            raise ValueError(f"unknown level in severity mix: {level!r}")
+        mix[level] = float(weight)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError(f"severity mix has no positive weights: {spec!r}")
+    return mix
+
+
+def write_thordb(path, times_rows=100_000, stats_rows=200, skew=DEFAULT_SKEW, seed=42):
+    """Create a ThorDB with the standard tables; overwrites path."""
+    rng = random.Random(seed)
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        PRAGMA journal_mode=OFF;
+        PRAGMA synchronous=OFF;
+        CREATE TABLE times (category TEXT, element TEXT, count INTEGER, duration INTEGER);
+        CREATE TABLE stats (module TEXT, element TEXT, started INTEGER, duration INTEGER);
+        CREATE TABLE tbl (key TEXT PRIMARY KEY, value BLOB);
+    """)
+
+    def times():
+        for i in range(times_rows):
+            roll = rng.random()
+            for category, share in TIMES_CATEGORIES:
+                roll -= share
+                if roll < 0:
+                    break
+            if category == 'deep_scan':
+                element = f"{rng.choice(RULE_PREFIXES)}_Rule_{i}"
+            elif category == 'bulk_scan':
+                element = f"bulk_check_{i}"
+            else:
+                element = f"hook_{i}"
+            count = rng.randint(1, 50_000)
+            # Per-call cost in ns: 5ms scaled by a Pareto tail, so the default
+            # 1s slow-rule threshold catches a few hundred rows per million
+            avg_ns = 5_000_000 * rng.paretovariate(skew)
+            yield category, element, count, int(count * avg_ns)
+
+    conn.executemany("INSERT INTO times VALUES (?, ?, ?, ?)", times())
+
+    def stats():
+        started = BASE_TIME
+        for i in range(stats_rows):
+            duration = int(30 * rng.paretovariate(skew))
+            yield MODULES[i % len(MODULES)], '', started, duration
+            started += duration + rng.randint(0, 5)
+
+    conn.executemany("INSERT INTO stats VALUES (?, ?, ?, ?)", stats())
+    conn.executemany("INSERT INTO tbl VALUES (?, ?)", [
+        ('schema_version', '3'),
+        ('last_run_id', f"S-{rng.getrandbits(32):08x}"),
+        ('resume_position', '/var/lib/thor/last_file'),
+        ('diff_enabled', 'false'),
+    ])
+    conn.commit()
+    conn.close()
+
+
+def iter_findings(lines, severity_mix, seed):
+    """Yield (i, level, module, rule, target, score) for each synthetic log line."""
+    rng = random.Random(seed)
+    levels = list(severity_mix)
+    weights = [severity_mix[level] for level in levels]
+    for i in range(lines):
+        level = rng.choices(levels, weights)[0]
+        low, high = LEVEL_SCORES[level]
+        target = f"C:\\Users\\user{rng.randint(1, 50)}\\AppData\\Local\\Temp\\file{rng.randint(1, 5000)}.exe"
+        yield i, level, rng.choice(MODULES), rng.choice(RULE_NAMES), target, rng.randint(low, high)
+
+
+def log_timestamp(i):
+    return f"2024-01-14T10:{(i // 60) % 60:02d}:{i % 60:02d}Z"
+
+
+def write_text_log(path, lines=500_000, severity_mix=DEFAULT_SEVERITY_MIX, seed=42):
+    """Write a THOR text log; returns the number of lines."""
+    mix = parse_severity_mix(severity_mix)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, level, module, rule, target, score in iter_findings(lines, mix, seed):
+            prefix = f"{log_timestamp(i)} HOST01 THOR: {level.capitalize()}: MODULE: {module}"
+            if level in ('alert', 'warning', 'notice'):
+                f.write(f"{prefix} MESSAGE: Suspicious file found FILE: {target} SCORE: {score} "
+                        f"NAME: {rule} REASON_1: YARA rule {rule} SUBSCORE_1: {score}\n")
+            elif level == 'error':
+                f.write(f"{prefix} MESSAGE: Cannot read file FILE: {target} ERROR: access denied\n")
+            else:
+                f.write(f"{prefix} MESSAGE: Scanning element FILE: C:\\Windows\\System32\\file{i}.dll "
+                        f"SIZE: {score * 1024 + i % 1000}\n")
+    return lines
+
+
+def write_json_log(path, lines=500_000, severity_mix=DEFAULT_SEVERITY_MIX, seed=42, style='v2'):
+    """Write a THOR JSON log (v1 flat records or v2 meta/subject/reasons); returns the number of lines."""
+    mix = parse_severity_mix(severity_mix)
+    dumps = json.JSONEncoder(separators=(',', ':')).encode
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, level, module, rule, target, score in iter_findings(lines, mix, seed):
+            finding = level in ('alert', 'warning', 'notice')
+            message = {'error': "Cannot read file", 'info': "Scanning element"}.get(level, "Suspicious file found")
+            if style == 'v1':
+                record = {'time': log_timestamp(i), 'hostname': 'HOST01', 'level': level.capitalize(),
+                          'module': module, 'message': message, 'file': target}
+                if finding:
+                    record.update(score=score, rulename_1=rule, reason_1=f"YARA rule {rule}")
+            else:
+                record = {'type': 'THOR message',
+                          'meta': {'time': log_timestamp(i), 'level': level.capitalize(),
+                                   'module': module, 'hostname': 'HOST01'},
+                          'message': message,
+                          'subject': {'type': 'file', 'path': target}}
+                if finding:
+                    record['score'] = score
+                    record['reasons'] = [{'type': 'reason', 'summary': f"YARA rule {rule}",
+                                          'signature': {'rule_name': rule, 'score': score}}]
+            f.write(dumps(record))
+            f.write('\n')
+    return lines
+
+
+def write_audit_trail(path, lines=500_000, bad_lines=0, seed=42):
+    """Write a THOR v11 audit trail (gzip if path ends in .gz); returns the number of lines.
+
+    bad_lines records, evenly spaced, are cut short so they are not valid JSON.
+    """
+    rng = random.Random(seed)
+    types = [t for t, _ in AUDIT_TRAIL_TYPES]
+    weights = [w for _, w in AUDIT_TRAIL_TYPES]
+    bad_every = lines // bad_lines if bad_lines else 0
+    dumps = json.JSONEncoder(separators=(',', ':')).encode
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt', encoding='utf-8') as f:
+        for i in range(lines):
+            record_type = rng.choices(types, weights)[0]
+            stamp = log_timestamp(i)
+            element = f"C:\\Users\\user{rng.randint(1, 50)}\\AppData\\Local\\Temp\\file{rng.randint(1, 5000)}.exe"
+            record = {'type': record_type, 'hostname': 'HOST01',
+                      'object': {'type': record_type, 'path': element, 'size': rng.randint(1, 10 ** 7)},
+                      'timestamps': {'created': stamp, 'modified': stamp}}
+            if rng.random() < 0.02:
+                rule = rng.choice(RULE_NAMES)
+                score = rng.randint(60, 150)
+                record['score'] = score
+                record['reasons'] = [{'summary': f"YARA rule {rule}",
+                                      'signature': {'rule_name': rule, 'score': score}}]
+            line = dumps(record)
+            if bad_every and i % bad_every == bad_every // 2:
+                line = line[:len(line) // 2]
+            f.write(line)
+            f.write('\n')
+    return lines
+
+
+def write_lens_case(case_dir, events=500_000, days=14, parts=8, seed=42):
+    """Write a THOR Lens case: meta.json and events/date=YYYY-MM-DD/part-NNNN.parquet.
+
+    Each day's events are spread over `parts` files, as parallel import
+    workers write them. Returns the number of events.
+    """
+    import pyarrow
+    import pyarrow.parquet
+
+    rng = random.Random(seed)
+    weights = [rng.paretovariate(1.2) for _ in range(days)]
+    per_day = [int(events * w / sum(weights)) for w in weights]
+    per_day[0] += events - sum(per_day)
+    kinds = ['created', 'modified', 'accessed', 'changed']
+    types = [t for t, _ in AUDIT_TRAIL_TYPES]
+    schema = pyarrow.schema([('event_id', pyarrow.string()), ('timestamp', pyarrow.timestamp('us', tz='UTC')),
+                             ('time_kind', pyarrow.string()), ('object_type', pyarrow.string()),
+                             ('path', pyarrow.string()), ('score', pyarrow.int32())])
+    os.makedirs(os.path.join(case_dir, 'events'), exist_ok=True)
+    first_day = BASE_TIME - BASE_TIME % 86400
+    for day, count in enumerate(per_day):
+        day_start = first_day + day * 86400
+        partition = os.path.join(case_dir, 'events', f"date={time.strftime('%Y-%m-%d', time.gmtime(day_start))}")
+        os.makedirs(partition, exist_ok=True)
+        for part in range(parts):
+            rows = count // parts + (part < count % parts)
+            if not rows:
+                continue
+            stamps = sorted(day_start * 1_000_000 + rng.randrange(86400 * 1_000_000) for _ in range(rows))
+            table = pyarrow.table({
+                'event_id': [f"{rng.getrandbits(64):016x}" for _ in range(rows)],
+                'timestamp': stamps,
+                'time_kind': [rng.choice(kinds) for _ in range(rows)],
+                'object_type': [rng.choice(types) for _ in range(rows)],
+                'path': [f"C:\\Users\\user{rng.randint(1, 50)}\\AppData\\Local\\Temp\\file{rng.randint(1, 5000)}.exe"
+                         for _ in range(rows)],
+                'score': [rng.choice((0, 0, 0, rng.randint(40, 150))) for _ in range(rows)],
+            }, schema=schema)
+            pyarrow.parquet.write_table(table, os.path.join(partition, f"part-{part:04d}.parquet"),
+                                        compression='zstd')
+    with open(os.path.join(case_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump({'case_name': os.path.basename(os.path.normpath(case_dir)), 'source_file': 'synthetic',
+                   'event_count': events,
+                   'min_time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(first_day)),
+                   'max_time': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(first_day + days * 86400 - 1))}, f)
+    return events
+
+
+def write_ioc_feed(path, rows=1_000_000, dup_share=0.2, seed=42):
+    """Write a CSV hash feed (one sample per row, three hashes each); returns the number of rows.
+
+    dup_share of the rows repeat an earlier sample, half of them with
+    another score. About one row in 10000 has a truncated SHA256.
+    """
+    rng = random.Random(seed)
+    recent = []
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt', encoding='utf-8', newline='') as f:
+        f.write("# Synthetic threat-intel feed\n")
+        f.write("first_seen_utc,sha256_hash,md5_hash,sha1_hash,signature,score\n")
+        for i in range(rows):
+            if recent and rng.random() < dup_share:
+                sample = rng.choice(recent)
+                if rng.random() < 0.5:
+                    sample = sample[:4] + (rng.randint(40, 100),)
+            else:
+                sample = (f"{rng.getrandbits(256):064x}", f"{rng.getrandbits(128):032x}",
+                          f"{rng.getrandbits(160):040x}", rng.choice(RULE_NAMES), rng.randint(60, 100))
+                if len(recent) < 100_000:
+                    recent.append(sample)
+                else:
+                    recent[rng.randrange(len(recent))] = sample
+            sha256, md5, sha1, signature, score = sample
+            if rng.random() < 0.3:
+                sha256, md5, sha1 = sha256.upper(), md5.upper(), sha1.upper()
+            if rng.random() < 0.0001:
+                sha256 = sha256[:60]
+            f.write(f"{log_timestamp(i)},{sha256},{md5},{sha1},{signature},{score}\n")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic ThorDBs and THOR logs")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed (default: 42)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    db = sub.add_parser("thordb", help="Synthetic thor10.db with times/stats/tbl")
+    db.add_argument("output")
+    db.add_argument("--times-rows", type=int, default=100_000, help="Rows in times (default: 100000)")
+    db.add_argument("--stats-rows", type=int, default=200, help="Rows in stats (default: 200)")
+    db.add_argument("--skew", type=float, default=DEFAULT_SKEW,
+                    help=f"Pareto shape of per-call cost; lower = heavier tail (default: {DEFAULT_SKEW})")
+
+    for name, help_text in (("textlog", "Synthetic THOR text log"), ("jsonlog", "Synthetic THOR JSON log")):
+        log = sub.add_parser(name, help=help_text)
+        log.add_argument("output")
+        log.add_argument("--lines", type=int, default=500_000, help="Log lines (default: 500000)")
+        log.add_argument("--severity-mix", default=DEFAULT_SEVERITY_MIX,
+                         help=f"Relative level weights (default: {DEFAULT_SEVERITY_MIX})")
+        if name == "jsonlog":
+            log.add_argument("--style", choices=['v1', 'v2'], default='v2', help="JSON layout (default: v2)")
+
+    trail = sub.add_parser("audittrail", help="Synthetic THOR v11 audit trail")
+    trail.add_argument("output")
+    trail.add_argument("--lines", type=int, default=500_000, help="Records (default: 500000)")
+    trail.add_argument("--bad-lines", type=int, default=0, help="Records cut short to invalid JSON (default: 0)")
+
+    case = sub.add_parser("lenscase", help="Synthetic THOR Lens case directory (needs pyarrow)")
+    case.add_argument("output")
+    case.add_argument("--events", type=int, default=500_000, help="Timeline events (default: 500000)")
+    case.add_argument("--days", type=int, default=14, help="Date partitions (default: 14)")
+    case.add_argument("--parts", type=int, default=8, help="Files per partition (default: 8)")
+
+    feed = sub.add_parser("iocfeed", help="Synthetic threat-intel hash feed (CSV)")
+    feed.add_argument("output")
+    feed.add_argument("--rows", type=int, default=1_000_000, help="Samples (default: 1000000)")
+    feed.add_argument("--dup-share", type=float, default=0.2,
+                      help="Share of rows repeating an earlier sample (default: 0.2)")
+
+    args = parser.parse_args()
+
+    try:
+        if args.command == "thordb":
+            write_thordb(args.output, args.times_rows, args.stats_rows, args.skew, args.seed)
+        elif args.command == "textlog":
+            write_text_log(args.output, args.lines, args.severity_mix, args.seed)
+        elif args.command == "audittrail":
+            write_audit_trail(args.output, args.lines, args.bad_lines, args.seed)
+        elif args.command == "iocfeed":
+            write_ioc_feed(args.output, args.rows, args.dup_share, args.seed)
+        elif args.command == "lenscase":
+            write_lens_case(args.output, args.events, args.days, args.parts, args.seed)
+            print(f"Wrote {args.output}")
+            return
+        else:
+            write_json_log(args.output, args.lines, args.severity_mix, args.seed, args.style)
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"Wrote {args.output} ({os.path.getsize(args.output) / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
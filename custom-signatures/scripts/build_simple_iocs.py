@@ -0,0 +1,999 @@
+#!/usr/bin/env python3
+"""
+Build THOR simple IOC files from large threat-intel feeds, and check
+filename IOCs before they slow down a scan.
+
+hashes: reads CSV, NDJSON or existing `HASH;SCORE;COMMENT` files (plain or
+.gz) as a stream. Each hash is lowercased and typed by its length (MD5,
+SHA1, SHA256; a column or field named imphash marks Imphashes). Values
+that are not hex or have another length are rejected with a count per
+reason. Dedup runs in bounded memory: records are sorted in runs of
+--run-lines, spilled to temporary files, and the runs are merged. A hash
+listed several times keeps one line per type (an Imphash and an MD5 with
+the same value are different IOCs). If the scores differ, --on-conflict
+picks the score (default: the highest). The output is one set of files per
+hash type, sorted by hash, in shards of at most --shard-lines lines:
+
+    <prefix>-md5-hashes-iocs-001.txt, <prefix>-sha256-hashes-iocs-001.txt, ...
+
+Earlier shards of the same prefix that this run did not rewrite are
+removed, so a shrinking feed leaves no stale IOCs behind.
+
+filenames: reads `REGEX;SCORE[;FP_REGEX]` files. Every regex and FP regex
+is compiled. Constructs THOR's regex engine (Go, RE2 syntax) rejects are
+errors: lookarounds, backreferences, atomic groups, possessive quantifiers
+and repeat counts over 1000. Nested or overlapping quantifiers such as
+(a+)+ are flagged as backtracking risks. THOR's engine runs in linear time,
+but these patterns are ambiguous, slow in every backtracking engine that
+reads the same list, and usually a mistake. Each compiled pattern is then
+timed against a path corpus (--corpus, or a built-in synthetic one) with
+Python's re, which ranks patterns by cost; absolute times differ in THOR.
+The timing runs in a child process, so a pattern that backtracks for more
+than --timeout seconds is flagged and skipped instead of hanging the run.
+Slow patterns and positive-score patterns that match a large share of the
+corpus are flagged. --out writes the file without the failing lines and
+duplicates.
+
+Usage:
+    build_simple_iocs.py hashes <feed> [<feed> ...] [--out-dir DIR] [--prefix NAME]
+                         [--shard-lines N] [--run-lines N] [--on-conflict max|min|first|last]
+                         [--hash-field F] [--score-field F] [--comment-field F] [--score N]
+    build_simple_iocs.py filenames <iocs.txt> [...] [--corpus PATHS] [--timeout S] [--out FILE] [--strict]
+
+Exit codes:
+    0 = OK
+    1 = Input error
+    3 = Filename IOCs with errors (with --strict: also warnings)
+"""
+
+import argparse
+import glob
+import gzip
+import heapq
+import os
+import random
+import re
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from collections import Counter
+from functools import lru_cache
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    import json
+    json_loads = json.loads
+
+try:
+    # Python 3.11+
+    from re import _parser as sre_parse
+    from re._constants import MAXREPEAT
+except ImportError:
+    import sre_parse
+    from sre_constants import MAXREPEAT
+
+HASH_TYPES = {32: 'md5', 40: 'sha1', 64: 'sha256'}
+SHARD_TYPES = ('md5', 'sha1', 'sha256', 'imphash')
+HEX_RE = re.compile(r'[0-9a-f]+')
+DEFAULT_SCORE = 100
+DEFAULT_SHARD_LINES = 500_000
+# Sort run size: about 150 bytes per buffered record
+DEFAULT_RUN_LINES = 250_000
+# Runs merged at once; more runs are merged in several passes
+MERGE_FANIN = 64
+CONFLICT_POLICIES = ('max', 'min', 'first', 'last')
+
+# Feed column or field names that hold hashes: any of these name tokens
+HASH_NAME_TOKENS = {'md5', 'sha1', 'sha256', 'imphash', 'hash', 'hashes'}
+# ... unless the name also has one of these: hash_type, hash_algorithm, hash_count describe the hash
+HASH_META_TOKENS = {'type', 'algorithm', 'algo', 'kind', 'format', 'count', 'length', 'len'}
+VALUE_FIELDS = ('value', 'indicator', 'ioc')
+COMMENT_FIELDS = ('comment', 'description', 'signature', 'malware', 'threat', 'name')
+# Type hint iter_feed yields for records it cannot read (the comment holds the reason)
+INVALID_RECORD = 'invalid'
+
+# Go's regexp rejects larger repeat counts; above LARGE_REPEAT they are slow to compile and run
+GO_MAX_REPEAT = 1000
+LARGE_REPEAT = 100
+UNSUPPORTED_NODES = {
+    'ASSERT': "lookaround",
+    'ASSERT_NOT': "lookaround",
+    'GROUPREF': "backreference",
+    'GROUPREF_EXISTS': "conditional group",
+    'ATOMIC_GROUP': "atomic group",
+    'POSSESSIVE_REPEAT': "possessive quantifier",
+}
+REPEAT_NODES = ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT')
+# \Z is Python's end of text; Go spells it \z and rejects \Z
+PYTHON_END_RE = re.compile(r'(?<!\\)((?:\\\\)*)\\Z')
+GO_END_RE = re.compile(r'(?<!\\)((?:\\\\)*)\\z')
+DEFAULT_CORPUS_PATHS = 20_000
+SLOW_FACTOR = 10
+SLOW_FLOOR_US = 1.0
+# Seconds one pattern may take over the whole corpus
+DEFAULT_TIMEOUT = 2.0
+DEFAULT_BROAD_PCT = 1.0
+
+
+def open_text(path):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace', newline='')
+    return open(path, encoding='utf-8', errors='replace', newline='')
+
+
+def feed_format(path):
+    """'csv', 'tsv', 'ndjson' or 'iocs' (THOR simple IOC file) from the file name."""
+    name = path[:-3] if path.endswith('.gz') else path
+    ext = os.path.splitext(name)[1].lower()
+    if ext in ('.json', '.jsonl', '.ndjson'):
+        return 'ndjson'
+    if ext in ('.csv', '.tsv'):
+        return ext[1:]
+    return 'iocs'
+
+
+def name_tokens(name):
+    name = name.lower()
+    return set(re.split(r'[^a-z0-9]+', name)) | set(re.split(r'[^a-z0-9]+', name.replace('-', '')))
+
+
+def resolve_fields(names, hash_fields=None, score_field=None, comment_field=None):
+    """Map feed columns to ([(hash field, type hint)], score field, comment field).
+
+    Without explicit fields, every column whose name contains md5, sha1,
+    sha256, imphash or hash holds hashes, except names like hash_type that
+    describe the hash; failing that, the first of
+    value/indicator/ioc. The type hint is 'imphash' for imphash columns,
+    otherwise None (typed by length).
+    """
+    lowered = {name.lower(): name for name in names}
+    if not hash_fields:
+        hash_fields = [name for name in names
+                       if HASH_NAME_TOKENS & name_tokens(name) and not HASH_META_TOKENS & name_tokens(name)]
+        if not hash_fields:
+            hash_fields = [lowered[field] for field in VALUE_FIELDS if field in lowered][:1]
+    hashes = [(field, 'imphash' if 'imphash' in name_tokens(field) else None) for field in hash_fields]
+    if score_field is None:
+        score_field = lowered.get('score')
+    if comment_field is None:
+        comment_field = next((lowered[field] for field in COMMENT_FIELDS if field in lowered), None)
+    return hashes, score_field, comment_field
+
+
+def cell_text(value):
+    if value is None:
+        return ''
+    if isinstance(value, list):
+        return ', '.join(str(v) for v in value)
+    return str(value)
+
+
+def iter_feed(path, fmt, field_args):
+    """Yield (hash value, type hint, score, comment) for every hash in a feed."""
+    with open_text(path) as f:
+        if fmt == 'iocs':
+            for line in f:
+                line = line.strip()
+                if not line or line.startswith('#'):
+                    continue
+                parts = line.split(';', 2)
+                if len(parts) == 3:
+                    yield parts[0], None, parts[1], parts[2]
+                else:
+                    yield parts[0], None, None, parts[1] if len(parts) == 2 else ''
+        elif fmt == 'ndjson':
+            # Records of one feed usually share their keys: resolve once per key set
+            resolved = {}
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json_loads(line)
+                except ValueError:
+                    record = None
+                if not isinstance(record, dict):
+                    yield line.strip()[:80], INVALID_RECORD, None, "not a JSON object"
+                    continue
+                keys = tuple(record)
+                fields = resolved.get(keys)
+                if fields is None:
+                    fields = resolved[keys] = resolve_fields(keys, *field_args)
+                hashes, score_field, comment_field = fields
+                score = record.get(score_field) if score_field else None
+                comment = cell_text(record.get(comment_field)) if comment_field else ''
+                for field, hint in hashes:
+                    value = record.get(field)
+                    if value:
+                        yield cell_text(value), hint, score, comment
+        else:
+            import csv
+            reader = csv.reader((line for line in f if not line.startswith('#')),
+                                delimiter='\t' if fmt == 'tsv' else ',')
+            header = next(reader, None)
+            if header is None:
+                return
+            header = [name.strip() for name in header]
+            hashes, score_field, comment_field = resolve_fields(header, *field_args)
+            column = {name: i for i, name in enumerate(header)}
+            hash_columns = [(column[field], hint) for field, hint in hashes if field in column]
+            score_column = column.get(score_field)
+            comment_column = column.get(comment_field)
+            for row in reader:
+                width = len(row)
+                score = row[score_column] if score_column is not None and score_column < width else None
+                comment = row[comment_column] if comment_column is not None and comment_column < width else ''
+                for i, hint in hash_columns:
+                    if i < width and row[i]:
+                        yield row[i], hint, score, comment
+
+
+@lru_cache(maxsize=65536)
+def clean_comment(comment):
+    """One line, no column separators: THOR splits IOC lines at ';'."""
+    return ' '.join(comment.replace(';', ',').split())
+
+
+def write_run(lines, work_dir, index):
+    path = os.path.join(work_dir, f"run-{index:05d}.txt")
+    lines.sort()
+    with open(path, 'w', encoding='utf-8', newline='\n') as f:
+        f.writelines(lines)
+    return path
+
+
+def merge_runs(paths, work_dir, index):
+    """Merge sorted run files into one; return its path."""
+    files = [open(path, encoding='utf-8', newline='\n') for path in paths]
+    out_path = os.path.join(work_dir, f"merge-{index:05d}.txt")
+    try:
+        with open(out_path, 'w', encoding='utf-8', newline='\n') as out:
+            out.writelines(heapq.merge(*files))
+    finally:
+        for f in files:
+            f.close()
+    for path in paths:
+        os.remove(path)
+    return out_path
+
+
+def sorted_records(feeds, field_args, default_score, run_lines, work_dir, stats):
+    """Normalize every feed record; yield them as sorted "hash\\ttype\\tseq\\tIOC line" lines.
+
+    seq is the zero-padded input order, so records with the same hash and
+    type are adjacent and come out in input order. The IOC line is the finished HASH;SCORE;COMMENT output line.
+    Records are buffered up to run_lines, sorted and spilled to work_dir;
+    only a heap of one line per run is held while merging.
+    """
+    buffer = []
+    runs = []
+    seq = 0
+    rejected = stats['rejected']
+    examples = stats['examples']
+    for path in feeds:
+        fmt = feed_format(path)
+        default_comment = clean_comment(os.path.basename(path))
+        for value, hint, score, comment in iter_feed(path, fmt, field_args):
+            stats['records'] += 1
+            if hint is INVALID_RECORD:
+                reason = comment
+            else:
+                value = value.strip().lower()
+                htype = HASH_TYPES.get(len(value))
+                if htype is None:
+                    reason = f"unsupported length {len(value)}" if HEX_RE.fullmatch(value) else "not hex"
+                elif not HEX_RE.fullmatch(value):
+                    reason = "not hex"
+                else:
+                    reason = None
+                    if score is None or score == '':
+                        score = default_score
+                    else:
+                        try:
+                            score = int(score)
+                        except (TypeError, ValueError):
+                            reason = "bad score"
+            if reason:
+                rejected[reason] += 1
+                if rejected[reason] <= 3:
+                    examples.append((reason, path, value))
+                continue
+            if hint:
+                htype = hint
+            comment = clean_comment(comment) if comment else default_comment
+            buffer.append(f"{value}\t{htype}\t{seq:012d}\t{value};{score};{comment}\n")
+            seq += 1
+            if len(buffer) >= run_lines:
+                runs.append(write_run(buffer, work_dir, len(runs)))
+                buffer = []
+    stats['runs'] = len(runs)
+    if not runs:
+        buffer.sort()
+        yield from buffer
+        return
+    if buffer:
+        runs.append(write_run(buffer, work_dir, len(runs)))
+        buffer = []
+    merges = 0
+    while len(runs) > MERGE_FANIN:
+        merged = []
+        for i in range(0, len(runs), MERGE_FANIN):
+            merged.append(merge_runs(runs[i:i + MERGE_FANIN], work_dir, merges))
+            merges += 1
+        runs = merged
+    files = [open(path, encoding='utf-8', newline='\n') for path in runs]
+    try:
+        yield from heapq.merge(*files)
+    finally:
+        for f in files:
+            f.close()
+
+
+def resolve(value, group, on_conflict, stats):
+    """Pick one (type, IOC line) from the records of a hash and type listed more than once."""
+    stats['duplicates'] += len(group) - 1
+    scores = [int(line.split(';', 2)[1]) for _, line in group]
+    if len(set(scores)) > 1:
+        stats['conflicted'] += 1
+        if len(stats['conflicts']) < 10:
+            stats['conflicts'].append((value, scores))
+    if on_conflict == 'max':
+        return group[scores.index(max(scores))]
+    if on_conflict == 'min':
+        return group[scores.index(min(scores))]
+    return group[-1] if on_conflict == 'last' else group[0]
+
+
+def dedup(lines, on_conflict, stats):
+    """Collapse equal hashes of the same type; yield (type, IOC line) in hash order."""
+    previous = None
+    group = []
+    for line in lines:
+        value, htype, _, ioc_line = line.split('\t', 3)
+        if (value, htype) != previous:
+            if len(group) == 1:
+                yield group[0]
+            elif group:
+                yield resolve(previous[0], group, on_conflict, stats)
+            previous = (value, htype)
+            group = [(htype, ioc_line)]
+        else:
+            group.append((htype, ioc_line))
+    if len(group) == 1:
+        yield group[0]
+    elif group:
+        yield resolve(previous[0], group, on_conflict, stats)
+
+
+class ShardWriter:
+    """Write lines to <stem>-001.txt, <stem>-002.txt, ... with at most shard_lines lines each."""
+
+    def __init__(self, out_dir, stem, shard_lines):
+        self.out_dir = out_dir
+        self.stem = stem
+        self.shard_lines = shard_lines
+        self.paths = []
+        self.lines = 0
+        self.f = None
+        self.count = 0
+
+    def write(self, line):
+        if self.f is None or self.count == self.shard_lines:
+            self.close()
+            self.paths.append(os.path.join(self.out_dir, f"{self.stem}-{len(self.paths) + 1:03d}.txt"))
+            self.f = open(self.paths[-1] + '.tmp', 'w', encoding='utf-8', newline='\n')
+            self.count = 0
+        self.f.write(line)
+        self.count += 1
+        self.lines += 1
+
+    def close(self):
+        if self.f is not None:
+            self.f.close()
+            os.replace(self.paths[-1] + '.tmp', self.paths[-1])
+            self.f = None
+
+
+def build_hashes(feeds, out_dir, prefix, shard_lines=DEFAULT_SHARD_LINES, run_lines=DEFAULT_RUN_LINES,
+                 on_conflict='max', field_args=(None, None, None), default_score=DEFAULT_SCORE, tmp_dir=None):
+    """Normalize, dedup and write hash IOC shards; return the statistics dict."""
+    stats = {'records': 0, 'rejected': Counter(), 'examples': [], 'runs': 0, 'duplicates': 0,
+             'conflicted': 0, 'conflicts': [], 'types': Counter(), 'written': []}
+    os.makedirs(out_dir, exist_ok=True)
+    work_dir = tempfile.mkdtemp(prefix='thor_iocs_', dir=tmp_dir)
+    writers = {}
+    try:
+        lines = sorted_records(feeds, field_args, default_score, run_lines, work_dir, stats)
+        for htype, ioc_line in dedup(lines, on_conflict, stats):
+            writer = writers.get(htype)
+            if writer is None:
+                writer = writers[htype] = ShardWriter(out_dir, f"{prefix}-{htype}-hashes-iocs", shard_lines)
+            writer.write(ioc_line)
+            stats['types'][htype] += 1
+    finally:
+        for writer in writers.values():
+            writer.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+    written = {path for writer in writers.values() for path in writer.paths}
+    stats['written'] = sorted(written)
+    stats['removed'] = []
+    # Exact shard names only: prefix "feed" must not touch the shards of prefix "feed-abuse"
+    shard_name = re.compile(re.escape(prefix) + rf"-(?:{'|'.join(SHARD_TYPES)})-hashes-iocs-\d{{3,}}\.txt")
+    for path in glob.glob(os.path.join(glob.escape(out_dir), f"{glob.escape(prefix)}-*-hashes-iocs-*.txt")):
+        if path not in written and shard_name.fullmatch(os.path.basename(path)):
+            os.remove(path)
+            stats['removed'].append(path)
+    return stats
+
+
+def run_hashes(args):
+    missing = [path for path in args.feeds if not os.path.isfile(path)]
+    if missing:
+        print(f"Error: feed not found: {', '.join(missing)}", file=sys.stderr)
+        sys.exit(1)
+    if args.shard_lines < 1 or args.run_lines < 1:
+        print("Error: --shard-lines and --run-lines must be positive", file=sys.stderr)
+        sys.exit(1)
+    field_args = (args.hash_field, args.score_field, args.comment_field)
+
+    start = time.perf_counter()
+    try:
+        stats = build_hashes(args.feeds, args.out_dir, args.prefix, args.shard_lines, args.run_lines,
+                             args.on_conflict, field_args, args.score, args.tmp_dir)
+    except OSError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    unique = sum(stats['types'].values())
+    rejected = sum(stats['rejected'].values())
+    print(f"Hash IOCs: {len(args.feeds)} feed(s) -> {args.out_dir}")
+    print(f"  Hashes read:  {stats['records']} in {elapsed:.2f}s "
+          f"({stats['records'] / elapsed if elapsed else 0.0:,.0f}/s, {stats['runs']} sort run(s) spilled)")
+    print(f"  Unique:       {unique} ({', '.join(f'{n} {t}' for t, n in stats['types'].most_common()) or 'none'})")
+    print(f"  Duplicates:   {stats['duplicates']} dropped, {stats['conflicted']} hash(es) with conflicting "
+          f"scores (kept: {args.on_conflict})")
+    print(f"  Rejected:     {rejected}")
+
+    if rejected:
+        print("\nRejected Values")
+        print("---------------")
+        for reason, count in stats['rejected'].most_common():
+            print(f"  {count:>10}  {reason}")
+        for reason, path, value in stats['examples']:
+            print(f"    {os.path.basename(path)}: {value!r} ({reason})")
+
+    if stats['conflicts']:
+        print("\nScore Conflicts (first 10)")
+        print("--------------------------")
+        for value, scores in stats['conflicts']:
+            print(f"  {value}: {', '.join(str(score) for score in scores)}")
+
+    print("\nOutput Files")
+    print("------------")
+    for path in stats['written']:
+        print(f"  {path}")
+    for path in stats['removed']:
+        print(f"  {path} (stale shard removed)")
+    if not stats['written']:
+        print("  none: no valid hashes")
+
+
+def char_union(a, b):
+    """Union of two character sets given as (negated, frozenset)."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    (a_neg, a_chars), (b_neg, b_chars) = a, b
+    if not a_neg and not b_neg:
+        return False, a_chars | b_chars
+    if a_neg and b_neg:
+        return True, a_chars & b_chars
+    negated, positive = (a_chars, b_chars) if a_neg else (b_chars, a_chars)
+    return True, negated - positive
+
+
+def chars_overlap(a, b):
+    if a is None or b is None:
+        return False
+    (a_neg, a_chars), (b_neg, b_chars) = a, b
+    if a_neg and b_neg:
+        return True
+    if not a_neg and not b_neg:
+        return bool(a_chars & b_chars)
+    negated, positive = (a_chars, b_chars) if a_neg else (b_chars, a_chars)
+    return bool(positive - negated)
+
+
+ANY_CHAR = (True, frozenset())
+DIGITS = frozenset(map(ord, '0123456789'))
+WORD_CHARS = frozenset(map(ord, 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_'))
+SPACE_CHARS = frozenset(map(ord, ' \t\n\r\f\v'))
+CATEGORY_CHARS = {
+    'CATEGORY_DIGIT': (False, DIGITS), 'CATEGORY_NOT_DIGIT': (True, DIGITS),
+    'CATEGORY_WORD': (False, WORD_CHARS), 'CATEGORY_NOT_WORD': (True, WORD_CHARS),
+    'CATEGORY_SPACE': (False, SPACE_CHARS), 'CATEGORY_NOT_SPACE': (True, SPACE_CHARS),
+}
+
+
+def node_chars(op, av):
+    """Characters a single-character node matches, or None for other nodes."""
+    name = op.name
+    if name == 'LITERAL':
+        return False, frozenset((av,))
+    if name == 'NOT_LITERAL':
+        return True, frozenset((av,))
+    if name == 'ANY':
+        return ANY_CHAR
+    if name == 'CATEGORY':
+        return CATEGORY_CHARS.get(av.name, ANY_CHAR)
+    if name == 'IN':
+        chars = (False, frozenset())
+        negate = False
+        for item_op, item_av in av:
+            item = item_op.name
+            if item == 'NEGATE':
+                negate = True
+            elif item == 'RANGE':
+                low, high = item_av
+                chars = char_union(chars, ANY_CHAR if high - low > 4096 else (False, frozenset(range(low, high + 1))))
+            else:
+                chars = char_union(chars, node_chars(item_op, item_av) or ANY_CHAR)
+        return (not chars[0], chars[1]) if negate else chars
+    return None
+
+
+def consumed_chars(items):
+    """Every character items can consume (None if they match only empty strings)."""
+    chars = None
+    for op, av in items:
+        name = op.name
+        if name in REPEAT_NODES:
+            chars = char_union(chars, consumed_chars(av[2]))
+        elif name == 'SUBPATTERN':
+            chars = char_union(chars, consumed_chars(av[-1]))
+        elif name == 'ATOMIC_GROUP':
+            chars = char_union(chars, consumed_chars(av))
+        elif name == 'BRANCH':
+            for branch in av[1]:
+                chars = char_union(chars, consumed_chars(branch))
+        elif name not in ('AT', 'ASSERT', 'ASSERT_NOT'):
+            chars = char_union(chars, node_chars(op, av) or ANY_CHAR)
+    return chars
+
+
+def first_chars(items):
+    """Characters a match of items can start with (None if only the empty string)."""
+    chars = None
+    for op, av in items:
+        name = op.name
+        if name in ('AT', 'ASSERT', 'ASSERT_NOT'):
+            continue
+        if name in REPEAT_NODES:
+            chars = char_union(chars, first_chars(av[2]))
+            if av[0] > 0:
+                return chars
+            continue
+        if name == 'SUBPATTERN':
+            return char_union(chars, first_chars(av[-1]))
+        if name == 'BRANCH':
+            for branch in av[1]:
+                chars = char_union(chars, first_chars(branch))
+            return chars
+        return char_union(chars, node_chars(op, av) or ANY_CHAR)
+    return chars
+
+
+def trailing_repeat_chars(items):
+    """Characters consumed by repeats (max > 1) a match of items can end with."""
+    chars = None
+    for op, av in reversed(items):
+        name = op.name
+        if name in ('AT', 'ASSERT', 'ASSERT_NOT'):
+            continue
+        if name in REPEAT_NODES:
+            low, high, body = av
+            if high > 1:
+                chars = char_union(chars, consumed_chars(body))
+            else:
+                chars = char_union(chars, trailing_repeat_chars(body))
+            if low == 0:
+                continue
+            return chars
+        if name == 'SUBPATTERN':
+            return char_union(chars, trailing_repeat_chars(av[-1]))
+        return chars
+    return chars
+
+
+def scan_tree(items, issues):
+    """Collect (severity, message) issues of a parsed regex into the issues set."""
+    for op, av in items:
+        name = op.name
+        if name in UNSUPPORTED_NODES:
+            issues.add(('error', f"{UNSUPPORTED_NODES[name]} is not supported by THOR's regex engine"))
+        if name in REPEAT_NODES:
+            low, high, body = av
+            if high != MAXREPEAT and high > GO_MAX_REPEAT:
+                issues.add(('error', f"repeat count {high} is over {GO_MAX_REPEAT} (rejected by THOR)"))
+            elif high != MAXREPEAT and high > LARGE_REPEAT:
+                issues.add(('warning', f"large counted repetition {{{low},{high}}}"))
+            if high > 1:
+                inner = body
+                while len(inner) == 1 and inner[0][0].name == 'SUBPATTERN':
+                    inner = inner[0][1][-1]
+                if chars_overlap(trailing_repeat_chars(inner), first_chars(inner)):
+                    issues.add(('backtracking', "nested quantifier, e.g. (a+)+: backtracking risk"))
+                elif len(inner) == 1 and inner[0][0].name == 'BRANCH':
+                    starts = [first_chars(branch) for branch in inner[0][1][1]]
+                    if any(chars_overlap(a, b) for i, a in enumerate(starts) for b in starts[i + 1:]):
+                        issues.add(('backtracking', "repeated alternatives that overlap, e.g. (a|ab)+: "
+                                                    "backtracking risk"))
+            scan_tree(body, issues)
+        elif name == 'SUBPATTERN':
+            scan_tree(av[-1], issues)
+        elif name == 'BRANCH':
+            for branch in av[1]:
+                scan_tree(branch, issues)
+        elif name in ('ASSERT', 'ASSERT_NOT'):
+            scan_tree(av[1], issues)
+        elif name == 'ATOMIC_GROUP':
+            scan_tree(av, issues)
+        elif name == 'GROUPREF_EXISTS':
+            for branch in av[1:]:
+                if branch is not None:
+                    scan_tree(branch, issues)
+
+
+def check_regex(pattern):
+    """Compile a THOR filename IOC regex; return (compiled or None, sorted issues).
+
+    Go syntax is translated where Python differs: \\z becomes \\Z, and an
+    inline (?i) after the start makes the whole pattern case-insensitive
+    (Go applies it from that point on). Plain strings without regex syntax
+    match case-insensitively, as in THOR.
+    """
+    issues = set()
+    if PYTHON_END_RE.search(pattern):
+        issues.add(('error', "\\Z is not supported by THOR's regex engine (use \\z)"))
+    python_pattern = GO_END_RE.sub(r'\1\\Z', pattern)
+    if '(?i)' in python_pattern[4:]:
+        python_pattern = '(?i)' + python_pattern.replace('(?i)', '')
+    try:
+        tree = sre_parse.parse(python_pattern)
+    except (re.error, OverflowError, RecursionError) as e:
+        return None, [('error', f"does not compile: {e}")]
+    scan_tree(tree, issues)
+    issues = sorted(issues)
+    if any(severity == 'error' for severity, _ in issues):
+        return None, issues
+    plain = all(op.name == 'LITERAL' for op, _ in tree)
+    return re.compile(python_pattern, re.IGNORECASE if plain else 0), issues
+
+
+class FilenameIOC:
+    __slots__ = ('source', 'lineno', 'regex', 'score', 'fp_regex', 'compiled', 'fp_compiled', 'issues',
+                 'cost_us', 'matches')
+
+    def __init__(self, source, lineno, regex, score, fp_regex):
+        self.source = source
+        self.lineno = lineno
+        self.regex = regex
+        self.score = score
+        self.fp_regex = fp_regex
+        self.compiled = self.fp_compiled = None
+        self.issues = []
+        self.cost_us = None
+        self.matches = None
+
+    @property
+    def location(self):
+        return f"{os.path.basename(self.source)}:{self.lineno}"
+
+    def severities(self):
+        return {severity for severity, _ in self.issues}
+
+
+def read_filename_iocs(path):
+    """Return (lines, entries): the raw lines and a FilenameIOC (or error string) per IOC line index."""
+    with open_text(path) as f:
+        lines = f.read().splitlines()
+    entries = {}
+    for i, line in enumerate(lines):
+        text = line.strip()
+        if not text or text.startswith('#'):
+            continue
+        parts = text.split(';')
+        if len(parts) not in (2, 3):
+            entries[i] = f"expected REGEX;SCORE[;FP_REGEX], got {len(parts)} column(s)"
+            continue
+        try:
+            score = int(parts[1])
+        except ValueError:
+            entries[i] = f"score {parts[1]!r} is not an integer"
+            continue
+        entries[i] = FilenameIOC(path, i + 1, parts[0], score, parts[2] if len(parts) == 3 and parts[2] else None)
+    return lines, entries
+
+
+def synthetic_corpus(count=DEFAULT_CORPUS_PATHS, seed=42):
+    """Windows and Linux paths of the kind THOR's Filescan sees, plus a few very long ones."""
+    rng = random.Random(seed)
+    users = [f"user{i}" for i in range(1, 30)] + ['Administrator', 'Public', 'svc_backup']
+    windows_dirs = [
+        "C:\\Windows\\System32", "C:\\Windows\\SysWOW64", "C:\\Windows\\System32\\drivers",
+        "C:\\Windows\\WinSxS\\amd64_microsoft-windows-servicingstack_31bf3856ad364e35_10.0.19041.1",
+        "C:\\Windows\\Temp", "C:\\Program Files\\Common Files\\microsoft shared", "C:\\Program Files (x86)\\Google",
+        "C:\\ProgramData\\Microsoft\\Windows Defender\\Definition Updates", "C:\\Users\\{user}\\AppData\\Local\\Temp",
+        "C:\\Users\\{user}\\AppData\\Roaming\\Microsoft\\Windows\\Start Menu\\Programs\\Startup",
+        "C:\\Users\\{user}\\Downloads", "C:\\Users\\{user}\\Documents\\Projects", "D:\\Backup\\{user}",
+    ]
+    linux_dirs = ["/usr/bin", "/usr/lib/x86_64-linux-gnu", "/etc/systemd/system", "/var/log", "/tmp",
+                  "/home/{user}/.cache/pip", "/home/{user}/.local/share", "/opt/app/lib"]
+    stems = ["svchost", "explorer", "setup", "update", "report_2024", "nc", "psexec", "chrome", "libssl", "data",
+             "invoice", "backup", "readme", "install", "config", "agent", "msedge", "python3", "run", "tmp1234"]
+    extensions = [".exe", ".dll", ".sys", ".ps1", ".bat", ".txt", ".log", ".tmp", ".zip", ".so", ".py", ".js", ""]
+    corpus = []
+    for i in range(count):
+        if i % 100 == 99:
+            # Deep paths near MAX_PATH: where backtracking and leading wildcards hurt most
+            parts = [rng.choice(stems) + "_" + "a" * rng.randint(5, 30) for _ in range(rng.randint(8, 12))]
+            corpus.append("C:\\Users\\" + rng.choice(users) + "\\" + "\\".join(parts) + rng.choice(extensions))
+            continue
+        linux = rng.random() < 0.15
+        directory = rng.choice(linux_dirs if linux else windows_dirs).format(user=rng.choice(users))
+        name = rng.choice(stems) + (str(rng.randint(1, 99)) if rng.random() < 0.3 else "") + rng.choice(extensions)
+        corpus.append(f"{directory}{'/' if linux else chr(92)}{name}")
+    return corpus
+
+
+def load_corpus(path, limit):
+    with open_text(path) as f:
+        corpus = [line.rstrip('\r\n') for line in f if line.strip()]
+    if limit and len(corpus) > limit:
+        corpus = random.Random(42).sample(corpus, limit)
+    return corpus
+
+
+def timing_worker(conn, patterns, corpus):
+    """Child process: send (us per path, matches) for each (regex, FP regex) in turn."""
+    for compiled, fp_compiled in patterns:
+        search = compiled.search
+        start = time.perf_counter()
+        hits = [path for path in corpus if search(path)]
+        if fp_compiled is not None and hits:
+            fp_search = fp_compiled.search
+            hits = [path for path in hits if not fp_search(path)]
+        conn.send(((time.perf_counter() - start) / len(corpus) * 1e6, len(hits)))
+    conn.close()
+
+
+def time_iocs(iocs, corpus, timeout=DEFAULT_TIMEOUT):
+    """Time each IOC's regex (and FP regex on its matches) over corpus; sets cost_us and matches.
+
+    The searches run in a child process, because a backtracking regex
+    cannot be interrupted. A pattern that takes longer than timeout seconds
+    is flagged, the child is killed and a new one continues with the next
+    pattern.
+    """
+    import multiprocessing
+    pending = list(iocs)
+    while pending:
+        receiver, sender = multiprocessing.Pipe(duplex=False)
+        worker = multiprocessing.Process(target=timing_worker, daemon=True,
+                                         args=(sender, [(ioc.compiled, ioc.fp_compiled) for ioc in pending], corpus))
+        worker.start()
+        sender.close()
+        done = 0
+        try:
+            for ioc in pending:
+                if not receiver.poll(timeout):
+                    break
+                ioc.cost_us, ioc.matches = receiver.recv()
+                done += 1
+        except EOFError:
+            pass
+        finally:
+            worker.kill()
+            worker.join()
+            receiver.close()
+        if done < len(pending):
+            pending[done].issues.append(('backtracking', f"did not finish within {timeout:g}s on the corpus: "
+                                                         "catastrophic backtracking"))
+        pending = pending[done + 1:]
+
+
+def check_filename_iocs(paths, corpus, broad_pct=DEFAULT_BROAD_PCT, timeout=DEFAULT_TIMEOUT):
+    """Check and time the IOCs of paths; return (files, iocs, duplicates).
+
+    files is [(path, lines, entries)], iocs the unique FilenameIOC objects
+    and duplicates a list of (FilenameIOC, first occurrence).
+    """
+    files = []
+    iocs = []
+    duplicates = []
+    seen = {}
+    for path in paths:
+        lines, entries = read_filename_iocs(path)
+        files.append((path, lines, entries))
+        for entry in entries.values():
+            if isinstance(entry, str):
+                continue
+            key = (entry.regex, entry.fp_regex)
+            if key in seen:
+                duplicates.append((entry, seen[key]))
+                continue
+            seen[key] = entry
+            iocs.append(entry)
+            entry.compiled, entry.issues = check_regex(entry.regex)
+            if entry.fp_regex is not None:
+                entry.fp_compiled, fp_issues = check_regex(entry.fp_regex)
+                entry.issues += [(severity, f"FP regex: {message}") for severity, message in fp_issues]
+                if entry.fp_compiled is None:
+                    entry.compiled = None
+
+    if corpus:
+        time_iocs([ioc for ioc in iocs if ioc.compiled is not None], corpus, timeout)
+        timed = [ioc for ioc in iocs if ioc.cost_us is not None]
+        costs = [ioc.cost_us for ioc in timed]
+        if costs:
+            slow_us = max(SLOW_FLOOR_US, SLOW_FACTOR * statistics.median(costs))
+            for ioc in timed:
+                if ioc.cost_us > slow_us:
+                    ioc.issues.append(('warning', f"slow: {ioc.cost_us:.2f} us per path "
+                                                  f"(over {SLOW_FACTOR}x the median)"))
+                if ioc.score > 0 and ioc.matches * 100 > broad_pct * len(corpus):
+                    ioc.issues.append(('warning', f"broad: matches {ioc.matches} of {len(corpus)} corpus paths"))
+    return files, iocs, duplicates
+
+
+def run_filenames(args):
+    missing = [path for path in args.iocs if not os.path.isfile(path)]
+    if missing:
+        print(f"Error: IOC file not found: {', '.join(missing)}", file=sys.stderr)
+        sys.exit(1)
+    if args.out and any(os.path.abspath(args.out) == os.path.abspath(path) for path in args.iocs):
+        print("Error: --out must not overwrite an input", file=sys.stderr)
+        sys.exit(1)
+    if args.no_timing:
+        corpus, corpus_name = [], None
+    elif args.corpus:
+        try:
+            corpus = load_corpus(args.corpus, args.corpus_limit)
+        except OSError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            sys.exit(1)
+        corpus_name = args.corpus
+    else:
+        corpus, corpus_name = synthetic_corpus(args.corpus_limit or DEFAULT_CORPUS_PATHS), "synthetic"
+
+    start = time.perf_counter()
+    files, iocs, duplicates = check_filename_iocs(args.iocs, corpus, args.broad_pct, args.timeout)
+    elapsed = time.perf_counter() - start
+
+    malformed = [(path, i + 1, entry) for path, _, entries in files
+                 for i, entry in entries.items() if isinstance(entry, str)]
+    errors = [ioc for ioc in iocs if 'error' in ioc.severities()]
+    flagged = [ioc for ioc in iocs if ioc.issues and 'error' not in ioc.severities()]
+    timed = [ioc for ioc in iocs if ioc.cost_us is not None]
+
+    print(f"Filename IOCs: {len(iocs) + len(duplicates) + len(malformed)} line(s) in {len(files)} file(s), "
+          f"checked in {elapsed:.2f}s")
+    print(f"  Unique:       {len(iocs)} ({len(duplicates)} duplicate line(s))")
+    print(f"  Errors:       {len(errors) + len(malformed)} (dropped from --out)")
+    print(f"  Warnings:     {len(flagged)}")
+    if corpus:
+        total = sum(ioc.cost_us for ioc in timed)
+        print(f"  Timing:       {len(timed)} pattern(s) x {len(corpus)} path(s) ({corpus_name}): "
+              f"{total:.1f} us per path for the whole set (Python re)")
+
+    if malformed or errors:
+        print("\nErrors")
+        print("------")
+        for path, lineno, message in malformed:
+            print(f"  {os.path.basename(path)}:{lineno}: {message}")
+        for ioc in errors:
+            print(f"  {ioc.location}: {ioc.regex}")
+            for severity, message in ioc.issues:
+                if severity == 'error':
+                    print(f"    {message}")
+
+    if flagged:
+        print("\nWarnings")
+        print("--------")
+        for ioc in flagged:
+            print(f"  {ioc.location}: {ioc.regex}")
+            for _, message in ioc.issues:
+                print(f"    {message}")
+
+    if duplicates:
+        print("\nDuplicates")
+        print("----------")
+        for ioc, first in duplicates[:20]:
+            score_note = "" if ioc.score == first.score else f" (score {ioc.score} vs {first.score})"
+            print(f"  {ioc.location}: same as {first.location}{score_note}")
+        if len(duplicates) > 20:
+            print(f"  ... and {len(duplicates) - 20} more")
+
+    if timed and args.top:
+        total = sum(ioc.cost_us for ioc in timed) or 1.0
+        print(f"\nSlowest Patterns (top {args.top})")
+        print("-" * len(f"Slowest Patterns (top {args.top})"))
+        print(f"  {'us/path':>8}  {'Share':>6}  {'Matches':>7}  Location  Pattern")
+        for ioc in sorted(timed, key=lambda ioc: -ioc.cost_us)[:args.top]:
+            print(f"  {ioc.cost_us:>8.2f}  {ioc.cost_us / total:>6.1%}  {ioc.matches:>7}  "
+                  f"{ioc.location}  {ioc.regex[:80]}")
+
+    failing = {id(ioc) for ioc in errors}
+    if args.strict:
+        failing |= {id(ioc) for ioc in flagged}
+    if args.out:
+        dropped = failing | {id(ioc) for ioc, _ in duplicates}
+        kept = 0
+        with open(args.out + '.tmp', 'w', encoding='utf-8', newline='\n') as out:
+            for _, lines, entries in files:
+                for i, line in enumerate(lines):
+                    entry = entries.get(i)
+                    if isinstance(entry, str) or id(entry) in dropped:
+                        continue
+                    kept += entry is not None
+                    out.write(line + '\n')
+        os.replace(args.out + '.tmp', args.out)
+        print(f"\nWrote {args.out} ({kept} IOC(s), {len(iocs) + len(duplicates) + len(malformed) - kept} dropped)")
+
+    if failing or malformed:
+        sys.exit(3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and check THOR simple IOC files")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    hashes = sub.add_parser("hashes", help="Normalize, dedup and shard hash IOCs from feeds")
+    hashes.add_argument("feeds", nargs='+', help="CSV/TSV, NDJSON or HASH;SCORE;COMMENT files (optionally .gz)")
+    hashes.add_argument("--out-dir", "-o", default=".", help="Output directory (default: current)")
+    hashes.add_argument("--prefix", default="feed", help="Output file name prefix (default: feed)")
+    hashes.add_argument("--shard-lines", type=int, default=DEFAULT_SHARD_LINES,
+                        help=f"Lines per output file (default: {DEFAULT_SHARD_LINES})")
+    hashes.add_argument("--run-lines", type=int, default=DEFAULT_RUN_LINES,
+                        help=f"Records sorted in memory before spilling a run (default: {DEFAULT_RUN_LINES})")
+    hashes.add_argument("--on-conflict", choices=CONFLICT_POLICIES, default='max',
+                        help="Score kept when a hash is listed with different scores (default: max)")
+    hashes.add_argument("--hash-field", action='append',
+                        help="Column/field holding hashes (repeatable; default: detect by name)")
+    hashes.add_argument("--score-field", help="Column/field holding the score (default: score)")
+    hashes.add_argument("--comment-field", help="Column/field holding the comment (default: detect by name)")
+    hashes.add_argument("--score", type=int, default=DEFAULT_SCORE,
+                        help=f"Score for records without one (default: {DEFAULT_SCORE})")
+    hashes.add_argument("--tmp-dir", help="Directory for sort runs (default: system temp)")
+
+    names = sub.add_parser("filenames", help="Check and time filename IOC regexes")
+    names.add_argument("iocs", nargs='+', help="Filename IOC files (REGEX;SCORE[;FP_REGEX])")
+    names.add_argument("--corpus", help="File with one path per line to time against (default: synthetic)")
+    names.add_argument("--corpus-limit", type=int, default=0,
+                       help=f"Paths sampled from the corpus (default: all; synthetic: {DEFAULT_CORPUS_PATHS})")
+    names.add_argument("--no-timing", action='store_true', help="Only compile and check, do not time")
+    names.add_argument("--broad-pct", type=float, default=DEFAULT_BROAD_PCT,
+                       help=f"Flag positive-score IOCs matching more of the corpus (default: {DEFAULT_BROAD_PCT}%%)")
+    names.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT,
+                       help=f"Seconds one pattern may take over the corpus (default: {DEFAULT_TIMEOUT:g})")
+    names.add_argument("--top", type=int, default=20, help="Slowest patterns to list (default: 20)")
+    names.add_argument("--strict", action='store_true', help="Treat warnings as errors (exit 3, drop from --out)")
+    names.add_argument("--out", metavar="FILE", help="Write the IOC file without failing and duplicate lines")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "hashes":
+            run_hashes(args)
+        else:
+            run_filenames(args)
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+Shared ThorDB analysis core.
+
+One read-only connection answers every `times` report the thor-db scripts
+print: top-N by total, top-N by average, category totals and average-time
+threshold filters. Category totals are computed once and shared, and all
+threshold filters are answered by a single scan instead of one per category.
+
+When thor_db_prepare.py has built an up-to-date indexed copy next to the
+ThorDB, connect_analysis() opens that copy instead. The WHERE/ORDER BY
+expressions below must stay textually identical to the prepared expression
+indexes, otherwise SQLite will not use them.
+
+Row tuples match the columns of the SQL queries in reference/queries.md.
+"""
+
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+PREPARED_SUFFIX = ".prepared.db"
+PREPARED_META_TABLE = "thor_prepared"
+
+
+def connect_readonly(dbpath, immutable=False):
+    """Open a ThorDB read-only; immutable=1 also skips locking (snapshots only)."""
+    uri = Path(dbpath).resolve().as_uri() + "?mode=ro"
+    if immutable:
+        uri += "&immutable=1"
+    return sqlite3.connect(uri, uri=True)
+
+
+def has_table(cursor, name):
+    """True if the database has a table called name."""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (name,))
+    return cursor.fetchone() is not None
+
+
+def prepared_path(dbpath):
+    """Default location of the prepared copy: thor10.db -> thor10.prepared.db."""
+    dbpath = Path(dbpath)
+    return dbpath.with_name(dbpath.stem + PREPARED_SUFFIX)
+
+
+def source_signature(dbpath):
+    """Size/mtime of the DB and its WAL; changes whenever THOR writes."""
+    parts = []
+    for path in (Path(dbpath), Path(str(dbpath) + "-wal")):
+        if path.exists():
+            st = os.stat(path)
+            parts.append(f"{st.st_size}:{st.st_mtime_ns}")
+    return "/".join(parts)
+
+
+def find_prepared(dbpath):
+    """Return the prepared copy of dbpath if it exists and is current, else None."""
+    candidate = prepared_path(dbpath)
+    if not candidate.exists():
+        return None
+    try:
+        conn = connect_readonly(candidate)
+        try:
+            row = conn.execute(f"SELECT value FROM {PREPARED_META_TABLE} WHERE key = 'source_signature'").fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return None
+    if not row or row[0] != source_signature(dbpath):
+        print(f"Note: ignoring stale prepared copy {candidate} (re-run thor_db_prepare.py)", file=sys.stderr)
+        return None
+    return candidate
+
+
+def connect_analysis(dbpath):
+    """Connect for reporting; prefer a current prepared copy. Returns (conn, path used)."""
+    prepared = find_prepared(dbpath)
+    if prepared is not None:
+        print(f"Using prepared copy: {prepared}", file=sys.stderr)
+        return connect_readonly(prepared, immutable=True), prepared
+    return connect_readonly(dbpath), Path(dbpath)
+
+
+class TimesAnalysis:
+    """Report queries over ThorDB `times` sharing one cursor and cached results."""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self._category_totals = None
+
+    def top_by_total(self, limit=20, category=None):
+        """Rows with the highest total duration: (category, element, count, seconds_total, seconds_avg)."""
+        where, params = ("WHERE category = ?", (category,)) if category else ("", ())
+        self.cursor.execute(f"""
+            SELECT category, element, count,
+                   duration/1e9 AS seconds_total,
+                   (duration*1.0/count)/1e9 AS seconds_avg
+            FROM times
+            {where}
+            ORDER BY duration DESC
+            LIMIT ?
+        """, params + (limit,))
+        return self.cursor.fetchall()
+
+    def top_by_average(self, limit=20, min_count=5):
+        """Rows with the highest average: (category, element, count, seconds_avg, seconds_total)."""
+        self.cursor.execute("""
+            SELECT category, element, count,
+                   (duration*1.0/count)/1e9 AS seconds_avg,
+                   duration/1e9 AS seconds_total
+            FROM times
+            WHERE count >= ?
+            ORDER BY (duration*1.0/count) DESC
+            LIMIT ?
+        """, (min_count, limit))
+        return self.cursor.fetchall()
+
+    def category_totals(self):
+        """(category, total_invocations, total_seconds) sorted by total time desc."""
+        if self._category_totals is None:
+            self.cursor.execute("""
+                SELECT category,
+                       SUM(count) AS total_invocations,
+                       SUM(duration)/1e9 AS total_seconds
+                FROM times
+                GROUP BY category
+                ORDER BY total_seconds DESC
+            """)
+            self._category_totals = self.cursor.fetchall()
+        return self._category_totals
+
+    def elements(self, category):
+        """All element names of one category (e.g. every YARA rule THOR timed)."""
+        self.cursor.execute("SELECT element FROM times WHERE category = ?", (category,))
+        return [element for element, in self.cursor]
+
+    def slower_than(self, thresholds):
+        """Elements whose average exceeds a per-category threshold, in one scan.
+
+        thresholds maps category -> seconds. Returns category -> list of
+        (element, count, seconds_total, seconds_avg), by total duration desc.
+        """
+        results = {category: [] for category in thresholds}
+        if not thresholds:
+            return results
+        clauses = " OR ".join(["(category = ? AND (duration*1.0/count)/1e9 > ?)"] * len(thresholds))
+        params = [value for item in thresholds.items() for value in item]
+        self.cursor.execute(f"""
+            SELECT category, element, count,
+                   duration/1e9 AS seconds_total,
+                   (duration*1.0/count)/1e9 AS seconds_avg
+            FROM times
+            WHERE {clauses}
+            ORDER BY duration DESC
+        """, params)
+        for category, *row in self.cursor:
+            results[category].append(tuple(row))
+        return results
@@ -1,125 +1,202 @@
 #!/usr/bin/env python3
 """
-Export ThorDB tables to CSV or JSON for sharing/analysis.
+Export ThorDB tables to CSV, JSON, NDJSON or Parquet for sharing/analysis.
+
+Rows are streamed from SQLite in fetchmany() batches, so memory stays flat
+regardless of table size. Parquet output requires pyarrow.
 
 Usage:
-    thor_db_export_csv.py <path_to_thor10.db> [--format csv|json] [--output-dir DIR]
+    thor_db_export_csv.py <path_to_thor10.db> [--format csv|json|ndjson|parquet] [--output-dir DIR]
+                          [--parallel] [--immutable]
 """
 
 import sqlite3
 import sys
 import argparse
-import json
-import csv
+import time
 from pathlib import Path
-from datetime import datetime
 
+from thor_db_analysis import connect_readonly
 
-def export_times_csv(cursor, output_path):
-    """Export times table to CSV."""
-    cursor.execute("""
-        SELECT category, element, count,
-               duration,
-               duration/1e9 AS seconds_total,
-               (duration*1.0/count)/1e9 AS seconds_avg
-        FROM times
-        ORDER BY duration DESC
-    """)
-    rows = cursor.fetchall()
+try:
+    import resource
+except ImportError:
+    resource = None
 
-    with open(output_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(['category', 'element', 'count', 'duration_ns', 'seconds_total', 'seconds_avg'])
-        writer.writerows(rows)
+BATCH_SIZE = 10000
 
-    return len(rows)
+# json, csv and concurrent.futures are imported by the writers that need them,
+# so each format only pays for its own modules at startup
 
+# Flat records are laid out exactly like json.dump(list, indent=2) would nest
+# them inside the array, but through the C encoder (indent= forces pure Python)
+FLAT_RECORD_SEPARATORS = (',\n    ', ': ')
 
-def export_stats_csv(cursor, output_path):
-    """Export stats table to CSV."""
-    cursor.execute("""
-        SELECT module, element, started,
-               datetime(started, 'unixepoch') AS start_time,
-               duration
-        FROM stats
-        ORDER BY started DESC
-    """)
-    rows = cursor.fetchall()
+TIMES_QUERY = """
+    SELECT category, element, count,
+           duration,
+           duration/1e9 AS seconds_total,
+           (duration*1.0/count)/1e9 AS seconds_avg
+    FROM times
+    ORDER BY duration DESC
+"""
+TIMES_COLUMNS = ['category', 'element', 'count', 'duration_ns', 'seconds_total', 'seconds_avg']
+TIMES_TYPES = ['string', 'string', 'int64', 'int64', 'float64', 'float64']
+
+STATS_CSV_QUERY = """
+    SELECT module, element, started,
+           datetime(started, 'unixepoch') AS start_time,
+           duration
+    FROM stats
+    ORDER BY started DESC
+"""
+STATS_QUERY = """
+    SELECT module, element, started, duration
+    FROM stats
+    ORDER BY started DESC
+"""
+STATS_COLUMNS = ['module', 'element', 'started_unix', 'start_time', 'duration_sec']
+STATS_TYPES = ['string', 'string', 'int64', 'string', 'int64']
 
-    with open(output_path, 'w', newline='', encoding='utf-8') as f:
-        writer = csv.writer(f)
-        writer.writerow(['module', 'element', 'started_unix', 'start_time', 'duration_sec'])
-        writer.writerows(rows)
+TBL_QUERY = "SELECT key, value FROM tbl ORDER BY key"
+TBL_COLUMNS = ['key', 'value']
+TBL_TYPES = ['string', 'string']
 
-    return len(rows)
 
+def import_pyarrow():
+    """Import pyarrow on demand (it is slow to load); return None if not installed."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def iter_batches(cursor, query, params=(), batch_size=BATCH_SIZE):
+    """Execute query and yield lists of rows, batch_size at a time."""
+    cursor.execute(query, params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield rows
+
+
+def stats_record(r):
+    """Convert a STATS_QUERY row to an export dict."""
+    return {
+        'module': r[0],
+        'element': r[1],
+        'started_unix': r[2],
+        'start_time': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(r[2])) if r[2] else None,
+        'duration_sec': r[3]
+    }
 
-def export_tbl_csv(cursor, output_path):
-    """Export tbl (metadata) table to CSV."""
-    cursor.execute("SELECT key, value FROM tbl ORDER BY key")
-    rows = cursor.fetchall()
 
+def write_csv(cursor, query, columns, output_path):
+    """Stream query results to a CSV file with a header row."""
+    import csv
+    count = 0
     with open(output_path, 'w', newline='', encoding='utf-8') as f:
         writer = csv.writer(f)
-        writer.writerow(['key', 'value'])
-        writer.writerows(rows)
+        writer.writerow(columns)
+        for rows in iter_batches(cursor, query):
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def write_json_array(records, output_path):
+    """Stream flat dicts as a JSON array; output is identical to json.dump(list, indent=2)."""
+    import json
+    encode = json.JSONEncoder(separators=FLAT_RECORD_SEPARATORS).encode
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(",\n  {\n    " if count else "[\n  {\n    ")
+            f.write(encode(record)[1:-1])
+            f.write("\n  }")
+            count += 1
+        f.write("\n]" if count else "[]")
+    return count
+
+
+def write_ndjson(records, output_path):
+    """Write one compact JSON object per line."""
+    import json
+    count = 0
+    with open(output_path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, separators=(',', ':')))
+            f.write("\n")
+            count += 1
+    return count
 
-    return len(rows)
 
+def write_parquet(batches, columns, types, output_path):
+    """Write row batches to a Parquet file, one row group per batch."""
+    pyarrow = import_pyarrow()
+    if pyarrow is None:
+        raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
 
-def export_times_json(cursor, output_path):
-    """Export times table to JSON."""
-    cursor.execute("""
-        SELECT category, element, count,
-               duration,
-               duration/1e9 AS seconds_total,
-               (duration*1.0/count)/1e9 AS seconds_avg
-        FROM times
-        ORDER BY duration DESC
-    """)
-    rows = cursor.fetchall()
+    schema = pyarrow.schema([(c, getattr(pyarrow, t)()) for c, t in zip(columns, types)])
+    count = 0
+    with pyarrow.parquet.ParquetWriter(str(output_path), schema) as writer:
+        for rows in batches:
+            arrays = [list(column) for column in zip(*rows)]
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+            count += len(rows)
+    return count
 
-    data = [{
-        'category': r[0],
-        'element': r[1],
-        'count': r[2],
-        'duration_ns': r[3],
-        'seconds_total': r[4],
-        'seconds_avg': r[5]
-    } for r in rows]
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2)
+def time_records(cursor):
+    for rows in iter_batches(cursor, TIMES_QUERY):
+        for r in rows:
+            yield dict(zip(TIMES_COLUMNS, r))
 
-    return len(data)
 
+def stats_records(cursor):
+    for rows in iter_batches(cursor, STATS_QUERY):
+        for r in rows:
+            yield stats_record(r)
 
-def export_stats_json(cursor, output_path):
-    """Export stats table to JSON."""
-    cursor.execute("""
-        SELECT module, element, started, duration
-        FROM stats
-        ORDER BY started DESC
-    """)
-    rows = cursor.fetchall()
 
-    data = [{
-        'module': r[0],
-        'element': r[1],
-        'started_unix': r[2],
-        'start_time': datetime.utcfromtimestamp(r[2]).isoformat() if r[2] else None,
-        'duration_sec': r[3]
-    } for r in rows]
+def tbl_records(cursor):
+    for rows in iter_batches(cursor, TBL_QUERY):
+        for r in rows:
+            yield dict(zip(TBL_COLUMNS, r))
 
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(data, f, indent=2)
 
-    return len(data)
+def export_times_csv(cursor, output_path):
+    """Export times table to CSV."""
+    return write_csv(cursor, TIMES_QUERY, TIMES_COLUMNS, output_path)
+
+
+def export_stats_csv(cursor, output_path):
+    """Export stats table to CSV."""
+    return write_csv(cursor, STATS_CSV_QUERY, STATS_COLUMNS, output_path)
+
+
+def export_tbl_csv(cursor, output_path):
+    """Export tbl (metadata) table to CSV."""
+    return write_csv(cursor, TBL_QUERY, TBL_COLUMNS, output_path)
+
+
+def export_times_json(cursor, output_path):
+    """Export times table to JSON."""
+    return write_json_array(time_records(cursor), output_path)
+
+
+def export_stats_json(cursor, output_path):
+    """Export stats table to JSON."""
+    return write_json_array(stats_records(cursor), output_path)
 
 
 def export_tbl_json(cursor, output_path):
     """Export tbl (metadata) table to JSON."""
-    cursor.execute("SELECT key, value FROM tbl ORDER BY key")
+    import json
+    cursor.execute(TBL_QUERY)
     rows = cursor.fetchall()
 
     data = {r[0]: r[1] for r in rows}
@@ -130,11 +207,91 @@ def export_tbl_json(cursor, output_path):
     return len(data)
 
 
+def export_times_ndjson(cursor, output_path):
+    """Export times table to newline-delimited JSON."""
+    return write_ndjson(time_records(cursor), output_path)
+
+
+def export_stats_ndjson(cursor, output_path):
+    """Export stats table to newline-delimited JSON."""
+    return write_ndjson(stats_records(cursor), output_path)
+
+
+def export_tbl_ndjson(cursor, output_path):
+    """Export tbl (metadata) table to newline-delimited JSON."""
+    return write_ndjson(tbl_records(cursor), output_path)
+
+
+def export_times_parquet(cursor, output_path):
+    """Export times table to Parquet."""
+    return write_parquet(iter_batches(cursor, TIMES_QUERY), TIMES_COLUMNS, TIMES_TYPES, output_path)
+
+
+def export_stats_parquet(cursor, output_path):
+    """Export stats table to Parquet."""
+    batches = ([tuple(stats_record(r).values()) for r in rows] for rows in iter_batches(cursor, STATS_QUERY))
+    return write_parquet(batches, STATS_COLUMNS, STATS_TYPES, output_path)
+
+
+def export_tbl_parquet(cursor, output_path):
+    """Export tbl (metadata) table to Parquet; values are stored as text."""
+    batches = ([(k, None if v is None else str(v)) for k, v in rows] for rows in iter_batches(cursor, TBL_QUERY))
+    return write_parquet(batches, TBL_COLUMNS, TBL_TYPES, output_path)
+
+
+# (table, format) -> exporter(cursor, output_path) returning the row count
+EXPORTERS = {
+    ('times', 'csv'): export_times_csv,
+    ('stats', 'csv'): export_stats_csv,
+    ('tbl', 'csv'): export_tbl_csv,
+    ('times', 'json'): export_times_json,
+    ('stats', 'json'): export_stats_json,
+    ('tbl', 'json'): export_tbl_json,
+    ('times', 'ndjson'): export_times_ndjson,
+    ('stats', 'ndjson'): export_stats_ndjson,
+    ('tbl', 'ndjson'): export_tbl_ndjson,
+    ('times', 'parquet'): export_times_parquet,
+    ('stats', 'parquet'): export_stats_parquet,
+    ('tbl', 'parquet'): export_tbl_parquet,
+}
+
+OUTPUT_NAMES = {
+    'times': ('thor_times', 'rows'),
+    'stats': ('thor_stats', 'rows'),
+    'tbl': ('thor_metadata', 'entries'),
+}
+
+
+def peak_rss_mb(who=None):
+    """Peak resident set size in MB (this process, or RUSAGE_CHILDREN), or None."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF if who is None else who).ru_maxrss
+    # Linux reports KB, macOS reports bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def export_table(dbpath, table, ext, out_path, immutable=False):
+    """Export one table over its own read-only connection; return (table, count, seconds)."""
+    started = time.perf_counter()
+    conn = connect_readonly(dbpath, immutable)
+    try:
+        count = EXPORTERS[(table, ext)](conn.cursor(), out_path)
+    finally:
+        conn.close()
+    return table, count, time.perf_counter() - started
+
+
 def main():
-    parser = argparse.ArgumentParser(description="Export ThorDB to CSV or JSON")
+    parser = argparse.ArgumentParser(description="Export ThorDB to CSV, JSON, NDJSON or Parquet")
     parser.add_argument("dbpath", help="Path to thor10.db or thor11.db")
-    parser.add_argument("--format", choices=['csv', 'json'], default='csv', help="Output format (default: csv)")
+    parser.add_argument("--format", choices=['csv', 'json', 'ndjson', 'parquet'], default='csv',
+                        help="Output format (default: csv)")
     parser.add_argument("--output-dir", "-o", default=".", help="Output directory (default: current)")
+    parser.add_argument("--parallel", action="store_true",
+                        help="Export tables concurrently, one process and read-only connection per table")
+    parser.add_argument("--immutable", action="store_true",
+                        help="Open with immutable=1 (no locking); only for copied/snapshot databases")
     args = parser.parse_args()
 
     dbpath = Path(args.dbpath)
@@ -142,14 +299,21 @@ def main():
         print(f"Error: Database not found: {dbpath}", file=sys.stderr)
         sys.exit(1)
 
+    if args.format == 'parquet' and import_pyarrow() is None:
+        print("Error: --format parquet requires pyarrow (pip install pyarrow)", file=sys.stderr)
+        sys.exit(1)
+
     output_dir = Path(args.output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
 
     ext = args.format
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
 
     try:
-        conn = sqlite3.connect(str(dbpath))
+        if args.parallel or args.immutable:
+            conn = connect_readonly(dbpath, args.immutable)
+        else:
+            conn = sqlite3.connect(str(dbpath))
         cursor = conn.cursor()
 
         # Check available tables
@@ -161,32 +325,41 @@ def main():
         print(f"Output directory: {output_dir}")
         print()
 
-        if 'times' in tables:
-            out_path = output_dir / f"thor_times_{timestamp}.{ext}"
-            if ext == 'csv':
-                count = export_times_csv(cursor, out_path)
+        jobs = []
+        for table in ('times', 'stats', 'tbl'):
+            if table in tables:
+                prefix, _ = OUTPUT_NAMES[table]
+                jobs.append((table, output_dir / f"{prefix}_{timestamp}.{ext}"))
+        out_paths = dict(jobs)
+
+        def report(done, table, count, elapsed):
+            _, unit = OUTPUT_NAMES[table]
+            progress = f"[{done}/{len(jobs)}] " if args.parallel else ""
+            print(f"  {progress}{table + ':':<6} {count} {unit} -> {out_paths[table]} ({elapsed:.2f}s)")
+
+        started = time.perf_counter()
+        if args.parallel:
+            from concurrent.futures import ProcessPoolExecutor, as_completed
+            conn.close()
+            with ProcessPoolExecutor(max_workers=len(jobs) or 1) as pool:
+                futures = [pool.submit(export_table, dbpath, table, ext, out_path, args.immutable)
+                           for table, out_path in jobs]
+                for done, future in enumerate(as_completed(futures), 1):
+                    report(done, *future.result())
+        else:
+            for done, (table, out_path) in enumerate(jobs, 1):
+                table_started = time.perf_counter()
+                count = EXPORTERS[(table, ext)](cursor, out_path)
+                report(done, table, count, time.perf_counter() - table_started)
+            conn.close()
+
+        print(f"\nExport complete in {time.perf_counter() - started:.2f}s.")
+        peak = peak_rss_mb()
+        if peak is not None:
+            if args.parallel:
+                print(f"Peak RSS: {peak:.1f} MB (largest worker: {peak_rss_mb(resource.RUSAGE_CHILDREN):.1f} MB)")
             else:
-                count = export_times_json(cursor, out_path)
-            print(f"  times: {count} rows -> {out_path}")
-
-        if 'stats' in tables:
-            out_path = output_dir / f"thor_stats_{timestamp}.{ext}"
-            if ext == 'csv':
-                count = export_stats_csv(cursor, out_path)
-            else:
-                count = export_stats_json(cursor, out_path)
-            print(f"  stats: {count} rows -> {out_path}")
-
-        if 'tbl' in tables:
-            out_path = output_dir / f"thor_metadata_{timestamp}.{ext}"
-            if ext == 'csv':
-                count = export_tbl_csv(cursor, out_path)
-            else:
-                count = export_tbl_json(cursor, out_path)
-            print(f"  tbl:   {count} entries -> {out_path}")
-
-        conn.close()
-        print("\nExport complete.")
+                print(f"Peak RSS: {peak:.1f} MB")
 
     except sqlite3.Error as e:
         print(f"SQLite error: {e}", file=sys.stderr)
@@ -0,0 +1,243 @@
+#!/usr/bin/env python3
+"""
+Aggregate ThorDB timing data across a fleet of thor10.db/thor11.db files.
+
+Merges `times` rows per (category, element) over all databases and reports
+the aggregate cost plus the distribution of per-host average time (p50/p95).
+Databases are read concurrently by a bounded thread pool. Per-element state
+is a fixed-accuracy log histogram, so memory does not grow with host count.
+
+Usage:
+    thor_db_fleet.py <db_or_dir_or_glob>... [--top N] [--category CAT] [--workers N]
+"""
+
+import sqlite3
+import sys
+import argparse
+import glob
+import math
+import os
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+
+from thor_db_analysis import PREPARED_SUFFIX, connect_readonly
+from thor_db_snapshots import DEFAULT_STORE
+from thor_db_top_times import print_table
+
+DB_GLOB = "*.db"
+
+
+class LogHistogram:
+    """Quantile sketch with bounded relative error (DDSketch-style log buckets)."""
+
+    def __init__(self, relative_accuracy=0.02):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}
+        self.zeros = 0
+        self.count = 0
+
+    def add(self, value):
+        self.count += 1
+        if value <= 0:
+            self.zeros += 1
+            return
+        index = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def quantile(self, q):
+        """Return an estimate of the q-quantile (0 <= q <= 1)."""
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zeros
+        if rank < seen:
+            return 0.0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # Midpoint of (gamma^(i-1), gamma^i] in relative terms
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class ElementStats:
+    """Fleet-wide accumulator for one (category, element)."""
+
+    __slots__ = ('hosts', 'count', 'duration', 'avg_hist', 'max_avg', 'max_host')
+
+    def __init__(self):
+        self.hosts = 0
+        self.count = 0
+        self.duration = 0
+        self.avg_hist = LogHistogram()
+        self.max_avg = 0.0
+        self.max_host = None
+
+    def add(self, host, count, duration):
+        self.hosts += 1
+        self.count += count
+        self.duration += duration
+        avg = (duration / count) / 1e9 if count else 0.0
+        self.avg_hist.add(avg)
+        if avg > self.max_avg:
+            self.max_avg = avg
+            self.max_host = host
+
+
+def is_derived_db(path):
+    """True for files the thor-db scripts write next to a ThorDB (prepared copy, snapshot store)."""
+    name = os.path.basename(path)
+    return name.endswith(PREPARED_SUFFIX) or name == DEFAULT_STORE
+
+
+def expand_db_paths(patterns):
+    """Expand files, globs and directories (searched recursively for *.db).
+
+    Prepared copies and snapshot stores found by a glob or directory search are
+    skipped so every host counts once; name them explicitly to read them anyway.
+    """
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for match in matches:
+            if os.path.isdir(match):
+                paths.extend(sorted(str(p) for p in Path(match).rglob(DB_GLOB) if not is_derived_db(p)))
+            elif os.path.isfile(match):
+                if is_derived_db(match) and match != pattern:
+                    continue
+                paths.append(match)
+            else:
+                print(f"Warning: not found: {match}", file=sys.stderr)
+    return list(dict.fromkeys(paths))
+
+
+class UnreadableDatabase(Exception):
+    """A ThorDB read_times could not read; carries the path next to the SQLite message."""
+
+    def __init__(self, dbpath, message):
+        super().__init__(f"{dbpath}: {message}")
+        self.dbpath = dbpath
+        self.message = message
+
+
+def read_times(dbpath):
+    """Return (dbpath, rows) with rows = [(category, element, count, duration), ...].
+
+    Opened read-only so a live scan is never blocked. SQLite errors are raised
+    as UnreadableDatabase, so the caller knows which of many databases failed.
+    """
+    try:
+        conn = connect_readonly(dbpath)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT category, element, count, duration
+                FROM times
+                WHERE count > 0
+            """)
+            return dbpath, cursor.fetchall()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        raise UnreadableDatabase(dbpath, str(e)) from e
+
+
+def bounded_map(func, items, workers):
+    """Like executor.map, but keeps at most 2*workers results in flight (unordered)."""
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for item in items:
+            pending.add(pool.submit(func, item))
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future
+        for future in pending:
+            yield future
+
+
+def aggregate_fleet(dbpaths, workers=4, category=None):
+    """Merge `times` across databases; return (stats dict, hosts_ok, [(dbpath, error message)])."""
+    stats = {}
+    hosts_ok = 0
+    errors = []
+
+    for future in bounded_map(read_times, dbpaths, workers):
+        try:
+            dbpath, rows = future.result()
+        except UnreadableDatabase as e:
+            errors.append((e.dbpath, e.message))
+            continue
+        hosts_ok += 1
+        for cat, element, count, duration in rows:
+            if category and cat != category:
+                continue
+            key = (cat, element)
+            entry = stats.get(key)
+            if entry is None:
+                entry = stats[key] = ElementStats()
+            entry.add(dbpath, count, duration)
+
+    return stats, hosts_ok, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate ThorDB timing data across many hosts")
+    parser.add_argument("dbpaths", nargs='+', help="ThorDB files, globs or directories")
+    parser.add_argument("--top", type=int, default=20, help="Number of results (default: 20)")
+    parser.add_argument("--category", help="Only this category (e.g. deep_scan)")
+    parser.add_argument("--sort", choices=['total', 'p95', 'hosts'], default='total',
+                        help="Rank by aggregate total time, p95 host average, or host count (default: total)")
+    parser.add_argument("--workers", type=int, default=4, help="Databases read concurrently (default: 4)")
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        print("Error: --workers must be at least 1", file=sys.stderr)
+        sys.exit(1)
+    dbpaths = expand_db_paths(args.dbpaths)
+    if not dbpaths:
+        print("Error: no databases found", file=sys.stderr)
+        sys.exit(1)
+
+    stats, hosts_ok, errors = aggregate_fleet(dbpaths, args.workers, args.category)
+
+    print(f"ThorDB Fleet Analysis: {hosts_ok} databases ({len(errors)} unreadable)")
+    for dbpath, message in errors[:5]:
+        print(f"  skipped {dbpath}: {message}")
+    if len(errors) > 5:
+        print(f"  ... and {len(errors) - 5} more")
+
+    sort_keys = {
+        'total': lambda item: -item[1].duration,
+        'p95': lambda item: -item[1].avg_hist.quantile(0.95),
+        'hosts': lambda item: -item[1].hosts,
+    }
+    ranked = sorted(stats.items(), key=sort_keys[args.sort])[:args.top]
+
+    rows = []
+    for (cat, element), entry in ranked:
+        fleet_avg = (entry.duration / entry.count) / 1e9 if entry.count else 0.0
+        rows.append((
+            cat, element, entry.hosts, entry.count,
+            round(entry.duration / 1e9, 3),
+            round(fleet_avg, 3),
+            round(entry.avg_hist.quantile(0.5), 3),
+            round(entry.avg_hist.quantile(0.95), 3),
+            round(entry.max_avg, 3),
+        ))
+
+    print_table(
+        ["Category", "Element", "Hosts", "Count", "Total (sec)", "Fleet avg", "p50 avg", "p95 avg", "Max avg"],
+        rows,
+        f"Top {args.top} by {args.sort} across fleet"
+    )
+
+    if ranked:
+        (cat, element), entry = ranked[0]
+        print(f"\nSlowest host for {element}: {entry.max_host} ({entry.max_avg:.3f}s avg)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Build an indexed copy of a ThorDB for fast repeated analysis.
+
+The hot `times` queries filter and sort on computed expressions such as
+(duration*1.0/count)/1e9, which SQLite can only answer by scanning and
+sorting the whole table. This script copies the database (never touching
+THOR's live file) and adds expression and covering indexes for those
+queries. thor_db_top_times.py and thor_db_slow_rules_hint.py pick up the
+copy automatically while it is current; ad-hoc queries from
+reference/queries.md can be run against it directly.
+
+Usage:
+    thor_db_prepare.py <path_to_thor10.db> [--output FILE] [--force]
+"""
+
+import sqlite3
+import sys
+import argparse
+import os
+import time
+from pathlib import Path
+
+from thor_db_analysis import (PREPARED_META_TABLE, connect_readonly, has_table,
+                              prepared_path, source_signature)
+
+# Expressions must match the query text in thor_db_analysis.py / reference/queries.md.
+PREPARED_INDEXES = [
+    # ORDER BY duration DESC LIMIT n
+    ("prepared_times_duration", "times(duration)"),
+    # WHERE category = ? ORDER BY duration DESC; covers GROUP BY category sums
+    ("prepared_times_category_duration", "times(category, duration, count)"),
+    # ORDER BY (duration*1.0/count) DESC LIMIT n
+    ("prepared_times_avg", "times((duration*1.0/count))"),
+    # WHERE category = ? AND (duration*1.0/count)/1e9 > ?
+    ("prepared_times_category_avg", "times(category, ((duration*1.0/count)/1e9))"),
+]
+
+
+def read_meta(path):
+    """Return the prepared-copy metadata dict, or {} if path is not a prepared copy."""
+    try:
+        conn = connect_readonly(path)
+        try:
+            return dict(conn.execute(f"SELECT key, value FROM {PREPARED_META_TABLE}"))
+        finally:
+            conn.close()
+    except sqlite3.Error:
+        return {}
+
+
+def prepare(dbpath, output):
+    """Copy dbpath to output and build the indexes; return [(step, seconds)]."""
+    timings = []
+    signature = source_signature(dbpath)
+    tmp = Path(str(output) + ".tmp")
+    if tmp.exists():
+        tmp.unlink()
+
+    start = time.perf_counter()
+    src = connect_readonly(dbpath)
+    dst = sqlite3.connect(str(tmp))
+    try:
+        src.backup(dst)
+    finally:
+        src.close()
+    timings.append(("copy", time.perf_counter() - start))
+
+    try:
+        dst.execute("PRAGMA journal_mode=DELETE")
+        dst.execute("PRAGMA synchronous=OFF")
+        cursor = dst.cursor()
+        if has_table(cursor, 'times'):
+            for name, target in PREPARED_INDEXES:
+                start = time.perf_counter()
+                cursor.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {target}")
+                timings.append((name, time.perf_counter() - start))
+
+        cursor.execute(f"DROP TABLE IF EXISTS {PREPARED_META_TABLE}")
+        cursor.execute(f"CREATE TABLE {PREPARED_META_TABLE} (key TEXT PRIMARY KEY, value TEXT)")
+        cursor.executemany(f"INSERT INTO {PREPARED_META_TABLE} (key, value) VALUES (?, ?)", [
+            ("source", str(Path(dbpath).resolve())),
+            ("source_signature", signature),
+            ("prepared_at", str(int(time.time()))),
+        ])
+        dst.commit()
+    finally:
+        dst.close()
+
+    os.replace(tmp, output)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build an indexed copy of a ThorDB for analysis")
+    parser.add_argument("dbpath", help="Path to thor10.db or thor11.db")
+    parser.add_argument("--output", help="Prepared copy path (default: <db>.prepared.db next to the DB; "
+                                         "only the default location is picked up automatically)")
+    parser.add_argument("--force", action="store_true", help="Rebuild even if the copy is current")
+    args = parser.parse_args()
+
+    dbpath = Path(args.dbpath)
+    if not dbpath.exists():
+        print(f"Error: Database not found: {dbpath}", file=sys.stderr)
+        sys.exit(1)
+
+    output = Path(args.output) if args.output else prepared_path(dbpath)
+    if output.resolve() == dbpath.resolve():
+        print("Error: output must not be the source database", file=sys.stderr)
+        sys.exit(1)
+
+    if output.exists() and not args.force:
+        if read_meta(output).get("source_signature") == source_signature(dbpath):
+            print(f"Prepared copy is current: {output}")
+            return
+
+    try:
+        timings = prepare(dbpath, output)
+    except sqlite3.Error as e:
+        print(f"SQLite error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    for step, seconds in timings:
+        print(f"  {step}: {seconds:.2f}s")
+    size_mb = output.stat().st_size / (1024 * 1024)
+    print(f"Prepared copy: {output} ({size_mb:.1f} MB, {sum(s for _, s in timings):.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Rank YARA rules by scan time spent per hit, joining ThorDB timings with THOR logs.
+
+ThorDB `times` says how long each deep_scan rule cost; the THOR logs of the
+same scans say which rules fired. Every YARA rule of a finding counts, not
+just the first: NAME, each REASON_n "YARA rule X" and RULENAME_n in text
+logs, every reasons[*] signature in JSON. This report joins the two on the
+rule name across any number of databases and logs:
+
+- Rules that never fired but cost at least --min-seconds, by time spent.
+  They are the --init-filter candidates, and the report picks the fewest
+  filter patterns that drop them without dropping any rule that fired (or
+  any --protect keyword), with the deep_scan time saved per database.
+- Rules that fired, ranked by seconds spent per hit.
+
+Databases are read with the fleet reader (bounded thread pool, read-only);
+logs are streamed through the summarizer's line reader and parser (text or
+JSON, .gz/.zst, --log-workers processes). `times` accumulates over every
+scan a ThorDB has run, so per-database figures cover all of them; use
+thor_db_snapshots.py for per-run deltas. A rule that never fired in these
+logs may still be worth its cost; review the candidates before filtering.
+
+Usage:
+    thor_db_rule_yield.py --db <db_or_dir_or_glob>... --log <log_or_dir_or_glob>...
+                          [--min-seconds SEC] [--min-score N] [--top N] [--workers N] [--log-workers N]
+                          [--protect RULE[,RULE]] [--protect-file FILE] [--max-patterns N]
+"""
+
+import sys
+import argparse
+import os
+import re
+from collections import Counter
+
+from thor_db_fleet import aggregate_fleet, expand_db_paths
+from thor_db_slow_rules_hint import load_protected, plan_init_filter
+from thor_db_top_times import print_table
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.realpath(__file__)), '..', '..',
+                                'thor-log-analysis', 'scripts'))
+
+from summarize_thor_log import (  # noqa: E402
+    LOG_DATA_ERRORS, expand_inputs, extract_fields, iter_candidate_lines, json_loads, map_tasks, parse_json_line,
+    parse_line, resolve_formats, split_tasks)
+
+# "YARA rule HKTL_Mimikatz / Detects ..." in REASON_n / reason_n values
+REASON_RULE = re.compile(r'\s*YARA rule\s+([^\s/]+)')
+RULENAME_KEY = re.compile(r'(?:rulename|rule_name)(?:_\d+)?', re.IGNORECASE)
+REASON_KEY = re.compile(r'reason_\d+', re.IGNORECASE)
+JSON_SIGNATURE_KEYS = ('rule_name', 'rulename', 'name')
+
+
+def add_field_rules(names, fields):
+    """Add the rule names of flat KEY -> value fields (text log fields, JSON v1 records)."""
+    for key, value in fields.items():
+        if not isinstance(value, str):
+            continue
+        if RULENAME_KEY.fullmatch(key):
+            if value.strip():
+                names.add(value.strip())
+        elif REASON_KEY.fullmatch(key):
+            match = REASON_RULE.match(value)
+            if match:
+                names.add(match.group(1))
+
+
+def first_signature(reason):
+    """Rule name of one JSONv2 / audit trail reason, or None."""
+    for source in (reason.get('signature'), reason):
+        if isinstance(source, dict):
+            for key in JSON_SIGNATURE_KEYS:
+                value = source.get(key)
+                if value and isinstance(value, str):
+                    return value
+    return None
+
+
+def rule_names(line, fmt, finding):
+    """Every rule name of one finding line: the parser's name plus all secondary reasons."""
+    names = {finding['name']} if finding['name'] else set()
+    if fmt != 'json':
+        add_field_rules(names, extract_fields(line))
+        return names
+    try:
+        record = json_loads(line)
+    except ValueError:
+        return names
+    add_field_rules(names, record)
+    reasons = record.get('reasons')
+    if isinstance(reasons, list):
+        for reason in reasons:
+            name = first_signature(reason) if isinstance(reason, dict) else None
+            if name:
+                names.add(name)
+    return names
+
+
+def rule_hits(filepath, start=None, end=None, fmt='text', min_score=0):
+    """(Counter of findings per rule name, rule names seen only below min_score, findings read)
+    for a log or a byte range of it."""
+    line_parser = parse_json_line if fmt == 'json' else parse_line
+    hits = Counter()
+    below = set()
+    findings = 0
+    for line in iter_candidate_lines(filepath, start, end, fmt):
+        finding = line_parser(line)
+        if finding is None:
+            continue
+        findings += 1
+        if min_score:
+            score = finding['score']
+            if score is None or score < min_score:
+                below.update(rule_names(line, fmt, finding))
+                continue
+        hits.update(rule_names(line, fmt, finding))
+    return hits, below, findings
+
+
+def count_hits(logfiles, workers=1, fmt='auto', min_score=0):
+    """Return (hits, logs_with_hits, fired_below, findings).
+
+    hits and logs_with_hits are Counters by rule name; fired_below holds the
+    rules that fired, but never with a score >= min_score.
+    """
+    hits = Counter()
+    below = set()
+    per_log = {}
+    findings = 0
+    tasks = split_tasks(resolve_formats(logfiles, fmt), workers)
+    for filepath, (chunk_hits, chunk_below, chunk_findings) in map_tasks(rule_hits, tasks, workers,
+                                                                          min_score=min_score):
+        hits.update(chunk_hits)
+        below.update(chunk_below)
+        per_log.setdefault(filepath, set()).update(chunk_hits)
+        findings += chunk_findings
+    logs_with_hits = Counter(name for names in per_log.values() for name in names)
+    return hits, logs_with_hits, below - hits.keys(), findings
+
+
+def join_rule_yield(stats, hits, logs_with_hits):
+    """[(rule, hosts, count, seconds, hits, logs with hits)] for every deep_scan rule in stats."""
+    rules = []
+    for (_, element), entry in stats.items():
+        rules.append((element, entry.hosts, entry.count, entry.duration / 1e9,
+                      hits.get(element, 0), logs_with_hits.get(element, 0)))
+    return rules
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rank rules by ThorDB scan time per log hit")
+    parser.add_argument("--db", nargs='+', action='extend', required=True, metavar="DB",
+                        help="ThorDB files, globs or directories")
+    parser.add_argument("--log", nargs='+', action='extend', required=True, metavar="LOG",
+                        help="THOR logs of the same scans: files, globs or directories")
+    parser.add_argument("--min-seconds", type=float, default=60.0,
+                        help="Fleet-wide seconds a rule that never fired must cost to be a candidate (default: 60)")
+    parser.add_argument("--min-score", type=int, default=0,
+                        help="Only count findings with at least this score as hits; rules that fired below it "
+                             "are still not candidates (default: 0 = all)")
+    parser.add_argument("--top", type=int, default=20, help="Rows per table (default: 20)")
+    parser.add_argument("--workers", type=int, default=4, help="Databases read concurrently (default: 4)")
+    parser.add_argument("--log-workers", type=int, default=1,
+                        help="Processes parsing logs (default: 1, 0 = all CPUs)")
+    parser.add_argument("--format", choices=['auto', 'text', 'json'], default='auto',
+                        help="Log format (default: auto-detect per file)")
+    parser.add_argument("--protect", action="append", default=[], metavar="RULE",
+                        help="Rule name or keyword that must stay loaded (repeatable, comma-separated)")
+    parser.add_argument("--protect-file", help="File with protected rule names/keywords, one per line")
+    parser.add_argument("--max-patterns", type=int, default=10,
+                        help="Most filter patterns to consider (default: 10)")
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        print("Error: --workers must be at least 1", file=sys.stderr)
+        sys.exit(1)
+    dbpaths = expand_db_paths(args.db)
+    if not dbpaths:
+        print("Error: no databases found", file=sys.stderr)
+        sys.exit(1)
+    logfiles = expand_inputs(args.log)
+    if not logfiles:
+        print("Error: no logs found", file=sys.stderr)
+        sys.exit(1)
+    try:
+        protected = load_protected(args.protect, args.protect_file)
+    except OSError as e:
+        print(f"Error: cannot read protect file: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    stats, hosts_ok, errors = aggregate_fleet(dbpaths, args.workers, 'deep_scan')
+    if not hosts_ok:
+        reason = f"{errors[0][0]}: {errors[0][1]}" if errors else 'no times table'
+        print(f"Error: no readable databases ({reason})", file=sys.stderr)
+        sys.exit(1)
+    log_workers = args.log_workers if args.log_workers > 0 else (os.cpu_count() or 1)
+    try:
+        hits, logs_with_hits, fired_below, findings = count_hits(logfiles, log_workers, args.format, args.min_score)
+    except (OSError,) + LOG_DATA_ERRORS as e:
+        print(f"Error parsing log: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    rules = join_rule_yield(stats, hits, logs_with_hits)
+    deep_total = sum(seconds for _, _, _, seconds, _, _ in rules)
+    timed = {rule for rule, *_ in rules}
+    fired = [rule for rule in rules if rule[4]]
+    untimed = [name for name in hits if name not in timed]
+
+    print(f"ThorDB Rule Yield: {hosts_ok} databases ({len(errors)} unreadable), {len(logfiles)} logs")
+    for dbpath, message in errors[:5]:
+        print(f"  skipped {dbpath}: {message}")
+    print(f"  deep_scan: {len(rules)} rules, {deep_total:.1f}s in total ({deep_total / hosts_ok:.1f}s per database; "
+          f"`times` accumulates over every scan a database ran)")
+    score_note = f" with score >= {args.min_score}" if args.min_score else ""
+    print(f"  Logs: {findings} findings, {sum(hits.values())} rule hits{score_note} from {len(hits)} rules; "
+          f"{len(fired)} timed rules fired, {len(untimed)} rules have no deep_scan timing")
+    if fired_below:
+        # Low-score hits still mean the rule fires; it is not an --init-filter candidate
+        print(f"  {len(fired_below)} rules fired only with score < {args.min_score}; "
+              f"they are kept out of the candidates")
+
+    candidates = sorted((rule for rule in rules
+                         if not rule[4] and rule[0] not in fired_below and rule[3] >= args.min_seconds),
+                        key=lambda rule: -rule[3])
+    candidate_total = sum(seconds for _, _, _, seconds, _, _ in candidates)
+    print_table(
+        ["Rule", "Hosts", "Count", "Total (sec)", "Per DB", "Share"],
+        [(rule, hosts, count, round(seconds, 1), round(seconds / hosts_ok, 2),
+          f"{100.0 * seconds / deep_total:.1f}%" if deep_total else "-")
+         for rule, hosts, count, seconds, _, _ in candidates[:args.top]],
+        f"Never fired, >= {args.min_seconds:g}s fleet-wide: {len(candidates)} rules, {candidate_total:.1f}s"
+    )
+
+    print_table(
+        ["Rule", "Hosts", "Total (sec)", "Hits", "Logs", "Sec/hit"],
+        [(rule, hosts, round(seconds, 1), rule_hits, logs, round(seconds / rule_hits, 3))
+         for rule, hosts, _, seconds, rule_hits, logs in sorted(fired, key=lambda r: -r[3] / r[4])[:args.top]],
+        f"Seconds per hit, top {args.top} of {len(fired)} rules that fired"
+    )
+
+    if not candidates:
+        return
+    slow_deep = [(rule, count, seconds, seconds / count if count else 0.0)
+                 for rule, _, count, seconds, _, _ in candidates]
+    # Rules that fired without deep_scan timing (other scanners) must not be filtered either
+    keep = list(timed) + untimed + [name for name in fired_below if name not in timed]
+    plan = plan_init_filter(slow_deep, keep, protected, None, deep_total, args.max_patterns)
+    print("\n" + "=" * 60)
+    print(" INIT-FILTER CANDIDATES (rules that never fired)")
+    print("=" * 60)
+    if not plan:
+        print("  No safe pattern: every candidate is protected or shares its name with a rule that fired "
+              "or a cheaper rule")
+        return
+    saved = sum(gain for _, _, gain in plan)
+    dropped = sum(len(rules_dropped) for _, rules_dropped, _ in plan)
+    print(f"{'Pattern':<30} {'Rules':>6} {'Saved(s)':>10} {'Per DB':>9}")
+    print("-" * 60)
+    for pattern, rules_dropped, gain in plan:
+        print(f"{pattern[:30]:<30} {len(rules_dropped):>6} {gain:>10.1f} {gain / hosts_ok:>9.2f}")
+    pct = 100.0 * saved / deep_total if deep_total else 0.0
+    print(f"\nEstimated saving: {saved:.1f}s fleet-wide, {saved / hosts_ok:.1f}s per database "
+          f"({pct:.1f}% of deep_scan), dropping {dropped} rules that never fired:")
+    print(f"  thor64.exe --init-filter {','.join(p for p, _, _ in plan)} -p C:\\")
+    print("Savings assume rule time is additive. A rule that did not fire on these hosts may still catch "
+          "a future threat: review the list and --protect what must stay.")
+
+
+if __name__ == "__main__":
+    main()
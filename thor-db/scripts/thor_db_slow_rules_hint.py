@@ -5,106 +5,194 @@ Identify slow YARA rules and scan elements for tuning hints.
 Analyzes ThorDB to find:
 - Slow deep_scan elements (likely YARA rules)
 - Slow bulk_scan elements
-- Patterns suggesting tuning opportunities
+- The fewest --init-filter patterns that bring deep_scan time within a budget,
+  never dropping a protected rule
 
 Usage:
-    thor_db_slow_rules_hint.py <path_to_thor10.db> [--threshold SEC]
+    thor_db_slow_rules_hint.py <path_to_thor10.db> [--threshold SEC] [--budget SEC]
+                               [--protect RULE[,RULE]] [--protect-file FILE] [--max-patterns N]
 """
 
 import sqlite3
 import sys
 import argparse
+import heapq
 from pathlib import Path
-from collections import defaultdict
 
+from thor_db_analysis import TimesAnalysis, connect_analysis, has_table
 
-def analyze_deep_scan(cursor, threshold_sec=1.0):
-    """Find slow deep_scan elements (typically YARA rules)."""
-    cursor.execute("""
-        SELECT element, count,
-               duration/1e9 AS seconds_total,
-               (duration*1.0/count)/1e9 AS seconds_avg
-        FROM times
-        WHERE category = 'deep_scan'
-          AND (duration*1.0/count)/1e9 > ?
-        ORDER BY duration DESC
-    """, (threshold_sec,))
-    return cursor.fetchall()
-
-
-def analyze_bulk_scan(cursor, threshold_sec=0.5):
-    """Find slow bulk_scan elements."""
-    cursor.execute("""
-        SELECT element, count,
-               duration/1e9 AS seconds_total,
-               (duration*1.0/count)/1e9 AS seconds_avg
-        FROM times
-        WHERE category = 'bulk_scan'
-          AND (duration*1.0/count)/1e9 > ?
-        ORDER BY duration DESC
-    """, (threshold_sec,))
-    return cursor.fetchall()
-
-
-def analyze_hooks(cursor):
-    """Find slow hooks."""
-    cursor.execute("""
-        SELECT element, count,
-               duration/1e9 AS seconds_total,
-               (duration*1.0/count)/1e9 AS seconds_avg
-        FROM times
-        WHERE category = 'hooks'
-        ORDER BY duration DESC
-        LIMIT 10
-    """)
-    return cursor.fetchall()
-
-
-def get_category_totals(cursor):
-    """Get overall time by category."""
-    cursor.execute("""
-        SELECT category, SUM(duration)/1e9 AS total_seconds
-        FROM times
-        GROUP BY category
-        ORDER BY total_seconds DESC
-    """)
-    return cursor.fetchall()
 
+def analyze_deep_scan(times, threshold_sec=1.0):
+    """Find slow deep_scan elements (typically YARA rules)."""
+    return times.slower_than({'deep_scan': threshold_sec})['deep_scan']
 
-def suggest_tuning(slow_deep, slow_bulk, category_totals):
-    """Generate tuning suggestions based on analysis."""
-    suggestions = []
-
-    total_time = sum(t[1] for t in category_totals)
-    deep_scan_time = next((t[1] for t in category_totals if t[0] == 'deep_scan'), 0)
-    bulk_scan_time = next((t[1] for t in category_totals if t[0] == 'bulk_scan'), 0)
 
-    if total_time > 0:
-        deep_pct = (deep_scan_time / total_time) * 100
-        bulk_pct = (bulk_scan_time / total_time) * 100
+def analyze_bulk_scan(times, threshold_sec=0.5):
+    """Find slow bulk_scan elements."""
+    return times.slower_than({'bulk_scan': threshold_sec})['bulk_scan']
 
-        if deep_pct > 50:
-            suggestions.append(f"deep_scan is {deep_pct:.1f}% of total time - consider YARA rule optimization")
 
-        if bulk_pct > 30:
-            suggestions.append(f"bulk_scan is {bulk_pct:.1f}% of total time - consider file size/type limits")
+def analyze_slow_scans(times, threshold_sec=1.0):
+    """Slow deep_scan (> threshold) and bulk_scan (> threshold/2) elements from one scan."""
+    slow = times.slower_than({'deep_scan': threshold_sec, 'bulk_scan': threshold_sec / 2})
+    return slow['deep_scan'], slow['bulk_scan']
 
-    if len(slow_deep) > 10:
-        suggestions.append(f"{len(slow_deep)} slow YARA rules found - consider --init-filter for worst offenders")
 
-    # Check for pattern in slow rules
-    rule_prefixes = defaultdict(int)
-    for row in slow_deep:
-        element = row[0]
-        if '_' in element:
-            prefix = element.split('_')[0]
-            rule_prefixes[prefix] += 1
+def analyze_hooks(times):
+    """Find slow hooks."""
+    return [row[1:] for row in times.top_by_total(10, category='hooks')]
 
-    for prefix, count in sorted(rule_prefixes.items(), key=lambda x: -x[1])[:3]:
-        if count >= 3:
-            suggestions.append(f"Multiple slow rules with prefix '{prefix}' ({count} rules) - consider filtering")
 
-    return suggestions
+def get_category_totals(times):
+    """Get overall time by category."""
+    return [(category, seconds) for category, _, seconds in times.category_totals()]
+
+
+def load_protected(values, path=None):
+    """Protected rule keywords from --protect values (comma-separated) and an optional file."""
+    protected = [v.strip() for value in values for v in value.split(',') if v.strip()]
+    if path:
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                line = line.split('#', 1)[0].strip()
+                if line:
+                    protected.append(line)
+    return protected
+
+
+def candidate_patterns(names, min_length=4):
+    """Each rule name plus its '_'-delimited prefixes (HKTL_Mimikatz_Strings -> HKTL_Mimikatz, ...)."""
+    patterns = set()
+    for name in names:
+        parts = name.split('_')
+        for i in range(1, len(parts) + 1):
+            prefix = '_'.join(parts[:i])
+            if len(prefix) >= min_length:
+                patterns.add(prefix)
+    return patterns
+
+
+def pattern_covers(patterns, names):
+    """{pattern: [indices of names containing it]}, case-insensitive.
+
+    Patterns go into a character trie once; each name is then walked from
+    every start position, so the cost is about one short walk per name
+    character instead of one substring test per (pattern, name) pair.
+    """
+    trie = {}
+    for pattern in patterns:
+        node = trie
+        for char in pattern.lower():
+            node = node.setdefault(char, {})
+        # None marks patterns ending here; never a character key
+        node.setdefault(None, []).append(pattern)
+    covers = {}
+    for index, name in enumerate(names):
+        name = name.lower()
+        found = set()
+        for start in range(len(name)):
+            node = trie
+            for char in name[start:]:
+                node = node.get(char)
+                if node is None:
+                    break
+                ends = node.get(None)
+                if ends:
+                    found.update(ends)
+        for pattern in found:
+            covers.setdefault(pattern, []).append(index)
+    return covers
+
+
+def plan_init_filter(slow_deep, all_rules, protected=(), budget=None, deep_total=0.0, max_patterns=10):
+    """Cost model for --init-filter: pick filter patterns greedily by deep_scan time saved.
+
+    --init-filter drops every rule whose name contains a pattern (case-insensitive).
+    A pattern qualifies only if everything it drops is a slow, unprotected rule;
+    its value is the summed count x avg (total seconds) of those rules. Patterns
+    are picked by largest remaining saving, preferring the one that drops fewer
+    rules on ties, until deep_scan time is within budget or max_patterns are
+    picked. Returns [(pattern, rules_dropped, seconds_saved)] in pick order.
+
+    Savings only shrink as rules are dropped, so a lazy max-heap keeps each
+    pattern's last known saving and re-checks only the pattern on top.
+    """
+    keywords = [k.lower() for k in protected]
+    rules = [(element, total) for element, _, total, _ in slow_deep
+             if not any(k in element.lower() for k in keywords)]
+    filterable = {element.lower() for element, _ in rules}
+    # Everything a pattern must not match: fast rules, protected rules, protected keywords
+    keep = "\n".join([name.lower() for name in all_rules if name.lower() not in filterable] + keywords)
+
+    covers = {}
+    for pattern, indices in pattern_covers(candidate_patterns(element for element, _ in rules),
+                                           [element for element, _ in rules]).items():
+        cover = frozenset(indices)
+        # Same rules dropped: keep the most specific (longest) pattern
+        if cover not in covers or len(pattern) > len(covers[cover]):
+            covers[cover] = pattern
+
+    # Entries: (-saving, rules covered, pattern, cover, plan length the saving was computed at)
+    heap = [(-sum(rules[i][1] for i in cover), len(cover), pattern, cover, 0) for cover, pattern in covers.items()]
+    heapq.heapify(heap)
+    plan = []
+    dropped = set()
+    saved = 0.0
+    while heap and len(plan) < max_patterns:
+        neg_gain, size, pattern, cover, computed_at = heapq.heappop(heap)
+        if computed_at != len(plan):
+            gain = sum(rules[i][1] for i in cover - dropped)
+            if gain > 0:
+                heapq.heappush(heap, (-gain, size, pattern, cover, len(plan)))
+            continue
+        if -neg_gain <= 0:
+            break
+        # Scanning all rule names is the slow part, so only check patterns about to be picked
+        if pattern.lower() in keep:
+            continue
+        plan.append((pattern, [rules[i][0] for i in sorted(cover - dropped)], -neg_gain))
+        dropped |= cover
+        saved += -neg_gain
+        if budget is not None and deep_total - saved <= budget:
+            break
+    return plan
+
+
+def print_filter_plan(plan, deep_total, budget, threshold):
+    """Print the cumulative candidate filter sets and the recommended --init-filter command."""
+    print("\n" + "=" * 60)
+    print("INIT-FILTER CANDIDATES (cost model: count x avg per rule)")
+    print("=" * 60)
+    if budget is not None:
+        print(f"Budget: deep_scan <= {budget:.1f}s (currently {deep_total:.1f}s, "
+              f"need to save {max(deep_total - budget, 0):.1f}s)")
+    if budget is not None and deep_total <= budget:
+        print("  deep_scan is already within budget - no filter needed")
+        return
+    if not plan:
+        print(f"  No safe pattern: every rule slower than {threshold}s is protected "
+              f"or shares its name with a faster rule")
+        return
+
+    print(f"{'Set':>3} {'Rules':>6} {'Saved(s)':>10} {'Saved%':>7} {'deep_scan(s)':>13}  Added pattern")
+    print("-" * 60)
+    saved = 0.0
+    rules = 0
+    for size, (pattern, dropped, gain) in enumerate(plan, 1):
+        saved += gain
+        rules += len(dropped)
+        pct = 100.0 * saved / deep_total if deep_total else 0.0
+        print(f"{size:>3} {rules:>6} {saved:>10.1f} {pct:>6.1f}% {deep_total - saved:>13.1f}  {pattern}")
+
+    if budget is not None and deep_total - saved > budget:
+        print(f"\nBudget not reachable with rules slower than {threshold}s; "
+              f"best set above leaves {deep_total - saved:.1f}s (try a lower --threshold)")
+    label = "Smallest set within budget" if budget is not None and deep_total - saved <= budget \
+        else f"Filter for all {len(plan)} patterns"
+    print(f"\n{label} (saves {saved:.1f}s of deep_scan, drops {rules} rules):")
+    print(f"  thor64.exe --init-filter {','.join(p for p, _, _ in plan)} -p C:\\")
+    print("Savings assume rule time is additive; patterns are checked against the rule names "
+          "in `times` only, so review them with --print-signatures.")
 
 
 def main():
@@ -112,6 +200,13 @@ def main():
     parser.add_argument("dbpath", help="Path to thor10.db or thor11.db")
     parser.add_argument("--threshold", type=float, default=1.0,
                         help="Avg seconds threshold for 'slow' (default: 1.0)")
+    parser.add_argument("--budget", type=float,
+                        help="Target deep_scan seconds; pick the fewest filter patterns that reach it")
+    parser.add_argument("--protect", action="append", default=[], metavar="RULE",
+                        help="Rule name or keyword that must stay loaded (repeatable, comma-separated)")
+    parser.add_argument("--protect-file", help="File with protected rule names/keywords, one per line")
+    parser.add_argument("--max-patterns", type=int, default=10,
+                        help="Most filter patterns to consider (default: 10)")
     args = parser.parse_args()
 
     dbpath = Path(args.dbpath)
@@ -120,27 +215,35 @@ def main():
         sys.exit(1)
 
     try:
-        conn = sqlite3.connect(str(dbpath))
+        protected = load_protected(args.protect, args.protect_file)
+    except OSError as e:
+        print(f"Error: cannot read protect file: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        conn, _ = connect_analysis(dbpath)
         cursor = conn.cursor()
 
         # Check if times table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='times'")
-        if not cursor.fetchone():
+        if not has_table(cursor, 'times'):
             print("Error: 'times' table not found in database", file=sys.stderr)
             sys.exit(1)
 
+        times = TimesAnalysis(cursor)
+
         print(f"ThorDB Slow Rules Analysis: {dbpath}")
         print(f"Threshold: > {args.threshold}s average per invocation")
         print("=" * 60)
 
         # Category totals
-        category_totals = get_category_totals(cursor)
+        category_totals = get_category_totals(times)
+        total_time = sum(seconds for _, seconds in category_totals) or 1
         print("\nTime by Category:")
         for cat, seconds in category_totals:
-            print(f"  {cat}: {seconds:.1f}s")
+            print(f"  {cat}: {seconds:.1f}s ({100.0 * seconds / total_time:.1f}%)")
 
         # Slow deep_scan (YARA rules)
-        slow_deep = analyze_deep_scan(cursor, args.threshold)
+        slow_deep, slow_bulk = analyze_slow_scans(times, args.threshold)
         print(f"\nSlow deep_scan elements (likely YARA rules): {len(slow_deep)}")
         if slow_deep:
             print("-" * 60)
@@ -152,7 +255,6 @@ def main():
                 print(f"  ... and {len(slow_deep) - 15} more")
 
         # Slow bulk_scan
-        slow_bulk = analyze_bulk_scan(cursor, args.threshold / 2)
         print(f"\nSlow bulk_scan elements: {len(slow_bulk)}")
         if slow_bulk:
             print("-" * 60)
@@ -160,28 +262,18 @@ def main():
                 print(f"  {element[:50]}: {total:.1f}s total, {avg:.3f}s avg ({count} calls)")
 
         # Hooks overview
-        hooks = analyze_hooks(cursor)
+        hooks = analyze_hooks(times)
         if hooks:
             print("\nTop hooks by time:")
             for element, count, total, avg in hooks[:5]:
                 print(f"  {element}: {total:.1f}s total")
 
-        # Tuning suggestions
-        suggestions = suggest_tuning(slow_deep, slow_bulk, category_totals)
-        if suggestions:
-            print("\n" + "=" * 60)
-            print("TUNING SUGGESTIONS")
-            print("=" * 60)
-            for suggestion in suggestions:
-                print(f"  • {suggestion}")
-
-        # Filter command hints
+        # Init-filter cost model
+        deep_total = next((seconds for cat, seconds in category_totals if cat == 'deep_scan'), 0.0)
         if slow_deep:
-            worst = [r[0] for r in slow_deep[:5] if r[3] > args.threshold * 2]
-            if worst:
-                print("\nExample filter command for worst offenders:")
-                filter_list = ",".join(worst[:3])
-                print(f"  thor64.exe --init-filter {filter_list} -p C:\\")
+            plan = plan_init_filter(slow_deep, times.elements('deep_scan'), protected,
+                                    args.budget, deep_total, args.max_patterns)
+            print_filter_plan(plan, deep_total, args.budget, args.threshold)
 
         conn.close()
 
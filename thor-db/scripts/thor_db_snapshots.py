@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Per-scan snapshots of ThorDB timing data and per-run regression diffs.
+
+`times` values accumulate across scans. This script copies `times` into a
+side database after each scan, keyed by `tbl.last_run_id`, and turns the
+cumulative counters into per-run deltas (snapshot minus the previous one).
+The diff command ranks elements whose per-invocation cost regressed most
+between two runs, e.g. before and after a signature update.
+
+Usage:
+    thor_db_snapshots.py [--store FILE] snapshot <path_to_thor10.db> [--run-id ID] [--force]
+    thor_db_snapshots.py [--store FILE] list
+    thor_db_snapshots.py [--store FILE] diff <run_a> <run_b> [--top N] [--min-count N] [--category CAT]
+"""
+
+import sqlite3
+import sys
+import argparse
+import time
+from pathlib import Path
+
+from thor_db_top_times import print_table
+
+DEFAULT_STORE = "thor_snapshots.db"
+
+STORE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS runs (
+        seq      INTEGER PRIMARY KEY AUTOINCREMENT,
+        run_id   TEXT NOT NULL UNIQUE,
+        taken_at INTEGER NOT NULL,
+        source   TEXT
+    );
+    CREATE TABLE IF NOT EXISTS snap (
+        run_id   TEXT NOT NULL,
+        category TEXT NOT NULL,
+        element  TEXT NOT NULL,
+        count    INTEGER NOT NULL,
+        duration INTEGER NOT NULL,
+        PRIMARY KEY (run_id, category, element)
+    ) WITHOUT ROWID;
+"""
+
+
+def open_store(store_path):
+    """Open (and create if needed) the snapshot side database."""
+    conn = sqlite3.connect(str(store_path))
+    conn.executescript(STORE_SCHEMA)
+    return conn
+
+
+def take_snapshot(dbpath, store, run_id=None, force=False):
+    """Copy `times` from a ThorDB into the store; return (run_id, rows)."""
+    src = sqlite3.connect(Path(dbpath).resolve().as_uri() + "?mode=ro", uri=True)
+    try:
+        cursor = src.cursor()
+        if run_id is None:
+            cursor.execute("SELECT value FROM tbl WHERE key = 'last_run_id'")
+            row = cursor.fetchone()
+            if not row or not row[0]:
+                raise ValueError("tbl.last_run_id not found; pass --run-id")
+            run_id = str(row[0])
+
+        exists = store.execute("SELECT 1 FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+        if exists and not force:
+            raise ValueError(f"run {run_id} already snapshotted (use --force to replace)")
+
+        cursor.execute("SELECT category, element, count, duration FROM times")
+        with store:
+            if exists:
+                # Updated in place: the run keeps its seq, so its position relative to the
+                # other runs (and the baseline run_deltas subtracts) stays the same
+                store.execute("DELETE FROM snap WHERE run_id = ?", (run_id,))
+                store.execute("UPDATE runs SET taken_at = ?, source = ? WHERE run_id = ?",
+                              (int(time.time()), str(dbpath), run_id))
+            else:
+                store.execute("INSERT INTO runs (run_id, taken_at, source) VALUES (?, ?, ?)",
+                              (run_id, int(time.time()), str(dbpath)))
+            store.executemany(
+                "INSERT INTO snap (run_id, category, element, count, duration) VALUES (?, ?, ?, ?, ?)",
+                ((run_id, cat, element, count or 0, duration or 0) for cat, element, count, duration in cursor))
+        rows = store.execute("SELECT COUNT(*) FROM snap WHERE run_id = ?", (run_id,)).fetchone()[0]
+        return run_id, rows
+    finally:
+        src.close()
+
+
+def list_runs(store):
+    """Return [(seq, run_id, taken_at, source, rows)] in snapshot order."""
+    return store.execute("""
+        SELECT r.seq, r.run_id, datetime(r.taken_at, 'unixepoch'), r.source,
+               (SELECT COUNT(*) FROM snap s WHERE s.run_id = r.run_id)
+        FROM runs r
+        ORDER BY r.seq
+    """).fetchall()
+
+
+def previous_run(store, run_id):
+    """Return the run snapshotted just before run_id, or None."""
+    row = store.execute("SELECT seq FROM runs WHERE run_id = ?", (run_id,)).fetchone()
+    if not row:
+        raise ValueError(f"unknown run: {run_id}")
+    prev = store.execute("SELECT run_id FROM runs WHERE seq < ? ORDER BY seq DESC LIMIT 1", (row[0],)).fetchone()
+    return prev[0] if prev else None
+
+
+def run_deltas(store, run_id):
+    """Per-run {(category, element): (count, duration)} for one snapshot.
+
+    Elements whose counters went down (ThorDB was reset or recreated) use the
+    snapshot value itself as the delta.
+    """
+    prev = previous_run(store, run_id)
+    rows = store.execute("""
+        SELECT cur.category, cur.element, cur.count, cur.duration,
+               prev.count, prev.duration
+        FROM snap cur
+        LEFT JOIN snap prev
+               ON prev.run_id = ? AND prev.category = cur.category AND prev.element = cur.element
+        WHERE cur.run_id = ?
+    """, (prev, run_id))
+
+    deltas = {}
+    for cat, element, count, duration, prev_count, prev_duration in rows:
+        if prev_count is not None and prev_count <= count and prev_duration <= duration:
+            count -= prev_count
+            duration -= prev_duration
+        if count > 0:
+            deltas[(cat, element)] = (count, duration)
+    return deltas
+
+
+def diff_runs(store, run_a, run_b, min_count=5, category=None):
+    """Compare per-invocation cost of two runs; rows sorted by regression (worst first).
+
+    Row: (category, element, count_a, avg_a, count_b, avg_b, delta_avg, ratio)
+    with averages in seconds.
+    """
+    deltas_a = run_deltas(store, run_a)
+    deltas_b = run_deltas(store, run_b)
+
+    rows = []
+    for key, (count_b, duration_b) in deltas_b.items():
+        if category and key[0] != category:
+            continue
+        if key not in deltas_a:
+            continue
+        count_a, duration_a = deltas_a[key]
+        if count_a < min_count or count_b < min_count:
+            continue
+        avg_a = duration_a / count_a / 1e9
+        avg_b = duration_b / count_b / 1e9
+        ratio = avg_b / avg_a if avg_a else float('inf')
+        rows.append((key[0], key[1], count_a, avg_a, count_b, avg_b, avg_b - avg_a, ratio))
+
+    rows.sort(key=lambda r: -r[6])
+    return rows
+
+
+def category_totals(deltas):
+    """Sum per-run delta duration (seconds) by category."""
+    totals = {}
+    for (cat, _), (_, duration) in deltas.items():
+        totals[cat] = totals.get(cat, 0) + duration / 1e9
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-scan ThorDB timing snapshots and regression diffs")
+    parser.add_argument("--store", default=DEFAULT_STORE, help=f"Snapshot database (default: {DEFAULT_STORE})")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    snap = sub.add_parser("snapshot", help="Copy times from a ThorDB, keyed by tbl.last_run_id")
+    snap.add_argument("dbpath", help="Path to thor10.db or thor11.db")
+    snap.add_argument("--run-id", help="Override the run id (default: tbl.last_run_id)")
+    snap.add_argument("--force", action="store_true", help="Replace an existing snapshot of the same run")
+
+    sub.add_parser("list", help="List stored snapshots")
+
+    diff = sub.add_parser("diff", help="Rank per-invocation cost regressions from run A to run B")
+    diff.add_argument("run_a", help="Baseline run id")
+    diff.add_argument("run_b", help="Run id to compare")
+    diff.add_argument("--top", type=int, default=20, help="Number of results (default: 20)")
+    diff.add_argument("--min-count", type=int, default=5, help="Minimum invocations in both runs (default: 5)")
+    diff.add_argument("--category", help="Only this category (e.g. deep_scan)")
+
+    args = parser.parse_args()
+
+    try:
+        store = open_store(args.store)
+
+        if args.command == "snapshot":
+            if not Path(args.dbpath).exists():
+                print(f"Error: Database not found: {args.dbpath}", file=sys.stderr)
+                sys.exit(1)
+            run_id, rows = take_snapshot(args.dbpath, store, args.run_id, args.force)
+            print(f"Snapshot {run_id}: {rows} times rows -> {args.store}")
+
+        elif args.command == "list":
+            print_table(["Seq", "Run ID", "Taken (UTC)", "Source", "Rows"], list_runs(store),
+                        f"Snapshots in {args.store}")
+
+        elif args.command == "diff":
+            rows = diff_runs(store, args.run_a, args.run_b, args.min_count, args.category)
+            totals_a = category_totals(run_deltas(store, args.run_a))
+            totals_b = category_totals(run_deltas(store, args.run_b))
+
+            print(f"ThorDB Run Diff: {args.run_a} -> {args.run_b} (per-run deltas)")
+            print_table(
+                ["Category", f"{args.run_a} (sec)", f"{args.run_b} (sec)"],
+                [(cat, round(totals_a.get(cat, 0.0), 3), round(totals_b.get(cat, 0.0), 3))
+                 for cat in sorted(set(totals_a) | set(totals_b))],
+                "Time by Category"
+            )
+            print_table(
+                ["Category", "Element", "Count A", "Avg A (sec)", "Count B", "Avg B (sec)", "Delta (sec)", "Ratio"],
+                [(c, e, ca, round(aa, 4), cb, round(ab, 4), round(d, 4), round(r, 2))
+                 for c, e, ca, aa, cb, ab, d, r in rows[:args.top]],
+                f"Top {args.top} per-invocation regressions"
+            )
+
+        store.close()
+
+    except ValueError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    except sqlite3.Error as e:
+        print(f"SQLite error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
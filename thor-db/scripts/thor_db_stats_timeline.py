@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+"""
+Reconstruct the scan timeline from the ThorDB `stats` table.
+
+Splits `stats` rows into scans and reports for each module how much of the
+scan's wall-clock time it accounts for. Time where several modules run at
+once is shared between them, and idle gaps between modules are listed. It
+also flags modules whose duration keeps growing across successive scans,
+which is usually the module to restrict or re-thread when scans overrun
+their maintenance window.
+
+A new scan starts when a module shows up again or after more than
+--scan-gap seconds without any module running.
+
+Usage:
+    thor_db_stats_timeline.py <path_to_thor10.db> [--scan N] [--scan-gap SEC] [--min-gap SEC]
+                              [--growth RATIO] [--min-growth SEC]
+"""
+
+import sqlite3
+import sys
+import argparse
+import statistics
+import time
+from pathlib import Path
+
+from thor_db_analysis import connect_readonly, has_table
+from thor_db_top_times import print_table
+
+
+def load_stats(cursor):
+    """Return [(module, element, started, duration)] in start order; NULLs become 0/''."""
+    cursor.execute("""
+        SELECT module, element, started, duration
+        FROM stats
+        WHERE started IS NOT NULL
+        ORDER BY started, rowid
+    """)
+    return [(module or '', element or '', started, duration or 0)
+            for module, element, started, duration in cursor.fetchall()]
+
+
+def split_scans(rows, scan_gap=3600):
+    """Group start-ordered rows into scans; returns a list of row lists."""
+    scans = []
+    current = []
+    seen = set()
+    busy_until = None
+    for row in rows:
+        module, element, started, duration = row
+        key = (module, element)
+        if current and (key in seen or started - busy_until > scan_gap):
+            scans.append(current)
+            current = []
+            seen = set()
+        if not current:
+            busy_until = started
+        current.append(row)
+        seen.add(key)
+        busy_until = max(busy_until, started + duration)
+    if current:
+        scans.append(current)
+    return scans
+
+
+def merge_intervals(intervals):
+    """Union of (start, end) intervals, sorted and non-overlapping."""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [tuple(interval) for interval in merged]
+
+
+def scan_timeline(rows):
+    """Wall-clock breakdown of one scan.
+
+    Per module (sub-element rows are merged into their module, so nested
+    rows are not counted twice) returns runs, summed duration, exclusive
+    seconds, seconds shared with other modules, and the attributed seconds:
+    shared time is split evenly between the modules running at that moment.
+    """
+    intervals = {}
+    modules = {}
+    for module, _, started, duration in rows:
+        intervals.setdefault(module, []).append((started, started + duration))
+        entry = modules.setdefault(module, {'runs': 0, 'duration': 0, 'exclusive': 0.0,
+                                            'overlapped': 0.0, 'attributed': 0.0})
+        entry['runs'] += 1
+        entry['duration'] += duration
+
+    events = []
+    for module, spans in intervals.items():
+        for start, end in merge_intervals(spans):
+            if end > start:
+                events.append((start, 1, module))
+                events.append((end, -1, module))
+    events.sort(key=lambda e: (e[0], e[1]))
+
+    start = min(r[2] for r in rows)
+    end = max(r[2] + r[3] for r in rows)
+    gaps = []
+    overlap = 0
+    active = set()
+    previous = start
+    for moment, delta, module in events:
+        span = moment - previous
+        if span > 0:
+            if not active:
+                gaps.append((previous, moment))
+            else:
+                share = span / len(active)
+                for name in active:
+                    entry = modules[name]
+                    entry['attributed'] += share
+                    if len(active) == 1:
+                        entry['exclusive'] += span
+                    else:
+                        entry['overlapped'] += span
+                if len(active) > 1:
+                    overlap += span
+        previous = moment
+        if delta > 0:
+            active.add(module)
+        else:
+            active.discard(module)
+
+    wall = end - start
+    return {
+        'start': start,
+        'end': end,
+        'wall': wall,
+        'idle': sum(b - a for a, b in gaps),
+        'overlap': overlap,
+        'gaps': gaps,
+        'modules': modules,
+    }
+
+
+def module_growth(scans, min_scans=3, ratio=1.5, min_seconds=60):
+    """Modules whose latest duration exceeds the median of their earlier scans.
+
+    Returns [(module, scans, first, median_before, last, ratio, slope_per_scan)]
+    for flagged modules, worst ratio first. Durations are per-scan sums.
+    """
+    series = {}
+    for index, rows in enumerate(scans):
+        per_module = {}
+        for module, _, _, duration in rows:
+            per_module[module] = per_module.get(module, 0) + duration
+        for module, duration in per_module.items():
+            series.setdefault(module, []).append((index, duration))
+
+    flagged = []
+    for module, points in series.items():
+        if len(points) < min_scans:
+            continue
+        durations = [d for _, d in points]
+        before = statistics.median(durations[:-1])
+        last = durations[-1]
+        growth = last / before if before else float('inf')
+        if growth < ratio or last - before < min_seconds:
+            continue
+        xs = [i for i, _ in points]
+        mean_x = sum(xs) / len(xs)
+        mean_y = sum(durations) / len(durations)
+        var_x = sum((x - mean_x) ** 2 for x in xs)
+        slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x if var_x else 0.0
+        flagged.append((module, len(points), durations[0], before, last, growth, slope))
+
+    flagged.sort(key=lambda r: -r[5])
+    return flagged
+
+
+def format_ts(seconds):
+    return time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime(seconds))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan timeline and per-module wall-clock share from ThorDB stats")
+    parser.add_argument("dbpath", help="Path to thor10.db or thor11.db")
+    parser.add_argument("--scan", type=int, default=-1,
+                        help="Scan to break down, 1-based; negative counts from the end (default: -1, latest)")
+    parser.add_argument("--scan-gap", type=int, default=3600,
+                        help="Idle seconds that end a scan (default: 3600)")
+    parser.add_argument("--min-gap", type=int, default=60, help="Shortest idle gap to list (default: 60)")
+    parser.add_argument("--growth", type=float, default=1.5,
+                        help="Flag modules whose last duration is this many times their earlier median (default: 1.5)")
+    parser.add_argument("--min-growth", type=int, default=60,
+                        help="... and at least this many seconds longer (default: 60)")
+    args = parser.parse_args()
+
+    dbpath = Path(args.dbpath)
+    if not dbpath.exists():
+        print(f"Error: Database not found: {dbpath}", file=sys.stderr)
+        sys.exit(1)
+
+    try:
+        conn = connect_readonly(dbpath)
+        cursor = conn.cursor()
+        if not has_table(cursor, 'stats'):
+            print("Error: 'stats' table not found in database", file=sys.stderr)
+            sys.exit(1)
+        rows = load_stats(cursor)
+        conn.close()
+    except sqlite3.Error as e:
+        print(f"SQLite error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"ThorDB Scan Timeline: {dbpath}")
+    if not rows:
+        print("  No stats rows found.")
+        return
+
+    scans = split_scans(rows, args.scan_gap)
+    timelines = [scan_timeline(scan) for scan in scans]
+
+    print_table(
+        ["Scan", "Start (UTC)", "Wall (sec)", "Idle (sec)", "Overlap (sec)", "Modules"],
+        [(i, format_ts(t['start']), t['wall'], t['idle'], t['overlap'], len(t['modules']))
+         for i, t in enumerate(timelines, 1)],
+        f"Scans ({len(scans)})"
+    )
+
+    index = args.scan - 1 if args.scan > 0 else len(scans) + args.scan
+    if not 0 <= index < len(scans):
+        print(f"Error: scan {args.scan} out of range (1-{len(scans)})", file=sys.stderr)
+        sys.exit(1)
+    timeline = timelines[index]
+    wall = timeline['wall'] or 1
+
+    modules = sorted(timeline['modules'].items(), key=lambda item: -item[1]['attributed'])
+    print_table(
+        ["Module", "Runs", "Duration (sec)", "Exclusive (sec)", "Overlapped (sec)", "Wall share %"],
+        [(module, m['runs'], m['duration'], round(m['exclusive'], 1), round(m['overlapped'], 1),
+          round(100.0 * m['attributed'] / wall, 1))
+         for module, m in modules],
+        f"Scan {index + 1}: wall-clock share by module ({timeline['wall']}s wall)"
+    )
+    if timeline['overlap']:
+        print(f"\n{timeline['overlap']}s of the scan had several modules running at once; "
+              f"shared time is split evenly between them.")
+
+    gaps = [(format_ts(a), format_ts(b), b - a) for a, b in timeline['gaps'] if b - a >= args.min_gap]
+    print_table(["From (UTC)", "To (UTC)", "Idle (sec)"], gaps,
+                f"Scan {index + 1}: idle gaps >= {args.min_gap}s ({timeline['idle']}s idle in total)")
+
+    growing = module_growth(scans, ratio=args.growth, min_seconds=args.min_growth)
+    print_table(
+        ["Module", "Scans", "First (sec)", "Median before (sec)", "Last (sec)", "Ratio", "Trend (sec/scan)"],
+        [(m, n, first, round(float(before), 1), last, round(ratio, 2), round(slope, 1))
+         for m, n, first, before, last, ratio, slope in growing],
+        f"Modules growing across scans (last >= {args.growth}x earlier median)"
+    )
+
+
+if __name__ == "__main__":
+    main()
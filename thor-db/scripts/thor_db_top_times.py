@@ -11,45 +11,22 @@ import sys
 import argparse
 from pathlib import Path
 
+from thor_db_analysis import TimesAnalysis, connect_analysis, has_table
 
-def get_top_by_total(cursor, limit=20):
+
+def get_top_by_total(times, limit=20):
     """Get elements with highest total time."""
-    cursor.execute("""
-        SELECT category, element, count,
-               duration/1e9 AS seconds_total,
-               (duration*1.0/count)/1e9 AS seconds_avg
-        FROM times
-        ORDER BY duration DESC
-        LIMIT ?
-    """, (limit,))
-    return cursor.fetchall()
-
-
-def get_top_by_average(cursor, limit=20, min_count=5):
+    return times.top_by_total(limit)
+
+
+def get_top_by_average(times, limit=20, min_count=5):
     """Get elements with highest average time per invocation."""
-    cursor.execute("""
-        SELECT category, element, count,
-               (duration*1.0/count)/1e9 AS seconds_avg,
-               duration/1e9 AS seconds_total
-        FROM times
-        WHERE count >= ?
-        ORDER BY (duration*1.0/count) DESC
-        LIMIT ?
-    """, (min_count, limit))
-    return cursor.fetchall()
-
-
-def get_by_category(cursor):
+    return times.top_by_average(limit, min_count)
+
+
+def get_by_category(times):
     """Get time totals grouped by category."""
-    cursor.execute("""
-        SELECT category,
-               SUM(count) AS total_invocations,
-               SUM(duration)/1e9 AS total_seconds
-        FROM times
-        GROUP BY category
-        ORDER BY total_seconds DESC
-    """)
-    return cursor.fetchall()
+    return times.category_totals()
 
 
 def print_table(headers, rows, title=None):
@@ -99,19 +76,20 @@ def main():
         sys.exit(1)
 
     try:
-        conn = sqlite3.connect(str(dbpath))
+        conn, _ = connect_analysis(dbpath)
         cursor = conn.cursor()
 
         # Check if times table exists
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='times'")
-        if not cursor.fetchone():
+        if not has_table(cursor, 'times'):
             print("Error: 'times' table not found in database", file=sys.stderr)
             sys.exit(1)
 
+        times = TimesAnalysis(cursor)
+
         print(f"ThorDB Analysis: {dbpath}")
 
         if args.by_category:
-            rows = get_by_category(cursor)
+            rows = get_by_category(times)
             print_table(
                 ["Category", "Invocations", "Total (sec)"],
                 rows,
@@ -119,7 +97,7 @@ def main():
             )
         else:
             # Top by total time
-            rows = get_top_by_total(cursor, args.top)
+            rows = get_top_by_total(times, args.top)
             print_table(
                 ["Category", "Element", "Count", "Total (sec)", "Avg (sec)"],
                 rows,
@@ -127,7 +105,7 @@ def main():
             )
 
             # Top by average time
-            rows = get_top_by_average(cursor, args.top, args.min_count)
+            rows = get_top_by_average(times, args.top, args.min_count)
             print_table(
                 ["Category", "Element", "Count", "Avg (sec)", "Total (sec)"],
                 rows,
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Inventory of a THOR Lens case from its Parquet footers only.
+
+case_inventory.sh counts files and partitions. This script also reports
+row counts, timestamp ranges, compression and per-column sizes without
+reading any data pages. A Parquet footer holds the row count of every row
+group and the size, null count and min/max statistics of every column
+chunk. Only the footers are read, in a thread pool, so a case with
+thousands of files is inventoried in about the time it takes to open them.
+
+Small files slow down every UI and MCP query, because DuckDB opens each
+file under the partitions a query touches. The report shows how fragmented
+each partition is and builds a compaction plan: the small files of each
+partition are grouped, in name order, into files of up to --target-mb.
+The plan only describes the merge (--plan FILE writes it as JSON). The
+case's event files are immutable, so apply it to a copy of the case or
+re-import with fewer workers.
+
+Requires pyarrow.
+
+Usage:
+    parquet_inventory.py <case_dir> [--workers N] [--timestamp-column NAME]
+                         [--small-mb MB] [--target-mb MB] [--plan FILE]
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+DEFAULT_WORKERS = 16
+DEFAULT_SMALL_MB = 64
+DEFAULT_TARGET_MB = 256
+
+
+def import_pyarrow():
+    """Import pyarrow on demand (it is slow to load); return None if not installed."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+
+def find_parquet_files(events_dir):
+    """Sorted [(partition, path)] under events_dir; partition is the relative directory ('.' at the top)."""
+    files = []
+    for root, dirs, names in os.walk(events_dir):
+        dirs.sort()
+        partition = os.path.relpath(root, events_dir)
+        files.extend((partition, os.path.join(root, name)) for name in sorted(names) if name.endswith('.parquet'))
+    return files
+
+
+def read_footer(path, timestamp_column=None):
+    """Summarize one file from its footer.
+
+    Returns a dict with bytes, rows, row_groups, compressed, uncompressed,
+    timestamp column name plus min/max (None without statistics), and
+    columns: {path: [type, compressed, uncompressed, nulls]}. A file whose
+    footer cannot be read is returned with an 'error' instead.
+    """
+    import pyarrow
+    import pyarrow.parquet
+    info = {'path': path, 'bytes': os.path.getsize(path)}
+    try:
+        meta = pyarrow.parquet.read_metadata(path)
+    except (OSError, pyarrow.ArrowException) as e:
+        info['error'] = str(e)
+        return info
+
+    schema = meta.schema
+    arrow_schema = schema.to_arrow_schema()
+    if timestamp_column is None:
+        timestamp_column = next((field.name for field in arrow_schema
+                                 if pyarrow.types.is_timestamp(field.type)), None)
+    columns = {}
+    for i in range(meta.num_columns):
+        column = schema.column(i)
+        logical = column.logical_type.type
+        columns[column.path] = [column.physical_type if logical == 'NONE' else logical, 0, 0, 0]
+
+    low = high = None
+    for g in range(meta.num_row_groups):
+        row_group = meta.row_group(g)
+        for c in range(row_group.num_columns):
+            chunk = row_group.column(c)
+            entry = columns[chunk.path_in_schema]
+            entry[1] += chunk.total_compressed_size
+            entry[2] += chunk.total_uncompressed_size
+            stats = chunk.statistics
+            if stats is not None and stats.has_null_count:
+                entry[3] += stats.null_count
+            if chunk.path_in_schema == timestamp_column and stats is not None and stats.has_min_max:
+                low = stats.min if low is None else min(low, stats.min)
+                high = stats.max if high is None else max(high, stats.max)
+
+    info.update({
+        'rows': meta.num_rows,
+        'row_groups': meta.num_row_groups,
+        'compressed': sum(entry[1] for entry in columns.values()),
+        'uncompressed': sum(entry[2] for entry in columns.values()),
+        'timestamp_column': timestamp_column,
+        'min': low,
+        'max': high,
+        'columns': columns,
+    })
+    return info
+
+
+def read_footers(paths, workers=DEFAULT_WORKERS, timestamp_column=None):
+    """read_footer() for every path, in order; footers are fetched concurrently."""
+    if workers <= 1 or len(paths) <= 1:
+        return [read_footer(path, timestamp_column) for path in paths]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(read_footer, paths, [timestamp_column] * len(paths)))
+
+
+def summarize_partitions(files, footers, small_bytes):
+    """Per-partition totals: [(partition, stats)] in partition order."""
+    partitions = {}
+    for (partition, _), info in zip(files, footers):
+        entry = partitions.setdefault(partition, {'files': 0, 'small': 0, 'bytes': 0, 'rows': 0,
+                                                  'compressed': 0, 'uncompressed': 0,
+                                                  'min': None, 'max': None, 'errors': 0})
+        entry['files'] += 1
+        entry['bytes'] += info['bytes']
+        if info['bytes'] < small_bytes:
+            entry['small'] += 1
+        if 'error' in info:
+            entry['errors'] += 1
+            continue
+        entry['rows'] += info['rows']
+        entry['compressed'] += info['compressed']
+        entry['uncompressed'] += info['uncompressed']
+        if info['min'] is not None:
+            entry['min'] = info['min'] if entry['min'] is None else min(entry['min'], info['min'])
+        if info['max'] is not None:
+            entry['max'] = info['max'] if entry['max'] is None else max(entry['max'], info['max'])
+    return list(partitions.items())
+
+
+def summarize_columns(footers):
+    """{column: [type, compressed, uncompressed, nulls]} over all readable files."""
+    totals = {}
+    for info in footers:
+        for column, (kind, compressed, uncompressed, nulls) in info.get('columns', {}).items():
+            entry = totals.setdefault(column, [kind, 0, 0, 0])
+            entry[1] += compressed
+            entry[2] += uncompressed
+            entry[3] += nulls
+    return totals
+
+
+def plan_compaction(files, footers, small_bytes, target_bytes):
+    """Group the small files of each partition into merges of up to target_bytes.
+
+    Files are taken in name order, which is import order, so each merged
+    file covers a contiguous slice of the partition. A group of one file is
+    not a merge. Returns a list of dicts with partition, output, inputs,
+    rows and bytes.
+    """
+    by_partition = {}
+    for (partition, _), info in zip(files, footers):
+        if 'error' not in info and info['bytes'] < small_bytes:
+            by_partition.setdefault(partition, []).append(info)
+
+    merges = []
+    for partition, infos in by_partition.items():
+        groups = [[]]
+        size = 0
+        for info in infos:
+            if groups[-1] and size + info['bytes'] > target_bytes:
+                groups.append([])
+                size = 0
+            groups[-1].append(info)
+            size += info['bytes']
+        for index, group in enumerate(g for g in groups if len(g) > 1):
+            merges.append({
+                'partition': partition,
+                'output': os.path.join(partition, f"compacted-{index:04d}.parquet"),
+                'inputs': [os.path.basename(info['path']) for info in group],
+                'rows': sum(info['rows'] for info in group),
+                'bytes': sum(info['bytes'] for info in group),
+            })
+    return merges
+
+
+def format_size(size):
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if abs(size) < 1024 or unit == 'GiB':
+            return f"{size} B" if unit == 'B' else f"{size:.1f} {unit}"
+        size /= 1024
+
+
+def format_time(value):
+    if value is None:
+        return '?'
+    return value.strftime('%Y-%m-%d %H:%M:%S') if hasattr(value, 'strftime') else str(value)
+
+
+def ratio(uncompressed, compressed):
+    return f"{uncompressed / compressed:.1f}x" if compressed else '-'
+
+
+def print_rows(headers, rows, indent="  "):
+    """Print rows as left-aligned columns under headers."""
+    widths = [max(len(str(cell)) for cell in column) for column in zip(headers, *rows)]
+    for row in [headers] + rows:
+        print(indent + "  ".join(str(cell).ljust(width) for cell, width in zip(row, widths)).rstrip())
+
+
+def load_meta(case_dir):
+    try:
+        with open(os.path.join(case_dir, 'meta.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="THOR Lens case inventory from Parquet footers")
+    parser.add_argument("case_dir", help="Case directory (contains meta.json and events/)")
+    parser.add_argument("--workers", "-w", type=int, default=DEFAULT_WORKERS,
+                        help=f"Footers read concurrently (default: {DEFAULT_WORKERS})")
+    parser.add_argument("--timestamp-column", metavar="NAME",
+                        help="Column for min/max time (default: first timestamp column)")
+    parser.add_argument("--small-mb", type=float, default=DEFAULT_SMALL_MB,
+                        help=f"Files below this size count as small (default: {DEFAULT_SMALL_MB})")
+    parser.add_argument("--target-mb", type=float, default=DEFAULT_TARGET_MB,
+                        help=f"Largest merged file in the compaction plan (default: {DEFAULT_TARGET_MB})")
+    parser.add_argument("--plan", metavar="FILE", help="Write the compaction plan as JSON")
+    args = parser.parse_args()
+
+    events_dir = os.path.join(args.case_dir, 'events')
+    if not os.path.isdir(events_dir):
+        print(f"Error: events/ directory not found in {args.case_dir}", file=sys.stderr)
+        sys.exit(1)
+    if import_pyarrow() is None:
+        print("Error: reading Parquet footers requires pyarrow (pip install pyarrow)", file=sys.stderr)
+        sys.exit(1)
+
+    small_bytes = int(args.small_mb * 1024 * 1024)
+    target_bytes = int(args.target_mb * 1024 * 1024)
+
+    files = find_parquet_files(events_dir)
+    start = time.perf_counter()
+    footers = read_footers([path for _, path in files], args.workers, args.timestamp_column)
+    elapsed = time.perf_counter() - start
+
+    partitions = summarize_partitions(files, footers, small_bytes)
+    readable = [info for info in footers if 'error' not in info]
+    total_rows = sum(info['rows'] for info in readable)
+    total_bytes = sum(info['bytes'] for info in footers)
+    compressed = sum(info['compressed'] for info in readable)
+    uncompressed = sum(info['uncompressed'] for info in readable)
+    lows = [info['min'] for info in readable if info['min'] is not None]
+    highs = [info['max'] for info in readable if info['max'] is not None]
+    small = sum(entry['small'] for _, entry in partitions)
+    timestamp_columns = sorted({info['timestamp_column'] for info in readable if info['timestamp_column']})
+
+    print(f"THOR Lens Parquet Inventory: {args.case_dir}")
+    print(f"  Files:        {len(files)} in {len(partitions)} partition(s), footers read in {elapsed:.2f}s "
+          f"({args.workers} worker(s))")
+    print(f"  Rows:         {total_rows}")
+    meta = load_meta(args.case_dir)
+    if meta and isinstance(meta.get('event_count'), int) and meta['event_count'] != total_rows:
+        print(f"  WARNING: meta.json event_count is {meta['event_count']}, footers add up to {total_rows}")
+    print(f"  On disk:      {format_size(total_bytes)} (data pages {format_size(compressed)}, "
+          f"{format_size(uncompressed)} uncompressed, {ratio(uncompressed, compressed)})")
+    if timestamp_columns:
+        print(f"  Time range:   {format_time(min(lows) if lows else None)} to "
+              f"{format_time(max(highs) if highs else None)} ({', '.join(timestamp_columns)})")
+    else:
+        print("  Time range:   no timestamp column (use --timestamp-column)")
+    if files:
+        print(f"  Small files:  {small} of {len(files)} under {args.small_mb:g} MB, "
+              f"average file {format_size(total_bytes // len(files))}")
+
+    print("\nPartitions")
+    print("----------")
+    print_rows(["Partition", "Files", "Small", "Rows", "Size", "Avg file", "Ratio", "Min time", "Max time"],
+               [[partition, entry['files'], entry['small'], entry['rows'], format_size(entry['bytes']),
+                 format_size(entry['bytes'] // entry['files']), ratio(entry['uncompressed'], entry['compressed']),
+                 format_time(entry['min']), format_time(entry['max'])]
+                for partition, entry in partitions])
+
+    columns = summarize_columns(readable)
+    if columns:
+        print("\nColumns (largest first)")
+        print("-----------------------")
+        print_rows(["Column", "Type", "Compressed", "Uncompressed", "Ratio", "Nulls"],
+                   [[column, kind, format_size(c), format_size(u), ratio(u, c), nulls]
+                    for column, (kind, c, u, nulls) in sorted(columns.items(), key=lambda x: -x[1][1])])
+
+    unreadable = [info for info in footers if 'error' in info]
+    if unreadable:
+        print("\nUnreadable Files")
+        print("----------------")
+        for info in unreadable:
+            print(f"  {os.path.relpath(info['path'], events_dir)}: {info['error']}")
+
+    merges = plan_compaction(files, footers, small_bytes, target_bytes)
+    merged_inputs = sum(len(merge['inputs']) for merge in merges)
+    files_after = len(files) - merged_inputs + len(merges)
+    print("\nCompaction Plan")
+    print("---------------")
+    if merges:
+        print(f"  Merge {merged_inputs} small files into {len(merges)}: {len(files)} -> {files_after} files "
+              f"(target {args.target_mb:g} MB)")
+        print_rows(["Output", "Inputs", "Rows", "Size"],
+                   [[merge['output'], len(merge['inputs']), merge['rows'], format_size(merge['bytes'])]
+                    for merge in merges[:20]])
+        if len(merges) > 20:
+            print(f"  ... and {len(merges) - 20} more merges")
+    else:
+        print("  Nothing to merge: no partition has two or more small files.")
+
+    if args.plan:
+        with open(args.plan, 'w', encoding='utf-8') as f:
+            json.dump({'case_dir': os.path.abspath(args.case_dir), 'small_bytes': small_bytes,
+                       'target_bytes': target_bytes, 'files_before': len(files), 'files_after': files_after,
+                       'merges': merges}, f, indent=2)
+        print(f"\nPlan written to {args.plan}")
+
+    if unreadable:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+"""
+Validate a THOR v11 audit trail (JSONL or JSONL.gz) before a THOR Lens import.
+
+Every record is checked, not just the first few lines. Checking only a
+sample lets a multi-GB audit trail pass and then fail halfway through an
+import. A background thread decompresses the file, and gzip CRC and
+length are verified for every member. The main thread cuts the stream into
+batches of whole lines, and a process pool parses the batches as JSON. The
+report lists each bad record with its line number and byte offset in the
+uncompressed stream, counts records by `type`, and shows the throughput.
+
+--repair OUT writes a copy without the bad lines. A truncated gzip member
+is cut at its last complete line. For .gz output each batch is compressed
+by its worker as a separate gzip member; readers such as zcat, Python and
+Go handle multi-member gzip like a single stream.
+
+Usage:
+    validate_audit_trail.py <audit_trail.jsonl[.gz]> [--workers N] [--show N] [--repair OUT]
+
+Exit codes:
+    0 = Valid audit trail
+    1 = File not found or empty
+    2 = Gzip integrity failure (corrupt or truncated)
+    3 = Lines that are not valid JSON objects
+    4 = Wrong format (not an audit trail)
+"""
+
+import argparse
+import os
+import queue
+import sys
+import threading
+import time
+import zlib
+from collections import Counter, deque
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    import json
+    json_loads = json.loads
+
+READ_BLOCK_BYTES = 1 << 20
+BATCH_BYTES = 4 << 20
+# Decompressed blocks buffered ahead of the parser
+QUEUE_BLOCKS = 8
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+EXCERPT_CHARS = 80
+# Fields every audit trail record has; regular THOR JSON logs have neither
+AUDIT_TRAIL_FIELDS = ('type', 'object')
+
+
+class IntegrityError(Exception):
+    """Compressed stream is corrupt or ends mid-member."""
+
+    def __init__(self, message, compressed_offset):
+        super().__init__(message)
+        self.compressed_offset = compressed_offset
+
+
+def inflate(filepath, out, block_size=READ_BLOCK_BYTES):
+    """Producer thread: put decompressed blocks of filepath on out, then None or an exception.
+
+    Plain files are passed through. Gzip files may have several members.
+    Trailing zero padding after the last member is ignored, as gzip does.
+    """
+    try:
+        with open(filepath, 'rb') as f:
+            if not filepath.endswith('.gz'):
+                for block in iter(lambda: f.read(block_size), b''):
+                    out.put(block)
+                out.put(None)
+                return
+
+            inflater = zlib.decompressobj(GZIP_WBITS)
+            member_started = False
+            position = 0
+            for raw in iter(lambda: f.read(block_size), b''):
+                data = raw
+                while True:
+                    if not member_started and not data.strip(b'\0'):
+                        break
+                    member_started = True
+                    try:
+                        # Capped output: a highly compressible block must not
+                        # inflate into hundreds of MB at once
+                        block = inflater.decompress(data, block_size)
+                    except zlib.error as e:
+                        raise IntegrityError(f"corrupt gzip data ({e})", position) from None
+                    if block:
+                        out.put(block)
+                    if inflater.eof:
+                        data = inflater.unused_data
+                        inflater = zlib.decompressobj(GZIP_WBITS)
+                        member_started = False
+                    else:
+                        data = inflater.unconsumed_tail
+                        if not data and len(block) < block_size:
+                            break
+                position += len(raw)
+            if member_started:
+                raise IntegrityError("gzip stream is truncated (last member has no end)", position)
+        out.put(None)
+    except Exception as e:
+        out.put(e)
+
+
+def iter_blocks(filepath):
+    """Yield decompressed blocks while a thread inflates ahead; re-raises its error at the end."""
+    blocks = queue.Queue(maxsize=QUEUE_BLOCKS)
+    thread = threading.Thread(target=inflate, args=(filepath, blocks), daemon=True)
+    thread.start()
+    while True:
+        block = blocks.get()
+        if block is None:
+            break
+        if isinstance(block, Exception):
+            raise block
+        yield block
+    thread.join()
+
+
+def check_batch(data, repair=None):
+    """Validate the lines of a batch.
+
+    Returns {'lines', 'types', 'bad', 'first', 'good'}:
+    - bad: list of (line index, byte offset, reason, excerpt) within the batch
+    - first: the first valid record, or None
+    - good: the batch without its bad lines, or None unless repair is set;
+      repair='gz' returns it as a gzip member
+    """
+    lines = data.split(b'\n')
+    if lines[-1] == b'':
+        lines.pop()
+    types = Counter()
+    bad = []
+    first = None
+    offset = 0
+    for index, line in enumerate(lines):
+        reason = None
+        if not line.strip():
+            reason = "empty line"
+        else:
+            try:
+                record = json_loads(line)
+            except ValueError as e:
+                reason = f"invalid JSON: {e}"
+            else:
+                if isinstance(record, dict):
+                    record_type = record.get('type')
+                    types[record_type if isinstance(record_type, str) else '(no type)'] += 1
+                    if first is None:
+                        first = record
+                else:
+                    reason = f"not a JSON object ({type(record).__name__})"
+        if reason is not None:
+            bad.append((index, offset, reason, line[:EXCERPT_CHARS].decode('utf-8', errors='replace')))
+        offset += len(line) + 1
+
+    good = None
+    if repair:
+        dropped = {index for index, _, _, _ in bad}
+        kept = [line for index, line in enumerate(lines) if index not in dropped] if bad else lines
+        good = b'\n'.join(kept) + b'\n' if kept else b''
+        if repair == 'gz' and good:
+            import gzip
+            good = gzip.compress(good, compresslevel=6, mtime=0)
+    return {'lines': len(lines), 'types': types, 'bad': bad, 'first': first, 'good': good}
+
+
+def iter_batches(blocks, batch_bytes=BATCH_BYTES):
+    """Regroup blocks into batches that end on a line boundary (except a final partial line).
+
+    If blocks raises IntegrityError, the complete lines received before it
+    are yielded first and the error is re-raised; the cut-off last line is
+    dropped.
+    """
+    pending = []
+    pending_size = 0
+    try:
+        for block in blocks:
+            pending.append(block)
+            pending_size += len(block)
+            if pending_size < batch_bytes:
+                continue
+            data = b''.join(pending)
+            cut = data.rfind(b'\n') + 1
+            if cut == 0:
+                pending = [data]
+                continue
+            yield data[:cut]
+            pending = [data[cut:]] if cut < len(data) else []
+            pending_size = len(data) - cut
+    except IntegrityError:
+        data = b''.join(pending)
+        cut = data.rfind(b'\n') + 1
+        if cut:
+            yield data[:cut]
+        raise
+    if pending_size:
+        yield b''.join(pending)
+
+
+def validate(filepath, workers=1, repair=None, on_batch=None):
+    """Validate a whole audit trail.
+
+    repair is None, 'gz' or 'plain' and on_batch(result) receives each batch
+    result in file order (used to write the repaired copy). Returns a dict
+    with records, lines, bytes, types, bad (absolute line number starting
+    at 1, byte offset, reason, excerpt), first record and integrity error.
+    """
+    summary = {'lines': 0, 'records': 0, 'bytes': 0, 'types': Counter(), 'bad': [],
+               'first': None, 'integrity_error': None}
+
+    def collect(result, base_line, base_offset):
+        summary['lines'] += result['lines']
+        summary['types'].update(result['types'])
+        summary['records'] += sum(result['types'].values())
+        summary['bad'].extend((base_line + index + 1, base_offset + offset, reason, excerpt)
+                              for index, offset, reason, excerpt in result['bad'])
+        if summary['first'] is None:
+            summary['first'] = result['first']
+        if on_batch:
+            on_batch(result)
+
+    def counted(blocks):
+        # Everything inflated, including a cut-off last line of a truncated trail
+        for block in blocks:
+            summary['bytes'] += len(block)
+            yield block
+
+    def batches():
+        # Batch positions are tracked here, while the blocks stream in
+        line = 0
+        offset = 0
+        try:
+            for data in iter_batches(counted(iter_blocks(filepath))):
+                yield data, line, offset
+                line += data.count(b'\n')
+                offset += len(data)
+        except IntegrityError as e:
+            summary['integrity_error'] = e
+
+    if workers > 1:
+        # Imported here: the pool machinery costs more than validating a small file
+        from concurrent.futures import ProcessPoolExecutor
+        in_flight = deque()
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for data, line, offset in batches():
+                in_flight.append((pool.submit(check_batch, data, repair), line, offset))
+                # Bounded look-ahead keeps memory flat on multi-GB inputs
+                if len(in_flight) > 2 * workers:
+                    future, base_line, base_offset = in_flight.popleft()
+                    collect(future.result(), base_line, base_offset)
+            while in_flight:
+                future, base_line, base_offset = in_flight.popleft()
+                collect(future.result(), base_line, base_offset)
+    else:
+        for data, line, offset in batches():
+            collect(check_batch(data, repair), line, offset)
+
+    return summary
+
+
+def format_size(size):
+    for unit in ('B', 'KiB', 'MiB', 'GiB'):
+        if size < 1024 or unit == 'GiB':
+            return f"{size:.1f} {unit}" if unit != 'B' else f"{size} B"
+        size /= 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Validate a THOR v11 audit trail for THOR Lens import")
+    parser.add_argument("filepath", help="Audit trail (.jsonl or .jsonl.gz)")
+    parser.add_argument("--workers", "-w", type=int, default=0,
+                        help="Processes parsing JSON batches (default: 0 = all CPUs)")
+    parser.add_argument("--show", type=int, default=20,
+                        help="Bad records to list (default: 20, 0 = all)")
+    parser.add_argument("--repair", metavar="OUT",
+                        help="Write a copy without the bad lines (gzip if OUT ends in .gz)")
+    args = parser.parse_args()
+
+    filepath = args.filepath
+    print(f"Validating: {filepath}")
+    print("---")
+    if not os.path.isfile(filepath):
+        print(f"ERROR: File not found: {filepath}")
+        sys.exit(1)
+    size = os.path.getsize(filepath)
+    if size == 0:
+        print("ERROR: File is empty")
+        sys.exit(1)
+    print(f"Size: {format_size(size)}")
+    print(f"Format: {'Gzip compressed' if filepath.endswith('.gz') else 'Plain JSONL'}")
+
+    if args.repair and os.path.abspath(args.repair) == os.path.abspath(filepath):
+        print("ERROR: --repair must not overwrite the input", file=sys.stderr)
+        sys.exit(1)
+
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    repair_out = None
+    on_batch = None
+    repair = None
+    if args.repair:
+        repair = 'gz' if args.repair.endswith('.gz') else 'plain'
+        repair_out = open(args.repair + '.tmp', 'wb')
+
+        def on_batch(result):
+            repair_out.write(result['good'])
+
+    start = time.perf_counter()
+    try:
+        summary = validate(filepath, workers, repair, on_batch)
+    except OSError as e:
+        print(f"ERROR: Cannot read file: {e}")
+        sys.exit(1)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    finally:
+        if repair_out is not None:
+            repair_out.close()
+    elapsed = time.perf_counter() - start
+
+    integrity_error = summary['integrity_error']
+    if filepath.endswith('.gz'):
+        if integrity_error:
+            print(f"ERROR: Gzip integrity check failed: {integrity_error} "
+                  f"(near compressed offset {integrity_error.compressed_offset})")
+            print(f"  {summary['bytes']} bytes were readable before the failure")
+        else:
+            print("Gzip: OK (CRC and length of every member verified)")
+
+    bad = summary['bad']
+    print(f"Lines: {summary['lines']} ({summary['records']} valid records, {len(bad)} bad)")
+    if bad:
+        shown = bad if args.show == 0 else bad[:args.show]
+        print("Bad records (line, byte offset in uncompressed stream):")
+        for line, offset, reason, excerpt in shown:
+            print(f"  line {line}, offset {offset}: {reason}")
+            print(f"    {excerpt!r}")
+        if len(bad) > len(shown):
+            print(f"  ... and {len(bad) - len(shown)} more")
+    else:
+        print("JSON: OK (every line checked)")
+
+    if summary['types']:
+        print("Record types:")
+        for record_type, count in summary['types'].most_common():
+            print(f"  {count:>12}  {record_type}")
+
+    mb = summary['bytes'] / 1e6
+    rate = summary['lines'] / elapsed if elapsed else 0.0
+    print(f"Throughput: {mb:.1f} MB uncompressed in {elapsed:.2f}s "
+          f"({mb / elapsed if elapsed else 0.0:.1f} MB/s, {rate:,.0f} lines/s, {workers} worker(s))")
+
+    first = summary['first']
+    if first is not None and isinstance(first.get('hostname'), str):
+        print(f"Hostname: {first['hostname']}")
+
+    if args.repair:
+        os.replace(args.repair + '.tmp', args.repair)
+        print(f"Repaired copy: {args.repair} ({summary['records']} records, {len(bad)} bad lines dropped)")
+
+    print("---")
+    if integrity_error:
+        print("INVALID: Compressed stream is damaged; THOR Lens import would stop at the failure point")
+        sys.exit(2)
+    if first is None:
+        print("INVALID: No valid JSON records")
+        sys.exit(3)
+    missing = [field for field in AUDIT_TRAIL_FIELDS if field not in first]
+    if missing:
+        print("WARNING: This may not be a THOR audit trail file.")
+        print(f"  Expected fields: {', '.join(repr(f) for f in AUDIT_TRAIL_FIELDS)}; first record has: "
+              f"{', '.join(sorted(first))}")
+        print("  Regular THOR logs have: 'level', 'message', 'module'")
+        print("  Audit trails have: 'type', 'object', 'timestamps'")
+        sys.exit(4)
+    if bad:
+        print(f"INVALID: {len(bad)} line(s) are not valid JSON records")
+        sys.exit(3)
+    print("VALID: File is a valid THOR v11 audit trail")
+
+
+if __name__ == "__main__":
+    main()
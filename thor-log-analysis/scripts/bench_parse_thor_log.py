@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Benchmark parse_thor_log against the previous five-regex parser.
+
+Generates a synthetic THOR text log (mostly Info lines with a configurable
+share of findings) and reports lines/sec for the legacy parser, the
+single-pass parser reading in text mode, and the single-pass parser behind
+the memory-mapped byte prefilter (the default).
+
+Usage:
+    bench_parse_thor_log.py [--lines N] [--finding-ratio R] [--keep FILE]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from functools import partial
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from summarize_thor_log import parse_input, parse_thor_log  # noqa: E402
+
+MODULES = ['Filescan', 'ProcessCheck', 'Autoruns', 'ServiceCheck', 'EventlogScan', 'RegistryChecks']
+RULES = ['HKTL_CobaltStrike_Beacon', 'SUSP_PowerShell_Encoded', 'MAL_Emotet_Loader',
+         'APT_Lazarus_Dropper', 'PUA_AnyDesk_Portable', 'SUSP_Renamed_PsExec']
+LEVELS = ['Alert', 'Warning', 'Warning', 'Notice', 'Notice', 'Notice', 'Error']
+
+
+def write_synthetic_log(path, lines, finding_ratio, seed=42):
+    """Write a synthetic THOR text log with roughly finding_ratio findings."""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(lines):
+            module = rng.choice(MODULES)
+            ts = f"Jan 14 10:{(i // 60) % 60:02d}:{i % 60:02d}"
+            if rng.random() < finding_ratio:
+                level = rng.choice(LEVELS)
+                rule = rng.choice(RULES)
+                target = f"C:\\Users\\user{rng.randint(1, 50)}\\AppData\\Local\\Temp\\file{rng.randint(1, 500)}.exe"
+                f.write(f"{ts} HOST01 THOR: {level}: MODULE: {module} MESSAGE: Suspicious file found "
+                        f"TARGET: {target} SCORE: {rng.randint(40, 140)} NAME: {rule} "
+                        f"REASON_1: YARA rule {rule} SUBSCORE_1: 75\n")
+            else:
+                f.write(f"{ts} HOST01 THOR: Info: MODULE: {module} MESSAGE: Scanning element "
+                        f"FILE: C:\\Windows\\System32\\file{i}.dll SIZE: {rng.randint(1, 10 ** 6)}\n")
+
+
+def legacy_parse_thor_log(filepath):
+    """Previous implementation: five independent regex searches per line."""
+    findings = {'alerts': [], 'warnings': [], 'notices': [], 'errors': []}
+    modules = defaultdict(int)
+    targets = defaultdict(list)
+    signatures = defaultdict(int)
+
+    level_pattern = re.compile(r'\b(Alert|Warning|Notice|Error)\b', re.IGNORECASE)
+    score_pattern = re.compile(r'SCORE:\s*(\d+)')
+    target_pattern = re.compile(r'TARGET:\s*(.+?)(?:\s+[A-Z_]+:|$)')
+    module_pattern = re.compile(r'MODULE:\s*(\w+)')
+    name_pattern = re.compile(r'NAME:\s*(.+?)(?:\s+[A-Z_]+:|$)')
+
+    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            level_match = level_pattern.search(line)
+            if not level_match:
+                continue
+            level = level_match.group(1).lower()
+            score_match = score_pattern.search(line)
+            score = int(score_match.group(1)) if score_match else None
+            target_match = target_pattern.search(line)
+            target = target_match.group(1).strip() if target_match else None
+            module_match = module_pattern.search(line)
+            module = module_match.group(1) if module_match else None
+            if module:
+                modules[module] += 1
+            name_match = name_pattern.search(line)
+            name = name_match.group(1).strip() if name_match else None
+            if name:
+                signatures[name] += 1
+            finding = {'level': level, 'score': score, 'target': target,
+                       'module': module, 'name': name, 'line': line.strip()[:200]}
+            findings[level + 's'].append(finding)
+            if target:
+                targets[target].append(finding)
+
+    return findings, modules, targets, signatures
+
+
+def time_parser(func, path, lines):
+    """Run a parser once and return (seconds, lines/sec)."""
+    start = time.perf_counter()
+    func(path)
+    elapsed = time.perf_counter() - start
+    return elapsed, lines / elapsed if elapsed else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark THOR log parsing throughput")
+    parser.add_argument("--lines", type=int, default=2_000_000, help="Synthetic log lines (default: 2000000)")
+    parser.add_argument("--finding-ratio", type=float, default=0.05,
+                        help="Share of Alert/Warning/Notice/Error lines (default: 0.05)")
+    parser.add_argument("--keep", help="Write the synthetic log to this path and keep it")
+    args = parser.parse_args()
+
+    if args.keep:
+        path = args.keep
+    else:
+        fd, path = tempfile.mkstemp(suffix='.txt', prefix='thor_bench_')
+        os.close(fd)
+
+    try:
+        write_synthetic_log(path, args.lines, args.finding_ratio)
+        size_mb = os.path.getsize(path) / 1e6
+        print(f"Synthetic log: {args.lines} lines, {size_mb:.1f} MB, finding ratio {args.finding_ratio}")
+
+        legacy_sec, legacy_lps = time_parser(legacy_parse_thor_log, path, args.lines)
+        text_sec, text_lps = time_parser(partial(parse_input, mmap_scan=False), path, args.lines)
+        current_sec, current_lps = time_parser(parse_thor_log, path, args.lines)
+
+        print(f"  legacy (5 regex):   {legacy_sec:8.2f}s  {legacy_lps:12,.0f} lines/sec")
+        print(f"  1 pass, text mode:  {text_sec:8.2f}s  {text_lps:12,.0f} lines/sec")
+        print(f"  1 pass, mmap scan:  {current_sec:8.2f}s  {current_lps:12,.0f} lines/sec")
+        if current_sec:
+            print(f"  speedup vs legacy:  {legacy_sec / current_sec:8.2f}x")
+            print(f"  mmap vs text mode:  {text_sec / current_sec:8.2f}x")
+    finally:
+        if not args.keep:
+            os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,90 +7,1207 @@ Extracts key findings, counts by severity, and identifies top targets.
 import sys
 import os
 import re
-from collections import defaultdict
+import argparse
+import glob
+import heapq
+import io
+import json
+import mmap
+import time
+import zlib
+from array import array
+from collections import Counter, defaultdict
+from functools import lru_cache
+from itertools import chain, repeat
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
+
+COMPRESSED_SUFFIXES = ('.gz', '.zst')
+# Malformed or truncated input; anything else is a bug and keeps its traceback
+LOG_DATA_ERRORS = (ValueError, EOFError, zlib.error) + ((zstandard.ZstdError,) if zstandard else ())
+FINGERPRINT_HEAD_BYTES = 4096
+FORMAT_SNIFF_BYTES = 4096
+STATE_VERSION = 1
+# Part of the --cache key; bump when parse_line/parse_json_line output changes
+PARSER_VERSION = 7
+LOG_SUFFIXES = tuple(base + comp for base in ('.txt', '.log', '.json', '.jsonl')
+                     for comp in ('', '.gz', '.zst'))
+
+LEVEL_PATTERN = re.compile(r'\b(Alert|Warning|Notice|Error)\b', re.IGNORECASE)
+LEVEL_KEYWORDS = ('alert', 'warning', 'notice', 'error')
+LEVEL_CODES = {level: code for code, level in enumerate(LEVEL_KEYWORDS)}
+LEVEL_KEYWORDS_BYTES = tuple(keyword.encode() for keyword in LEVEL_KEYWORDS)
+# Case-sensitive markers the JSON prefilter also keeps (audit trail findings)
+JSON_MARKERS_BYTES = (b'"reasons"',)
+SCAN_CHUNK_BYTES = 1 << 20
+# Above this share of matching lines a chunk is decoded whole instead of line by line
+DENSE_LINE_RATIO = 0.2
+SCAN_PROBE_BYTES = 64 << 10
+
+# Splitting on " KEY: " tokenizes a whole line in one pass:
+# [prefix, key1, value1, key2, value2, ...]
+# The keys the summary reads may also be written without a space ("SCORE:75");
+# any other key needs one, so "C:\" inside a value never starts a field
+COMPACT_KEYS = ('SCORE', 'MODULE', 'TARGET', 'NAME', 'FILE')
+FIELD_SPLIT = re.compile(r'\s([A-Z][A-Z0-9_]*):(?:\s|$|' + '|'.join(rf'(?<=\s{key}:)' for key in COMPACT_KEYS) + ')')
+LEADING_DIGITS = re.compile(r'\d+')
+LEADING_WORD = re.compile(r'\w+')
+# ISO 8601 timestamp a text log line starts with
+LEADING_TIMESTAMP = re.compile(r'\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:\.\d+)?(?:Z|[+-]\d{2}:?\d{2})?')
+
+def extract_fields(line):
+    """Tokenize a THOR text log line into a dict of KEY -> raw value."""
+    parts = FIELD_SPLIT.split(line)
+    # Reversed so the first occurrence of a repeated key wins
+    return dict(zip(parts[-2:0:-2], parts[:1:-2]))
+
+def parse_line(line):
+    """Parse one log line into a finding dict, or None if it is not a finding."""
+    # Cheap substring prefilter; most lines are Info and never reach the regex
+    lowered = line.lower()
+    if not any(keyword in lowered for keyword in LEVEL_KEYWORDS):
+        return None
+
+    level_match = LEVEL_PATTERN.search(line)
+    if not level_match:
+        return None
+
+    fields = extract_fields(line)
+
+    score = None
+    score_value = fields.get('SCORE')
+    if score_value:
+        score_match = LEADING_DIGITS.match(score_value)
+        if score_match:
+            score = clamp_score(int(score_match.group()))
+
+    module = None
+    module_value = fields.get('MODULE')
+    if module_value:
+        module_match = LEADING_WORD.match(module_value)
+        if module_match:
+            module = module_match.group()
+
+    # File findings name their path in FILE; use it when there is no TARGET
+    target = fields.get('TARGET') or fields.get('FILE')
+    name = fields.get('NAME')
+    time_match = LEADING_TIMESTAMP.match(line)
+
+    return {
+        'level': level_match.group(1).lower(),
+        'score': score,
+        'target': target.strip() if target else None,
+        'module': module,
+        'name': name.strip() if name else None,
+        'time': time_match.group() if time_match else None,
+        'line': line.strip()[:200]
+    }
+
+# Field candidates across THOR JSON (v1 flat keys), JSONv2 (meta/subject/reasons)
+# and v11 audit trail records (object/reasons)
+JSON_TARGET_KEYS = ('target', 'file', 'filepath', 'path')
+JSON_SUBJECT_KEYS = JSON_TARGET_KEYS + ('name',)
+JSON_NAME_KEYS = ('name', 'rulename', 'rule_name', 'rulename_1')
+JSON_SIGNATURE_KEYS = ('rule_name', 'rulename', 'name', 'id')
+
+def clamp_score(score):
+    """Clamp a parsed score into the int32 columns findings are stored in (hostile logs)."""
+    return min(max(score, -SCORE_MAX), SCORE_MAX)
+
+def level_from_score(score):
+    """Map a score to a level using THOR's default thresholds."""
+    if score is None or score < 40:
+        return None
+    if score >= 81:
+        return 'alert'
+    if score >= 60:
+        return 'warning'
+    return 'notice'
+
+def first_string(mapping, keys):
+    """Return the first non-empty string value of keys in mapping."""
+    if not isinstance(mapping, dict):
+        return None
+    for key in keys:
+        value = mapping.get(key)
+        if value and isinstance(value, str):
+            return value
+    return None
+
+def parse_json_line(line):
+    """Parse one THOR JSON / JSONv2 / audit trail line into a finding dict, or None."""
+    # Same cheap prefilter as the text path; audit trail records carry no level
+    # but every record with a finding has a "reasons" list
+    lowered = line.lower()
+    if not any(keyword in lowered for keyword in LEVEL_KEYWORDS) and '"reasons"' not in line:
+        return None
+
+    try:
+        record = json_loads(line)
+    except ValueError:
+        return None
+    if not isinstance(record, dict):
+        return None
+
+    meta = record.get('meta')
+    if not isinstance(meta, dict):
+        meta = {}
+
+    score = record.get('score', meta.get('score'))
+    try:
+        score = clamp_score(int(score)) if score is not None else None
+    except (TypeError, ValueError, OverflowError):
+        score = None
+
+    level = record.get('level') or meta.get('level')
+    if level:
+        level = str(level).lower()
+    elif record.get('reasons'):
+        level = level_from_score(score)
+    if level not in LEVEL_KEYWORDS:
+        return None
+
+    module = record.get('module') or meta.get('module')
+
+    target = (first_string(record, JSON_TARGET_KEYS)
+              or first_string(record.get('subject'), JSON_SUBJECT_KEYS)
+              or first_string(record.get('object'), JSON_SUBJECT_KEYS))
+
+    name = None
+    reasons = record.get('reasons')
+    if isinstance(reasons, list) and reasons and isinstance(reasons[0], dict):
+        reason = reasons[0]
+        name = (first_string(reason.get('signature'), JSON_SIGNATURE_KEYS)
+                or first_string(reason, JSON_SIGNATURE_KEYS))
+    if name is None:
+        name = first_string(record, JSON_NAME_KEYS)
+
+    timestamp = record.get('time') or meta.get('time')
+
+    return {
+        'level': level,
+        'score': score,
+        'target': target,
+        'module': module if isinstance(module, str) else None,
+        'name': name,
+        'time': timestamp if isinstance(timestamp, str) else None,
+        'line': line.strip()[:200]
+    }
+
+FILTER_CLAUSE = re.compile(r'\s*(\w+)\s*(>=|<=|!=|\^=|~=|=|>|<)\s*(.*?)\s*$', re.DOTALL)
+FILTER_AND = re.compile(r'\s+and\s+', re.IGNORECASE)
+STRING_OPERATORS = ('=', '!=', '^=', '~=')
+FILTER_OPERATORS = {
+    'level': ('=', '!='),
+    'score': ('=', '!=', '>', '>=', '<', '<='),
+    'module': STRING_OPERATORS,
+    'name': STRING_OPERATORS,
+    'target': STRING_OPERATORS,
+    'time': ('>', '>=', '<', '<='),
+}
+COMPARISONS = {
+    '=': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+}
+
+@lru_cache(maxsize=4096)
+def parse_timestamp(text):
+    """ISO 8601 timestamp -> epoch seconds, or None; naive times are taken as UTC."""
+    from datetime import datetime, timezone
+    if text.endswith(('Z', 'z')):
+        text = text[:-1] + '+00:00'
+    try:
+        moment = datetime.fromisoformat(text)
+    except ValueError:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+# Written as-is by some JSON encoders and as \uXXXX by others (Go escapes <, > and &)
+JSON_AMBIGUOUS_CHARS = frozenset('/<>&')
+
+def json_escape(value):
+    """How an ASCII value appears inside a JSON string, or None if escaping is ambiguous."""
+    if not value.isascii() or not JSON_AMBIGUOUS_CHARS.isdisjoint(value) or any(ord(c) < 0x20 for c in value):
+        return None
+    return value.replace('\\', '\\\\').replace('"', '\\"')
+
+class FindingFilter:
+    """AND of field predicates over findings, e.g. "score>=80 and target^=C:\\Users\\".
+
+    Clauses are FIELD OP VALUE joined by "and". Fields: level, score, module,
+    name, target, time. '=' and '!=' take comma-separated alternatives; string
+    comparisons ('=', '!=', '^=' prefix, '~=' substring) ignore case; time
+    takes ISO 8601 bounds. A finding without the field never matches.
+
+    prefilter(line, fmt) is a necessary condition checked on the raw line
+    before it is tokenized or decoded: each wanted value must occur in it,
+    and a text line's leading timestamp must be inside the time bounds.
+    matches(finding) is the exact test on the parsed fields.
+    """
+
+    def __init__(self, expressions):
+        self.expression = ' and '.join(expressions)
+        self.predicates = []
+        self.text_needles = []
+        self.json_needles = []
+        self.time_bounds = []
+        for clause in (c for expression in expressions for c in FILTER_AND.split(expression.strip())):
+            match = FILTER_CLAUSE.fullmatch(clause)
+            if not match:
+                raise ValueError(f"cannot parse filter clause {clause!r} (expected FIELD OP VALUE)")
+            field, op, value = match.group(1).lower(), match.group(2), match.group(3)
+            if field not in FILTER_OPERATORS:
+                raise ValueError(f"unknown filter field {field!r} (use {', '.join(FILTER_OPERATORS)})")
+            if op not in FILTER_OPERATORS[field]:
+                raise ValueError(f"{field} does not support {op!r} (use {' '.join(FILTER_OPERATORS[field])})")
+            if not value:
+                raise ValueError(f"missing value in filter clause {clause!r}")
+            self._add(field, op, value)
+
+    def _add(self, field, op, value):
+        if field == 'score':
+            try:
+                self.predicates.append((field, op, int(value)))
+            except ValueError:
+                raise ValueError(f"score needs an integer, got {value!r}") from None
+            self.text_needles.append(('score:',))
+            self.json_needles.append(('"score"',))
+            return
+        if field == 'time':
+            bound = parse_timestamp(value)
+            if bound is None:
+                raise ValueError(f"time needs an ISO 8601 timestamp, got {value!r}")
+            self.predicates.append((field, op, bound))
+            self.time_bounds.append((op, bound))
+            return
+
+        values = [v.strip().lower() for v in value.split(',')] if op in ('=', '!=') else [value.lower()]
+        if field == 'level':
+            unknown = [v for v in values if v not in LEVEL_KEYWORDS]
+            if unknown:
+                raise ValueError(f"unknown level {unknown[0]!r} (use {', '.join(LEVEL_KEYWORDS)})")
+        self.predicates.append((field, op, tuple(values)))
+        if op == '!=':
+            return
+        self.text_needles.append(tuple(values))
+        # JSON levels may be derived from the score, so only other fields narrow JSON lines
+        escaped = tuple(json_escape(v) for v in values)
+        if field != 'level' and None not in escaped:
+            self.json_needles.append(escaped)
+
+    def time_ok(self, timestamp):
+        moment = parse_timestamp(timestamp)
+        return moment is not None and all(COMPARISONS[op](moment, bound) for op, bound in self.time_bounds)
+
+    def prefilter(self, line, fmt='text'):
+        """False if line cannot hold a matching finding."""
+        lowered = line.lower()
+        for needles in (self.json_needles if fmt == 'json' else self.text_needles):
+            if not any(needle in lowered for needle in needles):
+                return False
+        if self.time_bounds and fmt != 'json':
+            match = LEADING_TIMESTAMP.match(line)
+            if not match or not self.time_ok(match.group()):
+                return False
+        return True
+
+    def matches(self, finding):
+        """True if the parsed finding satisfies every predicate."""
+        for field, op, wanted in self.predicates:
+            value = finding.get(field)
+            if value is None:
+                return False
+            if field == 'score':
+                if not COMPARISONS[op](value, wanted):
+                    return False
+            elif field == 'time':
+                moment = parse_timestamp(value)
+                if moment is None or not COMPARISONS[op](moment, wanted):
+                    return False
+            else:
+                value = value.lower()
+                if op == '=':
+                    ok = value in wanted
+                elif op == '!=':
+                    ok = value not in wanted
+                elif op == '^=':
+                    ok = value.startswith(wanted)
+                else:
+                    ok = any(w in value for w in wanted)
+                if not ok:
+                    return False
+        return True
+
+def detect_format(filepath):
+    """Return 'json' if the first non-blank line of a log is a JSON object, else 'text'.
+
+    Reads binary blocks until the first non-whitespace byte, so only the
+    first few KB of a compressed log are inflated.
+    """
+    with open_log_bytes(filepath) as f:
+        while True:
+            block = f.read(FORMAT_SNIFF_BYTES)
+            if not block:
+                return 'text'
+            stripped = block.lstrip()
+            if stripped:
+                return 'json' if stripped.startswith(b'{') else 'text'
+
+# Stored for findings without a score; below any real score, which the
+# parsers clamp to +-SCORE_MAX
+NO_SCORE = -(1 << 31)
+SCORE_MAX = (1 << 31) - 1
+
+class Interner:
+    """Two-way mapping between strings and dense integer IDs; ID 0 stands for None or ''."""
+
+    __slots__ = ('ids', 'values')
+
+    def __init__(self, values=(None,)):
+        self.values = list(values)
+        self.ids = {value: i for i, value in enumerate(self.values) if i}
+
+    def __len__(self):
+        return len(self.values)
+
+    def intern(self, value):
+        if not value:
+            return 0
+        i = self.ids.get(value)
+        if i is None:
+            i = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return i
+
+    def remap(self, other):
+        """IDs in self for each of other's IDs, interning values self has not seen."""
+        return [0] + [self.intern(value) for value in other.values[1:]]
+
+    def __getstate__(self):
+        # The ID dict is rebuilt on unpickling; workers ship the value list only
+        return self.values
+
+    def __setstate__(self, values):
+        self.__init__(values)
+
+class FindingTable:
+    """Accumulator for a full (non-streaming) summary: one row per finding.
+
+    Modules, signature names and targets are interned, so a string repeated by
+    thousands of findings is stored once. A row costs a uint8 level, an int32
+    score and three uint32 IDs in array columns instead of a finding dict with
+    its own 200-character line excerpt. Rows stay in file order.
+    """
+
+    def __init__(self):
+        self.levels = array('B')
+        self.scores = array('i')
+        self.module_ids = array('I')
+        self.name_ids = array('I')
+        self.target_ids = array('I')
+        self.modules = Interner()
+        self.names = Interner()
+        self.targets = Interner()
+
+    def __len__(self):
+        return len(self.levels)
+
+    def add(self, finding):
+        self.levels.append(LEVEL_CODES[finding['level']])
+        score = finding['score']
+        self.scores.append(NO_SCORE if score is None else score)
+        self.module_ids.append(self.modules.intern(finding['module']))
+        self.name_ids.append(self.names.intern(finding['name']))
+        self.target_ids.append(self.targets.intern(finding['target']))
+
+    def merge(self, other):
+        """Append other's rows. Merging in file order keeps first-seen order."""
+        self.levels.extend(other.levels)
+        self.scores.extend(other.scores)
+        for column, interner, other_column, other_interner in (
+                (self.module_ids, self.modules, other.module_ids, other.modules),
+                (self.name_ids, self.names, other.name_ids, other.names),
+                (self.target_ids, self.targets, other.target_ids, other.targets)):
+            mapping = interner.remap(other_interner)
+            column.extend(array('I', map(mapping.__getitem__, other_column)))
+
+    @property
+    def counts(self):
+        return {level + 's': self.levels.count(code) for level, code in LEVEL_CODES.items()}
+
+    def row(self, i):
+        """Finding dict (without time and line) for row i."""
+        score = self.scores[i]
+        return {
+            'level': LEVEL_KEYWORDS[self.levels[i]],
+            'score': None if score == NO_SCORE else score,
+            'target': self.targets.values[self.target_ids[i]],
+            'module': self.modules.values[self.module_ids[i]],
+            'name': self.names.values[self.name_ids[i]],
+        }
+
+    def sample(self, level, n):
+        """First n findings of a level ('alert', ...), in file order."""
+        code = LEVEL_CODES[level]
+        rows = []
+        for i, row_level in enumerate(self.levels):
+            if row_level == code:
+                rows.append(self.row(i))
+                if len(rows) == n:
+                    break
+        return rows
+
+    def value_counts(self, column, interner):
+        """{value: findings} for an ID column in first-seen order, None excluded."""
+        counts = Counter(column)
+        counts.pop(0, None)
+        return {interner.values[i]: count for i, count in counts.items()}
+
+    def module_counts(self):
+        return self.value_counts(self.module_ids, self.modules)
+
+    def signature_counts(self):
+        return self.value_counts(self.name_ids, self.names)
+
+    def top_targets(self, n, min_count=2):
+        """[(target, findings, max_score)] of the n targets with most findings."""
+        counts = Counter(self.target_ids)
+        counts.pop(0, None)
+        top = sorted((item for item in counts.items() if item[1] >= min_count), key=lambda x: -x[1])[:n]
+        best = dict.fromkeys((i for i, _ in top), 0)
+        for target_id, score in zip(self.target_ids, self.scores):
+            if target_id in best and score > best[target_id]:
+                best[target_id] = score
+        return [(self.targets.values[i], count, best[i]) for i, count in top]
+
+    def clusters(self, normalize=None):
+        """Group findings by (signature, normalized target); one row per distinct issue.
+
+        Each distinct target is normalized once (normalize_target by default)
+        and rows are grouped on integer keys. Returns
+        [(name, pattern, findings, distinct_targets, max_score, example_target)],
+        most findings first; name, pattern and example are None when absent.
+        """
+        normalize = normalize or normalize_target
+        patterns = Interner()
+        pattern_ids = [0] + [patterns.intern(normalize(t)) for t in self.targets.values[1:]]
+        width = len(patterns)
+        groups = {}
+        for name_id, target_id, score in zip(self.name_ids, self.target_ids, self.scores):
+            key = name_id * width + pattern_ids[target_id]
+            group = groups.get(key)
+            if group is None:
+                groups[key] = [1, score, {target_id}, target_id]
+            else:
+                group[0] += 1
+                if score > group[1]:
+                    group[1] = score
+                group[2].add(target_id)
+
+        rows = []
+        for key, (count, max_score, target_ids, example) in groups.items():
+            name_id, pattern_id = divmod(key, width)
+            target_ids.discard(0)
+            rows.append((self.names.values[name_id], patterns.values[pattern_id], count, len(target_ids),
+                         None if max_score == NO_SCORE else max_score, self.targets.values[example]))
+        rows.sort(key=lambda r: -r[2])
+        return rows
+
+# Parts of a target that vary between findings of the same issue
+TEMP_DIR = re.compile(r'[\\/](?:temp|tmp)[\\/]', re.IGNORECASE)
+FILE_EXTENSION = re.compile(r'\.[A-Za-z0-9]{1,8}$')
+TARGET_NORMALIZERS = (
+    (re.compile(r'^([A-Za-z]:\\(?:Users|Documents and Settings)\\)[^\\]+', re.IGNORECASE), r'\1*'),
+    (re.compile(r'^(/(?:home|Users)/)[^/]+'), r'\1*'),
+    (re.compile(r'S-1-5-21(?:-\d+){3,4}'), 'S-1-5-21-*'),
+    (re.compile(r'\{?[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\}?', re.IGNORECASE), '{GUID}'),
+    (re.compile(r'\b[0-9a-f]{16,}\b', re.IGNORECASE), '<hex>'),
+)
+
+def normalize_target(target):
+    """Collapse the per-user and per-run parts of a target path.
+
+    C:\\Users\\bob\\AppData\\Local\\Temp\\x1f3.exe -> C:\\Users\\*\\AppData\\Local\\Temp\\*.exe:
+    profile names, anything below a temp directory (keeping the extension),
+    SIDs, GUIDs and long hex strings.
+    """
+    match = TEMP_DIR.search(target)
+    if match:
+        extension = FILE_EXTENSION.search(target, match.end())
+        target = target[:match.end()] + '*' + (extension.group() if extension else '')
+    for pattern, replacement in TARGET_NORMALIZERS:
+        target = pattern.sub(replacement, target)
+    return target
+
+class SpaceSaving:
+    """Space-Saving top-K heavy-hitter sketch with an optional per-key max value.
+
+    Keeps at most k counters. Counts are exact while fewer than k distinct keys
+    have been seen; afterwards a count may overestimate by at most `error`.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.counters = {}  # key -> [count, error, max_value]
+        self.heap = []      # lazy min-heap of (count, key); stale entries skipped
+
+    def add(self, key, value=None):
+        entry = self.counters.get(key)
+        if entry is None:
+            if len(self.counters) < self.k:
+                entry = self.counters[key] = [0, 0, None]
+            else:
+                entry = self._evict(key)
+        entry[0] += 1
+        if value is not None and (entry[2] is None or value > entry[2]):
+            entry[2] = value
+        heapq.heappush(self.heap, (entry[0], key))
+        if len(self.heap) > 4 * self.k:
+            self.heap = [(e[0], k) for k, e in self.counters.items()]
+            heapq.heapify(self.heap)
+
+    def _evict(self, key):
+        while True:
+            count, victim = heapq.heappop(self.heap)
+            victim_entry = self.counters.get(victim)
+            if victim_entry is not None and victim_entry[0] == count:
+                break
+        del self.counters[victim]
+        entry = self.counters[key] = [count, count, None]
+        return entry
+
+    def floor(self):
+        """Count an unmonitored key may have reached (0 until the sketch is full)."""
+        if len(self.counters) < self.k:
+            return 0
+        return min(entry[0] for entry in self.counters.values())
+
+    def merge(self, other):
+        """Merge another sketch; unmonitored keys are charged the other side's floor."""
+        own_floor, other_floor = self.floor(), other.floor()
+        merged = {}
+        for key in self.counters.keys() | other.counters.keys():
+            a = self.counters.get(key, [own_floor, own_floor, None])
+            b = other.counters.get(key, [other_floor, other_floor, None])
+            values = [v for v in (a[2], b[2]) if v is not None]
+            merged[key] = [a[0] + b[0], a[1] + b[1], max(values) if values else None]
+        if len(merged) > self.k:
+            merged = dict(sorted(merged.items(), key=lambda x: -x[1][0])[:self.k])
+        self.counters = merged
+        self.heap = [(e[0], k) for k, e in self.counters.items()]
+        heapq.heapify(self.heap)
+
+    def top(self, n):
+        """Return up to n (key, count, error, max_value) rows.
+
+        Rows are ranked by the guaranteed count (count - error), so keys that
+        only look heavy because they inherited an evicted counter sink.
+        """
+        rows = sorted(self.counters.items(), key=lambda x: (-(x[1][0] - x[1][1]), -x[1][0]))[:n]
+        return [(key, count, error, value) for key, (count, error, value) in rows]
+
+    def to_dict(self):
+        return {'k': self.k, 'counters': [[key] + entry for key, entry in self.counters.items()]}
+
+    @classmethod
+    def from_dict(cls, data):
+        sketch = cls(data['k'])
+        sketch.counters = {row[0]: row[1:] for row in data['counters']}
+        sketch.heap = [(e[0], k) for k, e in sketch.counters.items()]
+        heapq.heapify(sketch.heap)
+        return sketch
+
+def format_sketch_count(count, error):
+    """Format a sketch count: exact, or 'guaranteed-upper' when approximate."""
+    if error:
+        return f"{count - error}-{count}"
+    return str(count)
+
+class StreamingSummary:
+    """Bounded-memory accumulator: counters, first-N samples and top-K sketches."""
+
+    def __init__(self, sample_size=10, top_k=1000):
+        self.sample_size = sample_size
+        self.counts = {'alerts': 0, 'warnings': 0, 'notices': 0, 'errors': 0}
+        self.samples = {level: [] for level in self.counts}
+        self.modules = defaultdict(int)
+        self.signatures = SpaceSaving(top_k)
+        self.targets = SpaceSaving(top_k)
+
+    def add(self, finding):
+        level = finding['level'] + 's'
+        self.counts[level] += 1
+        sample = self.samples[level]
+        if len(sample) < self.sample_size:
+            sample.append(finding)
+
+        if finding['module']:
+            self.modules[finding['module']] += 1
+        if finding['name']:
+            self.signatures.add(finding['name'])
+        if finding['target']:
+            self.targets.add(finding['target'], finding['score'] or 0)
+
+    def merge(self, other):
+        for level, count in other.counts.items():
+            self.counts[level] += count
+            room = self.sample_size - len(self.samples[level])
+            if room > 0:
+                self.samples[level].extend(other.samples[level][:room])
+        for module, count in other.modules.items():
+            self.modules[module] += count
+        self.signatures.merge(other.signatures)
+        self.targets.merge(other.targets)
+
+    def to_dict(self):
+        return {
+            'sample_size': self.sample_size,
+            'counts': self.counts,
+            'samples': self.samples,
+            'modules': self.modules,
+            'signatures': self.signatures.to_dict(),
+            'targets': self.targets.to_dict(),
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        summary = cls(data['sample_size'], data['signatures']['k'])
+        summary.counts = data['counts']
+        summary.samples = data['samples']
+        summary.modules.update(data['modules'])
+        summary.signatures = SpaceSaving.from_dict(data['signatures'])
+        summary.targets = SpaceSaving.from_dict(data['targets'])
+        return summary
+
+def is_compressed(filepath):
+    return filepath.endswith(COMPRESSED_SUFFIXES)
+
+def open_log(filepath):
+    """Open a THOR text log for reading; .gz/.zst are inflated as a stream."""
+    return io.TextIOWrapper(open_log_bytes(filepath), encoding='utf-8', errors='ignore')
+
+def open_log_bytes(filepath):
+    """Open a THOR log as a binary stream, decompressing .gz/.zst."""
+    if filepath.endswith('.gz'):
+        import gzip
+        return gzip.open(filepath, 'rb')
+    if filepath.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError(f"{filepath}: reading .zst requires the 'zstandard' package")
+        return io.BufferedReader(zstd_open(filepath))
+    return open(filepath, 'rb')
+
+def zstd_open(filepath):
+    """Open a .zst file as a decompressed binary stream."""
+    return zstandard.ZstdDecompressor().stream_reader(open(filepath, 'rb'), closefd=True)
+
+def iter_log_lines(filepath, start=None, end=None):
+    """Yield text lines of a whole log, or of the newline-aligned byte range [start, end)."""
+    if start is None:
+        with open_log(filepath) as f:
+            yield from f
+        return
+
+    with open(filepath, 'rb') as f:
+        f.seek(start)
+        pos = start
+        while pos < end:
+            raw = f.readline()
+            if not raw:
+                break
+            pos += len(raw)
+            yield from decode_lines(raw)
+
+def iter_prefiltered_lines(filepath, start=None, end=None, markers=()):
+    """Yield the lines of a plain log that contain a level keyword (any case) or a marker.
+
+    The file is memory-mapped and searched as raw bytes in newline-aligned
+    chunks; only lines with a hit are decoded, unless so many lines match
+    that decoding the whole chunk is cheaper. Yields the lines, in order,
+    that iter_log_lines() yields and the parsers' substring prefilter keeps
+    (plus, for dense chunks, lines it drops), without decoding and
+    lowercasing every Info line.
+    """
+    return chain.from_iterable(iter_prefiltered_chunks(filepath, start, end, markers))
+
+def iter_prefiltered_chunks(filepath, start, end, markers):
+    """Per-chunk line lists for iter_prefiltered_lines; chained in C, not yielded line by line."""
+    size = os.path.getsize(filepath)
+    start = start or 0
+    end = size if end is None else min(end, size)
+    if start >= end:
+        return
+
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if hasattr(mm, 'madvise'):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        pos = start
+        released = start - start % mmap.PAGESIZE
+        while pos < end:
+            chunk_end = min(pos + SCAN_CHUNK_BYTES, end)
+            if chunk_end < end:
+                newline = mm.find(b'\n', chunk_end - 1, end)
+                chunk_end = end if newline < 0 else newline + 1
+            chunk = mm[pos:chunk_end]
+            # Probing the head first keeps dense chunks from paying for span collection
+            spans = None
+            if find_line_spans(chunk[:SCAN_PROBE_BYTES], markers) is not None:
+                spans = find_line_spans(chunk, markers)
+            if spans is None:
+                # Findings are dense here: decoding the chunk in one go is cheaper
+                yield split_text_lines(chunk.decode('utf-8', errors='ignore'))
+            else:
+                yield [line for line_start, line_end in spans
+                       for line in decode_lines(chunk[line_start:line_end])]
+            pos = chunk_end
+            # Scanned pages stay in the page cache but would otherwise count
+            # towards this process's RSS until the whole file is mapped in
+            done = pos - pos % mmap.PAGESIZE
+            if done > released and hasattr(mmap, 'MADV_DONTNEED'):
+                mm.madvise(mmap.MADV_DONTNEED, released, done - released)
+                released = done
+
+def find_line_spans(chunk, markers=(), dense_ratio=DENSE_LINE_RATIO):
+    """Sorted (start, end) spans of the lines in chunk with a level keyword or marker.
+
+    Returns None once more than dense_ratio of the chunk's lines match.
+    """
+    limit = max(chunk.count(b'\n'), 1) * dense_ratio
+    lowered = chunk.lower()
+    spans = set()
+    for haystack, needles in ((lowered, LEVEL_KEYWORDS_BYTES), (chunk, markers)):
+        for needle in needles:
+            hit = haystack.find(needle)
+            while hit >= 0:
+                line_start = chunk.rfind(b'\n', 0, hit) + 1
+                line_end = chunk.find(b'\n', hit) + 1 or len(chunk)
+                spans.add((line_start, line_end))
+                if len(spans) > limit:
+                    return None
+                hit = haystack.find(needle, line_end)
+    return sorted(spans)
+
+def iter_candidate_lines(filepath, start=None, end=None, fmt='text', mmap_scan=True):
+    """Lines a parser has to look at: byte-prefiltered for plain logs, every line otherwise."""
+    if mmap_scan and not is_compressed(filepath):
+        return iter_prefiltered_lines(filepath, start, end, JSON_MARKERS_BYTES if fmt == 'json' else ())
+    return iter_log_lines(filepath, start, end)
+
+def iter_findings(filepath, start=None, end=None, fmt='text', finding_filter=None, mmap_scan=True):
+    """Yield the findings of a log, or of the byte range [start, end) of a plain log, in order.
+
+    With a FindingFilter, lines failing its prefilter are dropped before the
+    parser tokenizes them, and only matching findings are yielded.
+    """
+    line_parser = parse_json_line if fmt == 'json' else parse_line
+    lines = iter_candidate_lines(filepath, start, end, fmt, mmap_scan)
+    if finding_filter is None:
+        for line in lines:
+            finding = line_parser(line)
+            if finding is not None:
+                yield finding
+        return
+
+    prefilter = finding_filter.prefilter
+    matches = finding_filter.matches
+    for line in lines:
+        if prefilter(line, fmt):
+            finding = line_parser(line)
+            if finding is not None and matches(finding):
+                yield finding
+
+def parse_input(filepath, start=None, end=None, streaming=None, fmt='text', mmap_scan=True, finding_filter=None):
+    """Parse a log, or the byte range [start, end) of a plain log.
+
+    fmt selects the line parser ('text' or 'json'). Returns a FindingTable,
+    or a StreamingSummary when streaming=(sample_size, top_k) is given.
+    mmap_scan=False reads plain logs line by line in text mode instead of
+    through the memory-mapped byte prefilter (same results, slower). With a
+    FindingFilter only matching findings are counted.
+    """
+    results = StreamingSummary(*streaming) if streaming else FindingTable()
+    add = results.add
+    for finding in iter_findings(filepath, start, end, fmt, finding_filter, mmap_scan):
+        add(finding)
+
+    return results
+
+def select_findings(filepath, start=None, end=None, fmt='text', finding_filter=None):
+    """List of the (matching) findings of a log or byte range, in file order."""
+    return list(iter_findings(filepath, start, end, fmt, finding_filter))
+
+def parse_thor_log_streaming(filepath, sample_size=10, top_k=1000):
+    """Parse THOR text log into a StreamingSummary; memory does not grow with log size."""
+    return parse_input(filepath, streaming=(sample_size, top_k))
 
 def parse_thor_log(filepath):
     """Parse THOR text log and extract findings."""
-    findings = {
-        'alerts': [],
-        'warnings': [],
-        'notices': [],
-        'errors': []
+    return parse_input(filepath)
+
+def split_byte_ranges(filepath, parts):
+    """Split a file into up to `parts` (start, end) byte ranges aligned to newlines."""
+    size = os.path.getsize(filepath)
+    boundaries = [0]
+    with open(filepath, 'rb') as f:
+        for i in range(1, parts):
+            f.seek(max(size * i // parts, boundaries[-1]))
+            f.readline()
+            pos = f.tell()
+            if pos >= size:
+                break
+            if pos > boundaries[-1]:
+                boundaries.append(pos)
+    boundaries.append(size)
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+def decode_lines(raw):
+    """Decode a raw line the way text mode does, including universal newlines."""
+    text = raw.decode('utf-8', errors='ignore')
+    if '\r' not in text:
+        return (text,)
+    pieces = text.replace('\r\n', '\n').split('\r')
+    return [piece + '\n' for piece in pieces[:-1]] + pieces[-1:]
+
+def split_text_lines(text):
+    """Split decoded text into lines with universal newlines, as text mode does."""
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    lines = text.split('\n')
+    last = lines.pop()
+    lines = [line + '\n' for line in lines]
+    if last:
+        lines.append(last)
+    return lines
+
+def parse_thor_log_parallel(filepath, workers, streaming=None):
+    """Parse a THOR text log across a process pool; result matches the serial parser."""
+    return parse_inputs([filepath], workers, streaming)[0]
+
+def split_tasks(files, workers):
+    """(filepath, start, end, fmt) tasks for [(filepath, fmt)]; plain logs are split when workers > 1."""
+    tasks = []
+    for filepath, file_fmt in files:
+        if workers > 1 and not is_compressed(filepath):
+            # Several ranges per worker keep the pool busy when findings cluster
+            for start, end in split_byte_ranges(filepath, workers * 4):
+                tasks.append((filepath, start, end, file_fmt))
+        else:
+            tasks.append((filepath, None, None, file_fmt))
+    return tasks
+
+def run_task(func, kwargs, filepath, start, end, fmt):
+    """Process pool entry point for map_tasks."""
+    return func(filepath, start, end, fmt=fmt, **kwargs)
+
+def map_tasks(func, tasks, workers, **kwargs):
+    """Yield (filepath, func(filepath, start, end, fmt=fmt, **kwargs)) per task, in task order."""
+    if not tasks:
+        return
+    if workers > 1:
+        # Imported here: loading the process pool machinery costs more than a
+        # short single-file run
+        from concurrent.futures import ProcessPoolExecutor
+        pool = ProcessPoolExecutor(max_workers=workers)
+        filepaths, starts, ends, fmts = zip(*tasks)
+        chunks = pool.map(run_task, repeat(func), repeat(kwargs), filepaths, starts, ends, fmts)
+    else:
+        pool = None
+        chunks = (run_task(func, kwargs, *task) for task in tasks)
+
+    try:
+        for (filepath, _, _, _), chunk in zip(tasks, chunks):
+            yield filepath, chunk
+    finally:
+        if pool:
+            pool.shutdown()
+
+def parse_inputs(filepaths, workers=1, streaming=None, fmt='auto', cache=None, finding_filter=None):
+    """Parse many logs; return (aggregate, [(filepath, per_file_results), ...]).
+
+    fmt is 'text', 'json' or 'auto' (detected per file). With workers > 1
+    plain logs are split into newline-aligned byte ranges and compressed logs
+    are parsed whole, all in one process pool. Results are merged in input
+    order, so the aggregate matches a serial run. With a ParseCache, cached
+    logs are read from the cache instead (see parse_inputs_cached). With a
+    FindingFilter only matching findings are counted.
+    """
+    if cache is not None:
+        return parse_inputs_cached(filepaths, cache, workers, streaming, fmt, finding_filter)
+
+    tasks = split_tasks(resolve_formats(filepaths, fmt), workers)
+
+    def new():
+        return StreamingSummary(*streaming) if streaming else FindingTable()
+
+    total = new()
+    per_file = {filepath: new() for filepath in filepaths}
+
+    for filepath, chunk in map_tasks(parse_input, tasks, workers, streaming=streaming,
+                                     finding_filter=finding_filter):
+        per_file[filepath].merge(chunk)
+
+    for filepath in filepaths:
+        total.merge(per_file[filepath])
+
+    return total, list(per_file.items())
+
+def resolve_formats(filepaths, fmt):
+    """[(filepath, 'text'|'json')], detecting the format per file when fmt is 'auto'."""
+    return [(filepath, detect_format(filepath) if fmt == 'auto' else fmt) for filepath in filepaths]
+
+RECORD_FIELDS = ('level', 'score', 'target', 'module', 'name', 'time')
+
+def parse_records(filepath, start=None, end=None, fmt='text'):
+    """Parse a log, or a byte range of it, into {field: [values]} columns of its findings."""
+    records = {field: [] for field in RECORD_FIELDS}
+    appends = [(field, records[field].append) for field in RECORD_FIELDS]
+    for finding in iter_findings(filepath, start, end, fmt):
+        for field, append in appends:
+            append(finding[field])
+    return records
+
+def iter_records(records, finding_filter=None):
+    """Yield record columns as finding dicts ('line' is not cached), optionally filtered."""
+    for values in zip(*(records[field] for field in RECORD_FIELDS)):
+        finding = dict(zip(RECORD_FIELDS, values), line=None)
+        if finding_filter is None or finding_filter.matches(finding):
+            yield finding
+
+def load_records(filepaths, cache, workers=1, fmt='auto'):
+    """Record columns per log from a thor_log_cache.ParseCache; misses are parsed and stored."""
+    from thor_log_cache import content_fingerprint
+
+    records = {}
+    misses = []
+    for filepath, file_fmt in resolve_formats(filepaths, fmt):
+        key = content_fingerprint(filepath, f"{file_fmt}:{PARSER_VERSION}")
+        records[filepath] = cache.load(key)
+        if records[filepath] is None:
+            records[filepath] = {field: [] for field in RECORD_FIELDS}
+            misses.append((filepath, file_fmt, key))
+
+    tasks = split_tasks([(filepath, file_fmt) for filepath, file_fmt, _ in misses], workers)
+    for filepath, chunk in map_tasks(parse_records, tasks, workers):
+        for field in RECORD_FIELDS:
+            records[filepath][field].extend(chunk[field])
+    for filepath, _, key in misses:
+        cache.store(key, records[filepath], os.path.abspath(filepath))
+    return records
+
+def parse_inputs_cached(filepaths, cache, workers=1, streaming=None, fmt='auto', finding_filter=None):
+    """parse_inputs() through a thor_log_cache.ParseCache.
+
+    Each log is looked up by content fingerprint. Misses are parsed (split
+    across workers like parse_inputs) into record columns and stored; then
+    every log's records are replayed into the accumulators in input order.
+    """
+    records = load_records(filepaths, cache, workers, fmt)
+
+    def new():
+        return StreamingSummary(*streaming) if streaming else FindingTable()
+
+    total = new()
+    per_file = []
+    for filepath in filepaths:
+        results = new()
+        add = results.add
+        for finding in iter_records(records[filepath], finding_filter):
+            add(finding)
+        per_file.append((filepath, results))
+        total.merge(results)
+
+    return total, per_file
+
+def select_inputs(filepaths, workers=1, fmt='auto', finding_filter=None, cache=None):
+    """Yield (filepath, finding) for the matching findings of many logs, in file order."""
+    if cache is not None:
+        records = load_records(filepaths, cache, workers, fmt)
+        for filepath in filepaths:
+            for finding in iter_records(records[filepath], finding_filter):
+                yield filepath, finding
+        return
+
+    tasks = split_tasks(resolve_formats(filepaths, fmt), workers)
+    for filepath, chunk in map_tasks(select_findings, tasks, workers, finding_filter=finding_filter):
+        for finding in chunk:
+            yield filepath, finding
+
+NDJSON_FIELDS = ('time', 'level', 'score', 'module', 'name', 'target', 'line')
+
+def write_ndjson(selected, out):
+    """Write (filepath, finding) pairs as one JSON object per line; return the count."""
+    encode = json.JSONEncoder(ensure_ascii=False, separators=(',', ':')).encode
+    count = 0
+    for filepath, finding in selected:
+        record = {'file': filepath}
+        for field in NDJSON_FIELDS:
+            record[field] = finding.get(field)
+        out.write(encode(record))
+        out.write('\n')
+        count += 1
+    return count
+
+def file_fingerprint(filepath, head_len=FINGERPRINT_HEAD_BYTES):
+    """Identify a log file by device, inode, size and a hash of its first bytes."""
+    import hashlib
+    st = os.stat(filepath)
+    with open(filepath, 'rb') as f:
+        head = f.read(head_len)
+    return {
+        'dev': st.st_dev,
+        'inode': st.st_ino,
+        'size': st.st_size,
+        'head_len': len(head),
+        'head_sha1': hashlib.sha1(head).hexdigest(),
     }
 
-    modules = defaultdict(int)
-    targets = defaultdict(list)
-    signatures = defaultdict(int)
-
-    level_pattern = re.compile(r'\b(Alert|Warning|Notice|Error)\b', re.IGNORECASE)
-    score_pattern = re.compile(r'SCORE:\s*(\d+)')
-    target_pattern = re.compile(r'TARGET:\s*(.+?)(?:\s+[A-Z_]+:|$)')
-    module_pattern = re.compile(r'MODULE:\s*(\w+)')
-    name_pattern = re.compile(r'NAME:\s*(.+?)(?:\s+[A-Z_]+:|$)')
-
-    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-        for line in f:
-            level_match = level_pattern.search(line)
-            if not level_match:
-                continue
-
-            level = level_match.group(1).lower()
-            if level not in findings:
-                continue
-
-            score = None
-            score_match = score_pattern.search(line)
-            if score_match:
-                score = int(score_match.group(1))
-
-            target = None
-            target_match = target_pattern.search(line)
-            if target_match:
-                target = target_match.group(1).strip()
-
-            module = None
-            module_match = module_pattern.search(line)
-            if module_match:
-                module = module_match.group(1)
-                modules[module] += 1
-
-            name = None
-            name_match = name_pattern.search(line)
-            if name_match:
-                name = name_match.group(1).strip()
-                signatures[name] += 1
-
-            finding = {
-                'level': level,
-                'score': score,
-                'target': target,
-                'module': module,
-                'name': name,
-                'line': line.strip()[:200]
-            }
-
-            findings[level + 's'].append(finding)
-
-            if target:
-                targets[target].append(finding)
-
-    return findings, modules, targets, signatures
-
-def print_summary(findings, modules, targets, signatures, filepath):
-    """Print formatted summary."""
-    total = sum(len(v) for v in findings.values())
+def needs_rescan(filepath, entry, streaming):
+    """True if a saved entry cannot be continued: new file, rotation or truncation."""
+    if entry is None or entry.get('streaming') != list(streaming):
+        return True
+    current = file_fingerprint(filepath, entry['head_len'])
+    return (current['dev'] != entry['dev']
+            or current['inode'] != entry['inode']
+            or current['size'] < entry['offset']
+            or current['head_len'] != entry['head_len']
+            or current['head_sha1'] != entry['head_sha1'])
+
+def parse_incremental(filepath, entry, streaming, fmt='auto'):
+    """Continue parsing a plain log from a saved state entry.
+
+    Only complete lines after entry['offset'] are read; a trailing partial line
+    is left for the next run. Returns (new_entry, summary, bytes_read, rescanned).
+    """
+    rescanned = needs_rescan(filepath, entry, streaming)
+    if rescanned:
+        summary = StreamingSummary(*streaming)
+        offset = 0
+        file_fmt = detect_format(filepath) if fmt == 'auto' else fmt
+    else:
+        summary = StreamingSummary.from_dict(entry['summary'])
+        offset = entry['offset']
+        file_fmt = entry['format']
+
+    line_parser = parse_json_line if file_fmt == 'json' else parse_line
+    start = offset
+    with open(filepath, 'rb') as f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b'\n'):
+                break
+            offset += len(raw)
+            for line in decode_lines(raw):
+                finding = line_parser(line)
+                if finding is not None:
+                    summary.add(finding)
 
+    new_entry = file_fingerprint(filepath)
+    new_entry.update({
+        'offset': offset,
+        'format': file_fmt,
+        'streaming': list(streaming),
+        'summary': summary.to_dict(),
+    })
+    return new_entry, summary, offset - start, rescanned
+
+def load_state(state_path):
+    """Load an incremental state file; a missing or unreadable file starts fresh."""
+    try:
+        with open(state_path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if state.get('version') != STATE_VERSION:
+        return {}
+    return state.get('files', {})
+
+def save_state(state_path, files):
+    """Write the state file atomically."""
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'version': STATE_VERSION, 'files': files}, f)
+    os.replace(tmp_path, state_path)
+
+def run_incremental(logfiles, files_state, streaming, fmt):
+    """Update files_state in place; return (total, per_file, bytes_read, rescanned_count)."""
+    total = StreamingSummary(*streaming)
+    per_file = []
+    bytes_read = 0
+    rescanned_count = 0
+
+    for filepath in logfiles:
+        key = os.path.abspath(filepath)
+        entry, summary, read, rescanned = parse_incremental(filepath, files_state.get(key), streaming, fmt)
+        files_state[key] = entry
+        per_file.append((filepath, summary))
+        total.merge(summary)
+        bytes_read += read
+        rescanned_count += rescanned
+
+    return total, per_file, bytes_read, rescanned_count
+
+def expand_inputs(patterns):
+    """Expand paths, globs and directories into a sorted, de-duplicated list of log files."""
+    files = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for match in matches:
+            if os.path.isdir(match):
+                for root, _, names in os.walk(match):
+                    files.extend(os.path.join(root, name) for name in sorted(names)
+                                 if name.endswith(LOG_SUFFIXES))
+            elif os.path.exists(match):
+                files.append(match)
+            else:
+                print(f"Warning: no such file: {match}", file=sys.stderr)
+    return list(dict.fromkeys(files))
+
+def print_severity_counts(counts):
+    """Print the findings-by-severity block from a level -> count mapping."""
+    print("Findings by Severity:")
+    print(f"  Alerts:   {counts['alerts']:5d}")
+    print(f"  Warnings: {counts['warnings']:5d}")
+    print(f"  Notices:  {counts['notices']:5d}")
+    print(f"  Errors:   {counts['errors']:5d}")
+    print(f"  Total:    {sum(counts.values()):5d}\n")
+
+def print_finding_sample(title, sample, total, noun):
+    """Print a sample of findings followed by a '... and N more' line."""
+    print(title)
+    for f in sample:
+        score_str = f"[{f['score']}]" if f['score'] else ""
+        target_str = f['target'][:60] if f['target'] else "N/A"
+        name_str = f['name'] or "Unknown"
+        print(f"  {score_str:6s} {name_str[:40]:40s} -> {target_str}")
+    if total > len(sample):
+        print(f"  ... and {total - len(sample)} more {noun}")
+    print()
+
+def print_summary(table, filepath, clusters=None):
+    """Print formatted summary of a FindingTable, with the top clusters if requested."""
     print(f"=== THOR Log Summary: {os.path.basename(filepath)} ===\n")
 
     # Counts by severity
-    print("Findings by Severity:")
-    print(f"  Alerts:   {len(findings['alerts']):5d}")
-    print(f"  Warnings: {len(findings['warnings']):5d}")
-    print(f"  Notices:  {len(findings['notices']):5d}")
-    print(f"  Errors:   {len(findings['errors']):5d}")
-    print(f"  Total:    {total:5d}\n")
+    counts = table.counts
+    print_severity_counts(counts)
 
     # Top modules
+    modules = table.module_counts()
     if modules:
         print("Top Modules:")
         for mod, count in sorted(modules.items(), key=lambda x: -x[1])[:5]:
@@ -98,6 +1215,7 @@ def print_summary(findings, modules, targets, signatures, filepath):
         print()
 
     # Top signatures
+    signatures = table.signature_counts()
     if signatures:
         print("Top Signatures:")
         for sig, count in sorted(signatures.items(), key=lambda x: -x[1])[:10]:
@@ -105,57 +1223,238 @@ def print_summary(findings, modules, targets, signatures, filepath):
         print()
 
     # High-priority findings (Alerts)
-    if findings['alerts']:
-        print("=== ALERTS (Review First) ===")
-        for f in findings['alerts'][:10]:
-            score_str = f"[{f['score']}]" if f['score'] else ""
-            target_str = f['target'][:60] if f['target'] else "N/A"
-            name_str = f['name'] or "Unknown"
-            print(f"  {score_str:6s} {name_str[:40]:40s} -> {target_str}")
-        if len(findings['alerts']) > 10:
-            print(f"  ... and {len(findings['alerts']) - 10} more alerts")
-        print()
+    if counts['alerts']:
+        print_finding_sample("=== ALERTS (Review First) ===", table.sample('alert', 10),
+                             counts['alerts'], "alerts")
 
     # Warnings sample
-    if findings['warnings']:
-        print("=== WARNINGS (Sample) ===")
-        for f in findings['warnings'][:5]:
-            score_str = f"[{f['score']}]" if f['score'] else ""
-            target_str = f['target'][:60] if f['target'] else "N/A"
-            name_str = f['name'] or "Unknown"
-            print(f"  {score_str:6s} {name_str[:40]:40s} -> {target_str}")
-        if len(findings['warnings']) > 5:
-            print(f"  ... and {len(findings['warnings']) - 5} more warnings")
-        print()
+    if counts['warnings']:
+        print_finding_sample("=== WARNINGS (Sample) ===", table.sample('warning', 5),
+                             counts['warnings'], "warnings")
 
     # Targets with most findings
-    if targets:
+    if len(table.targets) > 1:
+        print("Targets with Most Findings:")
+        for target, count, max_score in table.top_targets(5):
+            print(f"  [{max_score:3d}] {target[:70]} ({count} findings)")
+        print()
+
+    if clusters:
+        print_clusters(table, clusters)
+
+    print("=== End Summary ===")
+
+def print_clusters(table, limit):
+    """Print the largest (signature, normalized target) clusters of a FindingTable."""
+    clusters = table.clusters()
+    print(f"Finding Clusters ({len(clusters)} distinct, by signature and normalized target):")
+    for name, pattern, count, distinct, max_score, example in clusters[:limit]:
+        score_str = f"[{max_score}]" if max_score else ""
+        print(f"  {score_str:6s} {(name or 'Unknown')[:40]:40s} -> {(pattern or 'N/A')[:70]}")
+        if distinct > 1:
+            print(f"         {count} findings on {distinct} targets, e.g. {example[:70]}")
+        else:
+            print(f"         {count} findings")
+    if len(clusters) > limit:
+        print(f"  ... and {len(clusters) - limit} more clusters")
+    print()
+
+def print_streaming_summary(summary, filepath):
+    """Print a StreamingSummary in the same layout as print_summary.
+
+    Approximate sketch counts are shown as a 'guaranteed-upper' range.
+    """
+    print(f"=== THOR Log Summary: {os.path.basename(filepath)} ===\n")
+
+    print_severity_counts(summary.counts)
+
+    if summary.modules:
+        print("Top Modules:")
+        for mod, count in sorted(summary.modules.items(), key=lambda x: -x[1])[:5]:
+            print(f"  {mod}: {count}")
+        print()
+
+    top_signatures = summary.signatures.top(10)
+    if top_signatures:
+        print("Top Signatures:")
+        for sig, count, error, _ in top_signatures:
+            print(f"  {sig}: {format_sketch_count(count, error)}")
+        print()
+
+    if summary.counts['alerts']:
+        print_finding_sample("=== ALERTS (Review First) ===", summary.samples['alerts'][:10],
+                             summary.counts['alerts'], "alerts")
+
+    if summary.counts['warnings']:
+        print_finding_sample("=== WARNINGS (Sample) ===", summary.samples['warnings'][:5],
+                             summary.counts['warnings'], "warnings")
+
+    # Only targets guaranteed to have more than one finding
+    top_targets = [row for row in summary.targets.top(summary.targets.k) if row[1] - row[2] > 1][:5]
+    if summary.targets.counters:
         print("Targets with Most Findings:")
-        multi_hit_targets = [(t, fs) for t, fs in targets.items() if len(fs) > 1]
-        for target, fs in sorted(multi_hit_targets, key=lambda x: -len(x[1]))[:5]:
-            max_score = max((f['score'] or 0) for f in fs)
-            print(f"  [{max_score:3d}] {target[:70]} ({len(fs)} findings)")
+        for target, count, error, max_score in top_targets:
+            print(f"  [{max_score or 0:3d}] {target[:70]} ({format_sketch_count(count, error)} findings)")
         print()
 
     print("=== End Summary ===")
 
+def print_per_file(per_file, streaming):
+    """Print severity counts for each input file."""
+    print("=== Per-File Breakdown ===")
+    print(f"  {'Alerts':>7} {'Warnings':>8} {'Notices':>8} {'Errors':>7}  File")
+    for filepath, results in per_file:
+        counts = results.counts
+        print(f"  {counts['alerts']:7d} {counts['warnings']:8d} {counts['notices']:8d} "
+              f"{counts['errors']:7d}  {filepath}")
+    print()
+
+def stop_on_broken_pipe():
+    """Output piped into head or similar was closed: exit without a traceback or error message."""
+    os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    sys.exit(1)
+
+def report_error(e):
+    """Print a read/write or malformed-log error and exit."""
+    if isinstance(e, OSError):
+        print(f"Error: {e}", file=sys.stderr)
+    else:
+        print(f"Error parsing log: {e}", file=sys.stderr)
+    sys.exit(1)
+
+def follow_logs(args, logfiles, streaming, label):
+    """Incremental/follow loop: summarize, persist state, optionally repeat."""
+    files_state = load_state(args.incremental) if args.incremental else {}
+
+    try:
+        while True:
+            start = time.perf_counter()
+            total, per_file, bytes_read, rescanned = run_incremental(logfiles, files_state, streaming, args.format)
+            if args.incremental:
+                save_state(args.incremental, files_state)
+            elapsed = time.perf_counter() - start
+
+            print(f"[{time.strftime('%H:%M:%S')}] parsed {bytes_read} new bytes from {len(logfiles)} file(s) "
+                  f"in {elapsed:.2f}s ({rescanned} rescanned)\n")
+            if args.per_file:
+                print_per_file(per_file, streaming)
+            print_streaming_summary(total, label)
+
+            if not args.follow:
+                break
+            sys.stdout.flush()
+            time.sleep(args.interval)
+            print()
+    except KeyboardInterrupt:
+        pass
+    except BrokenPipeError:
+        stop_on_broken_pipe()
+    except (OSError,) + LOG_DATA_ERRORS as e:
+        report_error(e)
+
 def main():
-    if len(sys.argv) < 2:
-        print("Usage: summarize_thor_log.py <logfile>", file=sys.stderr)
-        print("  Parses THOR text log and outputs triage summary.", file=sys.stderr)
+    parser = argparse.ArgumentParser(description="Parses THOR text log and outputs triage summary.")
+    parser.add_argument("logfiles", nargs='+', metavar="logfile",
+                        help="THOR log(s): files, globs or directories; .gz/.zst are decompressed")
+    parser.add_argument("--workers", "-w", type=int, default=1,
+                        help="Parse newline-aligned chunks in N processes (default: 1, 0 = all CPUs)")
+    parser.add_argument("--streaming", action="store_true",
+                        help="Bounded memory: keep counters, samples and top-K sketches only")
+    parser.add_argument("--top-k", type=int, default=1000,
+                        help="Counters per top-K sketch in --streaming mode (default: 1000)")
+    parser.add_argument("--per-file", action="store_true",
+                        help="Also print severity counts for each input file")
+    parser.add_argument("--clusters", type=int, nargs='?', const=20, metavar="N",
+                        help="Also print the N largest clusters of findings with the same signature "
+                             "and normalized target (user profile, temp file names collapsed; default N: 20)")
+    parser.add_argument("--format", choices=['auto', 'text', 'json'], default='auto',
+                        help="Input format; json covers --jsonfile, --jsonv2 and audit trails (default: auto)")
+    parser.add_argument("--incremental", metavar="STATE_FILE",
+                        help="Save offsets and counters here and only parse appended bytes next run "
+                             "(implies --streaming)")
+    parser.add_argument("--follow", action="store_true",
+                        help="Re-summarize appended data every --interval seconds (implies --streaming)")
+    parser.add_argument("--interval", type=float, default=60,
+                        help="Seconds between refreshes with --follow (default: 60)")
+    parser.add_argument("--filter", action="append", metavar="EXPR",
+                        help="Only findings matching EXPR, e.g. \"score>=80 and module=ProcessCheck and "
+                             "target^=C:\\Users\\\"; fields level, score, module, name, target, time "
+                             "(repeatable, clauses are ANDed)")
+    parser.add_argument("--ndjson", metavar="FILE",
+                        help="Write the matching findings as NDJSON to FILE ('-' for stdout) instead of a summary")
+    parser.add_argument("--cache", action="store_true",
+                        help="Reuse parsed findings of unchanged logs from an on-disk cache")
+    parser.add_argument("--cache-dir", metavar="DIR",
+                        help="Cache directory (implies --cache; default: $XDG_CACHE_HOME/thor-log-analysis)")
+    parser.add_argument("--cache-size", type=int, metavar="MB",
+                        help="Evict least recently used cache entries above this size (default: 512)")
+    args = parser.parse_args()
+
+    logfiles = expand_inputs(args.logfiles)
+    if not logfiles:
+        print(f"Error: file not found: {' '.join(args.logfiles)}", file=sys.stderr)
         sys.exit(2)
 
-    logfile = sys.argv[1]
-    if not os.path.exists(logfile):
-        print(f"Error: file not found: {logfile}", file=sys.stderr)
+    finding_filter = None
+    if args.filter:
+        try:
+            finding_filter = FindingFilter(args.filter)
+        except ValueError as e:
+            print(f"Error: invalid --filter: {e}", file=sys.stderr)
+            sys.exit(2)
+
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    streaming = (10, args.top_k) if args.streaming else None
+    label = logfiles[0] if len(logfiles) == 1 else f"{len(logfiles)} files"
+
+    if args.clusters and (args.streaming or args.incremental or args.follow):
+        print("Error: --clusters needs the full summary (not --streaming/--incremental/--follow)", file=sys.stderr)
         sys.exit(2)
 
+    if args.incremental or args.follow:
+        if finding_filter or args.ndjson:
+            print("Error: --filter/--ndjson cannot be combined with --incremental/--follow", file=sys.stderr)
+            sys.exit(2)
+        compressed = [f for f in logfiles if is_compressed(f)]
+        if compressed:
+            print(f"Error: incremental mode needs plain logs, got: {compressed[0]}", file=sys.stderr)
+            sys.exit(2)
+        follow_logs(args, logfiles, (10, args.top_k), label)
+        return
+
+    cache = None
+    if args.cache or args.cache_dir:
+        from thor_log_cache import DEFAULT_CACHE_MB, ParseCache
+        cache = ParseCache(args.cache_dir,
+                           (args.cache_size or DEFAULT_CACHE_MB) * 1024 * 1024)
+
+    if finding_filter:
+        label = f"{label} [{finding_filter.expression}]"
+
     try:
-        findings, modules, targets, signatures = parse_thor_log(logfile)
-        print_summary(findings, modules, targets, signatures, logfile)
-    except Exception as e:
-        print(f"Error parsing log: {e}", file=sys.stderr)
-        sys.exit(1)
+        if args.ndjson:
+            selected = select_inputs(logfiles, workers, args.format, finding_filter, cache)
+            if args.ndjson == '-':
+                count = write_ndjson(selected, sys.stdout)
+            else:
+                with open(args.ndjson, 'w', encoding='utf-8') as out:
+                    count = write_ndjson(selected, out)
+            print(f"{count} finding(s) written to {'stdout' if args.ndjson == '-' else args.ndjson}",
+                  file=sys.stderr)
+        else:
+            total, per_file = parse_inputs(logfiles, workers, streaming, args.format, cache, finding_filter)
+            if args.per_file:
+                print_per_file(per_file, streaming)
+            if streaming:
+                print_streaming_summary(total, label)
+            else:
+                print_summary(total, label, args.clusters)
+        if cache is not None:
+            print(f"Parse cache: {cache.hits} hit(s), {cache.misses} parsed ({cache.directory})", file=sys.stderr)
+    except BrokenPipeError:
+        stop_on_broken_pipe()
+    except (OSError,) + LOG_DATA_ERRORS as e:
+        report_error(e)
 
 if __name__ == "__main__":
     main()
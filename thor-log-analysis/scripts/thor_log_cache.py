@@ -0,0 +1,189 @@
+"""
+Columnar on-disk cache of parsed THOR log findings.
+
+summarize_thor_log.py --cache stores the findings of each parsed log
+(level, score, target, module, name, time) in one file per log under a cache
+directory, so re-running the summary on an archived log reads a few
+compact columns instead of re-tokenizing every line.
+
+Cache files are keyed by a content fingerprint: size, mtime and a hash of
+evenly spaced samples of the file, plus the parser version and input
+format. A changed log simply gets a new key; stale entries age out through
+LRU eviction (a hit refreshes the file's mtime, the oldest files are removed
+once the directory exceeds its size bound).
+
+File layout: magic, a length-prefixed JSON header, then one zlib block per
+column. Strings are dictionary-encoded: a uint32 index per row (0 = None),
+then the uint32 byte length of each distinct value and the values back to
+back, so any string (NUL included) round-trips. Levels are uint8 codes,
+scores int32. Only the columns a caller asks for are read and decoded.
+"""
+
+import hashlib
+import json
+import os
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+
+CACHE_VERSION = 2
+CACHE_MAGIC = b'THORPC01'
+CACHE_SUFFIX = '.tpc'
+DEFAULT_CACHE_MB = 512
+
+# 16 samples of 64 KB: ~1 MB read per fingerprint however large the log is
+FINGERPRINT_SAMPLES = 16
+FINGERPRINT_SAMPLE_BYTES = 64 * 1024
+
+COLUMNS = ('level', 'score', 'target', 'module', 'name', 'time')
+LEVELS = ('alert', 'warning', 'notice', 'error')
+LEVEL_CODES = {level: code for code, level in enumerate(LEVELS)}
+NO_SCORE = -(1 << 31)
+
+
+def default_cache_dir():
+    """$XDG_CACHE_HOME/thor-log-analysis, read per call so a forked thor-tools server sees the client's value."""
+    return os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'thor-log-analysis')
+
+
+def content_fingerprint(filepath, salt=''):
+    """Cache key for a file: size, mtime and sampled content hash (plus salt)."""
+    st = os.stat(filepath)
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(f"{CACHE_VERSION}:{salt}:{st.st_size}:{st.st_mtime_ns}:".encode())
+    with open(filepath, 'rb') as f:
+        if st.st_size <= FINGERPRINT_SAMPLES * FINGERPRINT_SAMPLE_BYTES:
+            digest.update(f.read())
+        else:
+            last = st.st_size - FINGERPRINT_SAMPLE_BYTES
+            for i in range(FINGERPRINT_SAMPLES):
+                f.seek(last * i // (FINGERPRINT_SAMPLES - 1))
+                digest.update(f.read(FINGERPRINT_SAMPLE_BYTES))
+    return digest.hexdigest()
+
+
+def encode_column(name, values):
+    """Encode one column to (bytes, extra header fields)."""
+    if name == 'level':
+        codes = array('B', [LEVEL_CODES[v] for v in values])
+        return codes.tobytes(), {}
+    if name == 'score':
+        codes = array('i', [NO_SCORE if v is None else v for v in values])
+        return codes.tobytes(), {}
+    index = {None: 0}
+    codes = array('I', [index.setdefault(v, len(index)) for v in values])
+    distinct = [v.encode('utf-8', 'surrogatepass') for v in list(index)[1:]]
+    lengths = array('I', map(len, distinct))
+    data = codes.tobytes() + lengths.tobytes() + b''.join(distinct)
+    return data, {'codes': len(codes) * codes.itemsize, 'distinct': len(distinct)}
+
+
+def decode_column(name, data, meta):
+    """Inverse of encode_column; returns a list."""
+    if name == 'level':
+        codes = array('B')
+        codes.frombytes(data)
+        return [LEVELS[c] for c in codes]
+    if name == 'score':
+        codes = array('i')
+        codes.frombytes(data)
+        return [None if c == NO_SCORE else c for c in codes]
+    codes = array('I')
+    codes.frombytes(data[:meta['codes']])
+    lengths = array('I')
+    blob_start = meta['codes'] + meta['distinct'] * lengths.itemsize
+    lengths.frombytes(data[meta['codes']:blob_start])
+    offsets = list(accumulate(lengths, initial=blob_start))
+    if offsets[-1] != len(data):
+        raise ValueError("string column length mismatch")
+    values = [None] + [data[start:end].decode('utf-8', 'surrogatepass') for start, end in zip(offsets, offsets[1:])]
+    return [values[c] for c in codes]
+
+
+class ParseCache:
+    """Directory of columnar parse results with size-bounded LRU eviction."""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_CACHE_MB * 1024 * 1024):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, key):
+        return os.path.join(self.directory, key + CACHE_SUFFIX)
+
+    def load(self, key, columns=COLUMNS):
+        """Return {column: list} for key, or None on a miss or unreadable entry."""
+        path = self.path_for(key)
+        try:
+            with open(path, 'rb') as f:
+                if f.read(len(CACHE_MAGIC)) != CACHE_MAGIC:
+                    raise ValueError("bad magic")
+                header_len, = struct.unpack('<I', f.read(4))
+                header = json.loads(f.read(header_len))
+                if header['version'] != CACHE_VERSION:
+                    raise ValueError("other cache version")
+                if header['byteorder'] != sys.byteorder:
+                    raise ValueError("foreign byte order")
+                base = f.tell()
+                result = {}
+                for name in columns:
+                    meta = header['columns'][name]
+                    f.seek(base + meta['offset'])
+                    result[name] = decode_column(name, zlib.decompress(f.read(meta['length'])), meta)
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, KeyError, struct.error, zlib.error):
+            # Corrupt or from another layout: treat as a miss, the next store replaces it
+            self.misses += 1
+            return None
+        self.hits += 1
+        return result
+
+    def store(self, key, records, source=None):
+        """Write {column: list} for key atomically, then evict down to max_bytes."""
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        blocks = []
+        header = {'version': CACHE_VERSION, 'byteorder': sys.byteorder, 'source': source,
+                  'rows': len(records['level']), 'columns': {}}
+        offset = 0
+        for name in COLUMNS:
+            data, meta = encode_column(name, records[name])
+            block = zlib.compress(data, 1)
+            header['columns'][name] = dict(meta, offset=offset, length=len(block))
+            blocks.append(block)
+            offset += len(block)
+        header_bytes = json.dumps(header).encode()
+
+        path = self.path_for(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(CACHE_MAGIC)
+            f.write(struct.pack('<I', len(header_bytes)))
+            f.write(header_bytes)
+            for block in blocks:
+                f.write(block)
+        os.replace(tmp_path, path)
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the directory fits max_bytes."""
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith(CACHE_SUFFIX):
+                    st = entry.stat()
+                    entries.append((st.st_mtime_ns, st.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Live progress, stall detection and ETA for a running THOR scan.
+
+Watches the two machine-readable progress signals of a live scan: the THOR
+log as it grows, and the `resume_*` keys and `stats` rows in ThorDB. Every
+--interval seconds it prints one status line with the current module, the
+last scanned element, files per second and an ETA, and flags a stall when
+neither the log nor the resume markers have moved for --stall seconds.
+
+Overhead stays negligible:
+- The log is tailed by byte offset. New bytes are counted at C speed and
+  only the last line of each read is parsed. A truncated or replaced log is
+  read again from the start.
+- ThorDB is opened read-only (mode=ro, query_only), so the monitor never
+  takes a write lock. `PRAGMA data_version` shows whether THOR committed
+  since the last poll. Only then are the small `tbl` and `stats` tables
+  re-read. The `times` table is never touched.
+
+"Files" are log lines that name a file. With --printall THOR logs every
+scanned file. Without it, only findings and errors count, so the rate is
+a lower bound. ETA comes from --total-files if given. Otherwise it assumes
+the scan takes as long as the previous scan recorded in `stats`.
+
+Usage:
+    scan_progress.py [--log LOG] [--db THORDB] [--interval SEC] [--stall SEC] [--total-files N]
+                     [--scan-gap SEC] [--once] [--exit-on-stall]
+"""
+
+import sqlite3
+import sys
+import argparse
+import json
+import os
+import time
+from datetime import datetime
+
+HERE = os.path.dirname(os.path.realpath(__file__))
+for script_dir in ('thor-db', 'thor-log-analysis'):
+    sys.path.insert(0, os.path.join(HERE, '..', '..', script_dir, 'scripts'))
+
+from thor_db_analysis import connect_readonly, has_table  # noqa: E402
+from thor_db_stats_timeline import format_ts, load_stats, split_scans  # noqa: E402
+from summarize_thor_log import LEADING_TIMESTAMP, LEADING_WORD, extract_fields  # noqa: E402
+
+READ_CHUNK = 8 << 20
+# Present once in every log line that names a file: text FILE field, JSON v1 "file" key, v2 "type":"file"
+TEXT_FILE_MARKER = b' FILE: '
+JSON_FILE_MARKER = b'"file"'
+POSITION_WIDTH = 70
+EXIT_STALLED = 2
+
+
+def parse_time(value):
+    """Epoch seconds of an ISO timestamp (no offset = local time), or None."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace(' ', 'T', 1)).timestamp()
+    except ValueError:
+        return None
+
+
+def parse_progress_line(line, is_json):
+    """(time, module, file) of one log line; each is None when the line does not carry it."""
+    text = line.decode('utf-8', 'replace').strip()
+    if is_json:
+        try:
+            record = json.loads(text)
+        except ValueError:
+            return None, None, None
+        if not isinstance(record, dict):
+            return None, None, None
+        meta = record.get('meta') if isinstance(record.get('meta'), dict) else {}
+        subject = record.get('subject') or record.get('object')
+        path = subject.get('path') if isinstance(subject, dict) else None
+        module = record.get('module') or meta.get('module')
+        stamp = record.get('time') or meta.get('time')
+        return (parse_time(stamp) if isinstance(stamp, str) else None,
+                module if isinstance(module, str) else None,
+                record.get('file') or path)
+    fields = extract_fields(text)
+    module = LEADING_WORD.match(fields.get('MODULE', ''))
+    stamp = LEADING_TIMESTAMP.match(text)
+    target = fields.get('FILE')
+    return (parse_time(stamp.group()) if stamp else None,
+            module.group() if module else None,
+            target.strip() if target else None)
+
+
+def line_at(data, index):
+    """The complete line of data that contains byte index."""
+    start = data.rfind(b'\n', 0, index) + 1
+    end = data.find(b'\n', index)
+    return data[start:end if end >= 0 else len(data)]
+
+
+class LogTail:
+    """Incremental reader of a growing THOR log: counts, current module and last file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.reset()
+
+    def reset(self):
+        self.inode = None
+        self.offset = 0
+        self.carry = b''
+        self.is_json = None
+        self.lines = 0
+        self.files = 0
+        self.module = None
+        self.position = None
+        self.started = None
+        self.last_time = None
+        self.grew_at = None
+
+    def poll(self):
+        """Read what was appended since the last poll; returns (bytes read, True if the log was restarted)."""
+        st = os.stat(self.path)
+        restarted = self.inode is not None and (st.st_ino != self.inode or st.st_size < self.offset)
+        if restarted:
+            self.reset()
+        self.inode = st.st_ino
+        self.grew_at = st.st_mtime
+        if st.st_size <= self.offset:
+            return 0, restarted
+        read = 0
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            while read < st.st_size - self.offset:
+                chunk = f.read(min(READ_CHUNK, st.st_size - self.offset - read))
+                if not chunk:
+                    break
+                read += len(chunk)
+                self.feed(chunk)
+        self.offset += read
+        return read, restarted
+
+    def feed(self, chunk):
+        data = self.carry + chunk if self.carry else chunk
+        end = data.rfind(b'\n') + 1
+        self.carry = data[end:]
+        if not end:
+            return
+        if self.is_json is None:
+            self.is_json = data.lstrip()[:1] == b'{'
+        if self.started is None:
+            self.started = parse_progress_line(data[:data.find(b'\n')], self.is_json)[0]
+        self.lines += data.count(b'\n', 0, end)
+        marker = JSON_FILE_MARKER if self.is_json else TEXT_FILE_MARKER
+        self.files += data.count(marker, 0, end)
+
+        stamp, module, _ = parse_progress_line(line_at(data, end - 1), self.is_json)
+        self.last_time = stamp or self.last_time
+        self.module = module or self.module
+        mark = data.rfind(marker, 0, end)
+        if mark >= 0:
+            self.position = parse_progress_line(line_at(data, mark), self.is_json)[2] or self.position
+
+
+def db_mtime(dbpath):
+    """Latest mtime of the ThorDB and its WAL."""
+    times = [os.stat(path).st_mtime for path in (dbpath, dbpath + "-wal") if os.path.exists(path)]
+    return max(times) if times else None
+
+
+class ThorDBPoller:
+    """Read-only poller of a live ThorDB's `resume_*` markers and `stats` rows."""
+
+    def __init__(self, dbpath, busy_ms=200):
+        self.dbpath = str(dbpath)
+        self.busy_ms = busy_ms
+        self.conn = None
+        self.version = None
+        self.resume = {}
+        self.stats = []
+        self.changed_at = None
+        self.error = None
+
+    def connect(self):
+        self.conn = connect_readonly(self.dbpath)
+        # Give up quickly instead of queueing behind THOR's writer; the next poll retries
+        self.conn.execute(f"PRAGMA busy_timeout = {int(self.busy_ms)}")
+        self.conn.execute("PRAGMA query_only = 1")
+        self.version = None
+
+    def poll(self):
+        """Re-read tbl/stats if THOR committed since the last poll; returns True when they changed."""
+        try:
+            if self.conn is None:
+                self.connect()
+                if self.changed_at is None:
+                    self.changed_at = db_mtime(self.dbpath)
+            version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+            if version == self.version:
+                return False
+            cursor = self.conn.cursor()
+            resume = {}
+            if has_table(cursor, 'tbl'):
+                cursor.execute("SELECT key, value FROM tbl WHERE key LIKE 'resume_%' ORDER BY key")
+                for key, value in cursor.fetchall():
+                    if isinstance(value, bytes):
+                        value = value.decode('utf-8', 'replace')
+                    resume[key] = value
+            stats = load_stats(cursor) if has_table(cursor, 'stats') else []
+        except sqlite3.Error as e:
+            self.error = str(e)
+            self.close()
+            return False
+        changed = self.version is not None and (resume != self.resume or len(stats) != len(self.stats))
+        if changed:
+            self.changed_at = time.time()
+        self.version = version
+        self.resume = resume
+        self.stats = stats
+        self.error = None
+        return changed
+
+    @property
+    def position(self):
+        return self.resume.get('resume_position')
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+
+def previous_scan(stats, scan_start, scan_gap):
+    """(start, end) of the last scan in stats that started before scan_start, or None."""
+    earlier = [row for row in stats if row[2] < scan_start]
+    if not earlier:
+        return None
+    rows = split_scans(earlier, scan_gap)[-1]
+    return min(row[2] for row in rows), max(row[2] + row[3] for row in rows)
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    if seconds >= 3600:
+        return f"{seconds // 3600}h{seconds % 3600 // 60:02d}m"
+    if seconds >= 60:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds}s"
+
+
+def shorten(text, width=POSITION_WIDTH):
+    """Keep the end of long paths, where the file name is."""
+    return text if len(text) <= width else "..." + text[-(width - 3):]
+
+
+def average_rate(tail):
+    """Files per second since the first log line, from log timestamps."""
+    if tail is None or tail.started is None or tail.last_time is None or tail.last_time <= tail.started:
+        return None
+    return tail.files / (tail.last_time - tail.started)
+
+
+def estimate_eta(now, tail, db, total_files, scan_gap):
+    """Human-readable ETA from --total-files or from the previous scan's duration in stats."""
+    if total_files and tail is not None:
+        rate = average_rate(tail)
+        if tail.files >= total_files:
+            return f"past --total-files ({tail.files} of {total_files})"
+        if not rate:
+            return "unknown (no file rate yet)"
+        share = 100.0 * tail.files / total_files
+        return f"~{format_duration((total_files - tail.files) / rate)} left ({share:.0f}% of --total-files)"
+    started = tail.started if tail is not None else None
+    if db is None or started is None:
+        return "unknown (pass --total-files, or --db and --log for the previous scan's duration)"
+    previous = previous_scan(db.stats, started, scan_gap)
+    if previous is None:
+        return "unknown (no earlier scan in stats; pass --total-files)"
+    span = previous[1] - previous[0]
+    remaining = span - (now - started)
+    if remaining < 0:
+        return f"overrunning the previous scan ({format_duration(span)}) by {format_duration(-remaining)}"
+    return f"~{format_duration(remaining)} left (previous scan took {format_duration(span)})"
+
+
+def idle_seconds(now, tail, db):
+    """Seconds since the log grew or the resume markers last changed, whichever is later."""
+    moved = [t for t in (tail.grew_at if tail else None, db.changed_at if db else None) if t is not None]
+    return now - max(moved) if moved else None
+
+
+def print_snapshot(args, tail, db, now):
+    print(f"Scan Progress: {args.log or '-'} / {args.db or '-'}")
+    if tail is not None:
+        kind = "JSON" if tail.is_json else "text"
+        started = f", started {format_ts(tail.started)} UTC" if tail.started else ""
+        print(f"  Log:      {tail.offset / 1e6:.1f} MB {kind}, {tail.lines} lines{started}, "
+              f"last write {format_duration(now - tail.grew_at)} ago")
+        rate = average_rate(tail)
+        rate_note = f", {rate:.1f}/s on average" if rate is not None else ""
+        print(f"  Files:    {tail.files} log lines naming a file{rate_note}")
+        print(f"  Module:   {tail.module or '-'}")
+        print(f"  Position: {tail.position or '-'}")
+    if db is not None:
+        if db.error:
+            print(f"  ThorDB:   not readable ({db.error})")
+        else:
+            for key, value in db.resume.items():
+                print(f"  {key}: {value}")
+            if not db.resume:
+                print("  ThorDB:   no resume_* markers")
+            if db.changed_at is not None:
+                print(f"  ThorDB:   last change {format_duration(now - db.changed_at)} ago")
+            if tail is not None and tail.started:
+                done = [row for row in db.stats if row[2] >= tail.started]
+                if done:
+                    print(f"  Finished: {', '.join(sorted({row[0] for row in done}))}")
+    print(f"  ETA:      {estimate_eta(now, tail, db, args.total_files, args.scan_gap)}")
+
+
+def status_line(args, tail, db, now, files_delta, elapsed):
+    parts = [time.strftime('%H:%M:%S', time.localtime(now))]
+    position = None
+    if tail is not None:
+        parts.append(tail.module or '-')
+        rate = f"{files_delta / elapsed:.1f}/s" if elapsed > 0 else "-"
+        parts.append(f"files {tail.files} (+{files_delta}, {rate})")
+        position = tail.position
+    if db is not None:
+        if db.error:
+            parts.append(f"ThorDB: {db.error}")
+        position = position or db.position
+    idle = idle_seconds(now, tail, db)
+    if idle is not None and idle >= args.interval:
+        parts.append(f"idle {format_duration(idle)}")
+    parts.append(f"ETA {estimate_eta(now, tail, db, args.total_files, args.scan_gap)}")
+    if position:
+        parts.append(shorten(position))
+    return "  ".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Live progress, stall detection and ETA for a running THOR scan")
+    parser.add_argument("--log", help="THOR text or JSON log of the running scan")
+    parser.add_argument("--db", help="ThorDB of the scanning host (opened read-only)")
+    parser.add_argument("--interval", type=float, default=10, help="Seconds between polls (default: 10)")
+    parser.add_argument("--stall", type=float, default=300,
+                        help="Report a stall after this many seconds without log growth or resume marker "
+                             "changes (default: 300)")
+    parser.add_argument("--total-files", type=int,
+                        help="Expected number of file lines (e.g. from a previous --printall log) for a rate-based ETA")
+    parser.add_argument("--scan-gap", type=int, default=3600,
+                        help="Idle seconds that separate scans in stats (default: 3600)")
+    parser.add_argument("--once", action="store_true", help="Print one snapshot and exit")
+    parser.add_argument("--exit-on-stall", action="store_true",
+                        help=f"Exit with status {EXIT_STALLED} as soon as a stall is detected")
+    args = parser.parse_args()
+
+    if not args.log and not args.db:
+        parser.error("pass --log, --db or both")
+    for path in (args.log, args.db):
+        if path and not os.path.exists(path):
+            print(f"Error: not found: {path}", file=sys.stderr)
+            sys.exit(1)
+
+    tail = LogTail(args.log) if args.log else None
+    db = ThorDBPoller(args.db) if args.db else None
+    cpu_start = time.process_time()
+    wall_start = time.time()
+    stalled = False
+    try:
+        if tail is not None:
+            tail.poll()
+        if db is not None:
+            db.poll()
+        now = time.time()
+        print_snapshot(args, tail, db, now)
+        last_poll = now
+        last_files = tail.files if tail else 0
+        while True:
+            idle = idle_seconds(now, tail, db)
+            if idle is not None and idle >= args.stall:
+                if not stalled:
+                    position = (tail.position if tail else None) or (db.position if db else None)
+                    print(f"STALLED: no log growth or resume marker change for {format_duration(idle)} "
+                          f"(--stall {args.stall:g}s); last element: {position or 'unknown'}. "
+                          f"See thor-troubleshooting/reference/stuck-scans.md")
+                    sys.stdout.flush()
+                stalled = True
+                if args.exit_on_stall:
+                    break
+            elif stalled:
+                print(f"Progress resumed after a stall ({format_duration(idle or 0)} since the last change)")
+                stalled = False
+            if args.once:
+                break
+            sys.stdout.flush()
+            time.sleep(args.interval)
+
+            if tail is not None:
+                _, restarted = tail.poll()
+                if restarted:
+                    print("Log was truncated or replaced; reading it from the start")
+                    last_files = 0
+            if db is not None:
+                db.poll()
+            now = time.time()
+            files = tail.files if tail else 0
+            print(status_line(args, tail, db, now, files - last_files, now - last_poll))
+            last_poll, last_files = now, files
+    except KeyboardInterrupt:
+        pass
+    except OSError as e:
+        print(f"Error reading log: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        if db is not None:
+            db.close()
+        if not args.once:
+            cpu = time.process_time() - cpu_start
+            wall = time.time() - wall_start
+            print(f"Monitor CPU: {cpu:.2f}s over {format_duration(wall)} "
+                  f"({100.0 * cpu / wall if wall else 0.0:.3f}%)", file=sys.stderr)
+    if stalled and args.exit_on_stall:
+        sys.exit(EXIT_STALLED)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Single entry point for the THOR helper scripts (run via ./thor-tools).
+
+    thor-tools <command> [args...]        run one helper (same flags as the script)
+    thor-tools serve [--socket PATH]      keep a warm server for repeated calls
+    thor-tools stop [--socket PATH]       stop the server
+    thor-tools list                       list commands
+
+Only the module of the chosen command is imported, so startup is close to
+that of a bare interpreter plus the one script. The logic lives in this
+module rather than in the launcher so its bytecode is cached.
+
+With THOR_TOOLS_SERVER=<socket path> set (or --server PATH before the
+command), calls are handed to a running `thor-tools serve` instead. The
+server has every helper and its heavy dependencies already imported and
+forks once per call; the client passes its own stdin/stdout/stderr,
+working directory and environment, so output, pipes, exit codes and
+settings such as XDG_CACHE_HOME or TZ behave exactly as in direct mode.
+Server mode needs a Unix system (fork and fd passing).
+"""
+
+import os
+import sys
+
+HERE = os.path.dirname(os.path.realpath(__file__))
+
+# command -> (script directory relative to this file, module, description)
+COMMANDS = {
+    'summarize': ('thor-log-analysis/scripts', 'summarize_thor_log', "Summarize THOR text/JSON logs"),
+    'top-times': ('thor-db/scripts', 'thor_db_top_times', "Top ThorDB time consumers"),
+    'slow-rules': ('thor-db/scripts', 'thor_db_slow_rules_hint', "Slow rule tuning hints"),
+    'export': ('thor-db/scripts', 'thor_db_export_csv', "Export ThorDB to CSV/JSON/NDJSON/Parquet"),
+    'fleet': ('thor-db/scripts', 'thor_db_fleet', "Fleet-wide ThorDB aggregation"),
+    'snapshots': ('thor-db/scripts', 'thor_db_snapshots', "Per-run times snapshots and diffs"),
+    'prepare': ('thor-db/scripts', 'thor_db_prepare', "Indexed ThorDB copy for analysis"),
+    'timeline': ('thor-db/scripts', 'thor_db_stats_timeline', "Scan timeline and module wall-clock share"),
+    'rule-yield': ('thor-db/scripts', 'thor_db_rule_yield', "Rule scan time per log hit, never-fired rules"),
+    'validate-trail': ('thor-lens/scripts', 'validate_audit_trail', "Validate a THOR v11 audit trail"),
+    'lens-inventory': ('thor-lens/scripts', 'parquet_inventory', "THOR Lens case inventory from Parquet footers"),
+    'scan-progress': ('thor-troubleshooting/scripts', 'scan_progress', "Live scan progress, stall detection and ETA"),
+    'build-iocs': ('custom-signatures/scripts', 'build_simple_iocs', "Build hash IOCs from feeds, check filename IOCs"),
+}
+
+# Imported lazily by the helpers; the server loads them up front
+SERVER_WARM_MODULES = ['concurrent.futures.process', 'concurrent.futures.thread', 'csv', 'json',
+                       'gzip', 'hashlib', 'pyarrow', 'pyarrow.parquet', 'zstandard', 'orjson']
+
+SERVER_ENV = 'THOR_TOOLS_SERVER'
+
+
+def default_socket():
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR') or '/tmp'
+    return os.path.join(runtime_dir, f"thor-tools-{os.getuid()}.sock")
+
+
+def load_command(command):
+    script_dir, module_name, _ = COMMANDS[command]
+    script_dir = os.path.join(HERE, script_dir)
+    if script_dir not in sys.path:
+        sys.path.insert(0, script_dir)
+    import importlib
+    return importlib.import_module(module_name)
+
+
+def run_command(command, args):
+    """Run a helper's main() with args; return its exit code."""
+    module = load_command(command)
+    sys.argv = [f"thor-tools {command}"] + list(args)
+    try:
+        module.main()
+    except SystemExit as e:
+        if e.code is None or isinstance(e.code, int):
+            return e.code or 0
+        print(e.code, file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        return 130
+    return 0
+
+
+def print_commands():
+    print("Usage: thor-tools <command> [args...]   (thor-tools <command> --help for options)\n")
+    for name, (_, _, description) in COMMANDS.items():
+        print(f"  {name:<12} {description}")
+    print(f"  {'serve':<12} Keep a warm server for repeated calls (set {SERVER_ENV}=<socket>)")
+    print(f"  {'stop':<12} Stop the server")
+
+
+# --- server mode -----------------------------------------------------------
+
+def recv_request(conn):
+    """Read one request and the client's stdin/stdout/stderr fds.
+
+    Wire format: b"<payload length>\\0" + NUL-joined
+    [command, cwd, <env count>, *env "KEY=value" entries, *args]
+    (argv and environment entries cannot contain NUL). The fds ride along
+    as SCM_RIGHTS.
+    """
+    import socket
+    data, fds, _, _ = socket.recv_fds(conn, 65536, 3)
+    length, _, payload = data.partition(b"\0")
+    length = int(length)
+    while len(payload) < length:
+        chunk = conn.recv(65536)
+        if not chunk:
+            raise ValueError("truncated request")
+        payload += chunk
+    command, cwd, env_count, *rest = [field.decode('utf-8', 'surrogateescape') for field in payload.split(b"\0")]
+    env_count = int(env_count)
+    if env_count > len(rest):
+        raise ValueError("truncated environment")
+    env = dict(entry.partition('=')[::2] for entry in rest[:env_count])
+    return {'command': command, 'cwd': cwd, 'env': env, 'args': rest[env_count:]}, fds
+
+
+def handle_call(conn, request, fds):
+    """Child side of a forked call: adopt the client's fds, cwd and environment, run, report the exit code."""
+    import signal
+    import time
+    signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+    for target, fd in enumerate(fds):
+        os.dup2(fd, target)
+        os.close(fd)
+    sys.stdin = open(0, 'r', closefd=False)
+    sys.stdout = open(1, 'w', closefd=False)
+    sys.stderr = open(2, 'w', closefd=False)
+    try:
+        os.environ.clear()
+        os.environ.update(request['env'])
+        if hasattr(time, 'tzset'):
+            time.tzset()
+        os.chdir(request['cwd'])
+        code = run_command(request['command'], request['args'])
+    except Exception as e:
+        print(f"thor-tools: {type(e).__name__}: {e}", file=sys.stderr)
+        code = 1
+    try:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    except OSError:
+        pass
+    conn.sendall(f"{code}\n".encode())
+    conn.close()
+    os._exit(0)
+
+
+def serve(socket_path):
+    import importlib
+    import signal
+    import socket
+
+    if not hasattr(socket, 'send_fds') or not hasattr(os, 'fork'):
+        print("Error: server mode needs fork() and Unix socket fd passing", file=sys.stderr)
+        return 1
+
+    for command in COMMANDS:
+        load_command(command)
+    for name in SERVER_WARM_MODULES:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)
+    old_umask = os.umask(0o077)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(socket_path)
+    os.umask(old_umask)
+    server.listen(64)
+    signal.signal(signal.SIGCHLD, signal.SIG_IGN)  # reap call children automatically
+    print(f"thor-tools server listening on {socket_path} (pid {os.getpid()})", file=sys.stderr)
+
+    try:
+        while True:
+            conn, _ = server.accept()
+            try:
+                request, fds = recv_request(conn)
+            except (OSError, ValueError):
+                conn.close()
+                continue
+            if request.get('command') == 'stop':
+                conn.sendall(b"0\n")
+                conn.close()
+                break
+            if request.get('command') not in COMMANDS:
+                for fd in fds:
+                    os.close(fd)
+                conn.sendall(b"2\n")
+                conn.close()
+                continue
+            if os.fork() == 0:
+                server.close()
+                handle_call(conn, request, fds)
+            for fd in fds:
+                os.close(fd)
+            conn.close()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+    return 0
+
+
+def call_server(socket_path, command, args):
+    """Client side: hand the call to a running server; None if it is not reachable.
+
+    Uses the C _socket module directly: importing socket (enum, selectors)
+    and json (re) would cost about as much as the call itself.
+    """
+    import _socket
+    conn = _socket.socket(_socket.AF_UNIX, _socket.SOCK_STREAM)
+    try:
+        conn.connect(socket_path)
+    except OSError:
+        conn.close()
+        return None
+    try:
+        env = [f"{key}={value}" for key, value in os.environ.items()]
+        fields = [command, os.getcwd(), str(len(env))] + env + list(args)
+        payload = "\0".join(fields).encode('utf-8', 'surrogateescape')
+        fds = b"".join(fd.to_bytes(4, sys.byteorder, signed=True) for fd in (0, 1, 2))
+        conn.sendmsg([str(len(payload)).encode() + b"\0" + payload],
+                     [(_socket.SOL_SOCKET, _socket.SCM_RIGHTS, fds)])
+        reply = b""
+        while not reply.endswith(b"\n"):
+            chunk = conn.recv(64)
+            if not chunk:
+                break
+            reply += chunk
+    finally:
+        conn.close()
+    try:
+        return int(reply)
+    except ValueError:
+        print("thor-tools: server closed the connection", file=sys.stderr)
+        return 1
+
+
+def main():
+    args = sys.argv[1:]
+    socket_path = os.environ.get(SERVER_ENV)
+    if len(args) >= 2 and args[0] == '--server':
+        socket_path, args = args[1], args[2:]
+
+    if not args or args[0] in ('-h', '--help', 'list'):
+        print_commands()
+        return 0
+
+    command, args = args[0], args[1:]
+
+    if command in ('serve', 'stop'):
+        path = socket_path or default_socket()
+        if len(args) == 2 and args[0] == '--socket':
+            path = args[1]
+        elif args:
+            print(f"Usage: thor-tools {command} [--socket PATH]", file=sys.stderr)
+            return 2
+        if command == 'serve':
+            return serve(path)
+        code = call_server(path, 'stop', [])
+        if code is None:
+            print(f"No server listening on {path}", file=sys.stderr)
+            return 1
+        return code
+
+    if command not in COMMANDS:
+        print(f"thor-tools: unknown command '{command}'\n", file=sys.stderr)
+        print_commands()
+        return 2
+
+    if socket_path:
+        code = call_server(socket_path, command, args)
+        if code is not None:
+            return code
+        # Server not running: fall back to running in-process
+
+    return run_command(command, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())